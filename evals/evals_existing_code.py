@@ -2,6 +2,7 @@ import os
 import subprocess
 
 from pathlib import Path
+from typing import Optional
 
 import typer
 
@@ -12,12 +13,15 @@ from eval_tools import (
 )
 
 from gpt_engineer.core.chat_to_files import parse_chat
+from gpt_engineer.core.cassette import cassette_options
 from gpt_engineer.data.file_repository import FileRepository
 
 app = typer.Typer()  # creates a CLI app
 
 
-def single_evaluate(eval_ob: dict) -> list[bool]:
+def single_evaluate(
+    eval_ob: dict, cassette_args: Optional[list[str]] = None
+) -> list[bool]:
     """Evaluates a single prompt."""
     print(f"running evaluation: {eval_ob['name']}")
 
@@ -60,6 +64,7 @@ def single_evaluate(eval_ob: dict) -> list[bool]:
             "eval_improve_code",
             "--temperature",
             "0",
+            *(cassette_args or []),
         ],
         stdout=log_file,
         stderr=log_file,
@@ -79,10 +84,16 @@ def single_evaluate(eval_ob: dict) -> list[bool]:
     return evaluation_results
 
 
-def run_all_evaluations(eval_list: list[dict]) -> None:
+def run_all_evaluations(
+    eval_list: list[dict],
+    record: Optional[Path] = None,
+    replay: Optional[Path] = None,
+    replay_latency: float = 0.0,
+) -> None:
     results = []
     for eval_ob in eval_list:
-        results.append(single_evaluate(eval_ob))
+        cassette_args = cassette_options(eval_ob["name"], record, replay, replay_latency)
+        results.append(single_evaluate(eval_ob, cassette_args))
 
     # Step 4. Generate Report
     generate_report(eval_list, results, "evals/IMPROVE_CODE_RESULTS.md")
@@ -91,12 +102,21 @@ def run_all_evaluations(eval_list: list[dict]) -> None:
 @app.command()
 def main(
     test_file_path: str = typer.Argument("evals/existing_code_eval.yaml", help="path"),
+    record: Optional[Path] = typer.Option(
+        None, help="Directory to record a cassette of every evaluation's requests to."
+    ),
+    replay: Optional[Path] = typer.Option(
+        None, help="Directory of cassettes to replay instead of calling the model."
+    ),
+    replay_latency: float = typer.Option(
+        0.0, help="Seconds every replayed response is delayed by."
+    ),
 ):
     if not os.path.isfile(test_file_path):
         raise Exception(f"sorry the file: {test_file_path} does not exist.")
 
     eval_list = load_evaluations_from_file(test_file_path)
-    run_all_evaluations(eval_list)
+    run_all_evaluations(eval_list, record, replay, replay_latency)
 
 
 if __name__ == "__main__":
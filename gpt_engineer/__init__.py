@@ -1,8 +1,19 @@
-# Adding convenience imports to the package
-from gpt_engineer.core import (
-    ai,
-    domain,
-    chat_to_files,
-    steps,
-)
-from gpt_engineer.data import file_repository, code_vector_repository
+# Adding convenience imports to the package.
+# They are resolved on first access, so that importing a single module such as
+# gpt_engineer.cli.main doesn't pay for heavy dependencies it does not use.
+import importlib
+
+_CONVENIENCE_MODULES = {
+    "ai": "gpt_engineer.core.ai",
+    "domain": "gpt_engineer.core.domain",
+    "chat_to_files": "gpt_engineer.core.chat_to_files",
+    "steps": "gpt_engineer.core.steps",
+    "file_repository": "gpt_engineer.data.file_repository",
+    "code_vector_repository": "gpt_engineer.data.code_vector_repository",
+}
+
+
+def __getattr__(name):
+    if name in _CONVENIENCE_MODULES:
+        return importlib.import_module(_CONVENIENCE_MODULES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,6 +7,7 @@ for the application.
 
 Modules:
     - main: The primary CLI module for GPT Engineer.
+    - archive: Listing, restoring and pruning the archived snapshots of a project.
     - collect: Collect send learning data for analysis and improvement.
     - file_selector: Selecting files using GUI and terminal-based file explorer.
     - learning: Tools and data structures for data collection.
@@ -0,0 +1,74 @@
+"""
+This module provides a CLI tool to manage the archive of a gpt-engineer project.
+
+Every run that generates code archives the previous workspace and memory under
+`.gpteng/archive`, see `gpt_engineer.data.archive_store`. This tool lists the snapshots,
+restores one of them, and prunes old snapshots or collects the blobs no snapshot uses.
+
+Usage:
+    gpte-archive list projects/example
+    gpte-archive restore projects/example 20231024_101112 restored/
+    gpte-archive prune projects/example --keep 10
+    gpte-archive gc projects/example
+"""
+
+from pathlib import Path
+
+import typer
+
+from gpt_engineer.data.archive_store import ArchiveStore
+
+app = typer.Typer(help="Manage the archived snapshots of a gpt-engineer project.")
+
+
+def archive_store(project_path: str) -> ArchiveStore:
+    return ArchiveStore(Path(project_path).absolute() / ".gpteng" / "archive")
+
+
+@app.command("list")
+def list_snapshots(project_path: str = typer.Argument(..., help="path")):
+    """
+    List the snapshots, oldest first, and the disk space the archive takes up.
+    """
+    store = archive_store(project_path)
+    for name in store.snapshots():
+        print(name)
+    print(f"{store.disk_usage() / 1024:.1f} KiB in {store.path}")
+
+
+@app.command()
+def restore(
+    project_path: str = typer.Argument(..., help="path"),
+    snapshot: str = typer.Argument(..., help="name of the snapshot, see list"),
+    destination: Path = typer.Argument(..., help="directory to restore into"),
+):
+    """
+    Restore the workspace files of a snapshot into a directory.
+    """
+    restored = archive_store(project_path).restore(snapshot, destination)
+    print(f"Restored {restored} files to {destination}")
+
+
+@app.command()
+def prune(
+    project_path: str = typer.Argument(..., help="path"),
+    keep: int = typer.Option(10, help="number of latest snapshots to keep"),
+):
+    """
+    Delete all but the latest snapshots, and the blobs no longer used.
+    """
+    pruned = archive_store(project_path).prune(keep)
+    print(f"Deleted {len(pruned)} snapshots")
+
+
+@app.command()
+def gc(project_path: str = typer.Argument(..., help="path")):
+    """
+    Delete the blobs no snapshot uses.
+    """
+    freed = archive_store(project_path).gc()
+    print(f"Freed {freed / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    app()
@@ -11,7 +11,8 @@ Features:
     - Provides a tree-based display of directories and files.
     - Allows for custom filtering of displayed files and directories.
     - Support to reuse a previous file selection list.
-    - Option to ignore specific directories (e.g. "site-packages", "node_modules", "venv").
+    - Leaves out what `.gitignore` and `.gpteignore` files ignore, and directories such as
+      "site-packages", "node_modules" and "venv".
 
 Classes:
     - DisplayablePath: Represents a displayable path in a file explorer, allowing for a
@@ -45,11 +46,11 @@ import tkinter as tk
 import tkinter.filedialog as fd
 
 from pathlib import Path
-from typing import List, Union
+from typing import List, Optional, Union
 
 from gpt_engineer.data.file_repository import FileRepository
+from gpt_engineer.data.workspace_walker import IgnoreRules, scan_directory
 
-IGNORE_FOLDERS = {"site-packages", "node_modules", "venv"}
 FILE_LIST_NAME = "file_list.txt"
 
 
@@ -77,8 +78,8 @@ class DisplayablePath(object):
         - displayable: Generate the displayable string representation of the file or directory.
 
     Note:
-        It is assumed that the global constant IGNORE_FOLDERS is defined elsewhere,
-        which lists the folder names to ignore during the tree generation.
+        Paths ignored by the ignore files of the tree are left out, see
+        `gpt_engineer.data.workspace_walker`.
     """
 
     display_filename_prefix_middle = "├── "
@@ -117,35 +118,58 @@ class DisplayablePath(object):
         return self.path.name
 
     @classmethod
-    def make_tree(cls, root: Union[str, Path], parent=None, is_last=False, criteria=None):
+    def make_tree(
+        cls,
+        root: Union[str, Path],
+        parent=None,
+        is_last=False,
+        criteria=None,
+        ignore_rules: Optional[IgnoreRules] = None,
+    ):
         """
         Generate a tree of DisplayablePath objects.
 
+        Files and directories ignored by the `.gitignore` and `.gpteignore` files of the
+        tree, or always ignored such as `node_modules`, are left out, and ignored
+        directories are not listed at all.
+
         Args:
             root: The root path of the tree.
             parent: The parent path of the root path. Defaults to None.
             is_last: Whether the root path is the last child of its parent.
             criteria: The criteria function to filter the paths. Defaults to None.
+            ignore_rules: The ignore rules in effect in the parent of the root path.
+                Defaults to the rules of the root path itself.
 
         Yields:
             DisplayablePath: The DisplayablePath objects in the tree.
         """
         root = Path(str(root))
         criteria = criteria or cls._default_criteria
+        ignore_rules = ignore_rules or IgnoreRules(root)
 
         displayable_root = cls(root, parent, is_last)
         yield displayable_root
 
+        ignore_rules, entries = scan_directory(root, ignore_rules)
         children = sorted(
-            list(path for path in root.iterdir() if criteria(path)),
-            key=lambda s: str(s).lower(),
+            (
+                (Path(entry.path), entry.is_dir())
+                for entry in entries
+                if criteria(Path(entry.path))
+            ),
+            key=lambda child: str(child[0]).lower(),
         )
         count = 1
-        for path in children:
+        for path, is_dir in children:
             is_last = count == len(children)
-            if path.is_dir() and path.name not in IGNORE_FOLDERS:
+            if is_dir:
                 yield from cls.make_tree(
-                    path, parent=displayable_root, is_last=is_last, criteria=criteria
+                    path,
+                    parent=displayable_root,
+                    is_last=is_last,
+                    criteria=criteria,
+                    ignore_rules=ignore_rules,
                 )
             else:
                 yield cls(path, displayable_root, is_last)
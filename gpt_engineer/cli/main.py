@@ -11,12 +11,19 @@ Main Functionality:
   - Model type (default to GPT-4)
   - Temperature
   - Step configurations
-  - Code improvement mode
+  - Code improvement mode, optionally in batches of files
   - Lite mode for lighter operations
   - Azure endpoint for Azure OpenAI services
+  - Base URL of another OpenAI compatible API
   - Using project's preprompts or default ones
   - Verbosity level for logging
+  - Bypassing the on-disk LLM response and step caches
+  - Skipping the check that the model is available
+  - Limiting the requests and tokens sent to the model per minute
+  - Recording the model's responses to a cassette, or replaying them from one
+  - Resuming an interrupted run, skipping the steps that already finished
 - Interact with AI, databases, and archive processes based on the user-defined parameters.
+- Log the token usage, the time taken by every step and a timeline of the steps.
 
 Notes:
 - Ensure the .env file has the `OPENAI_API_KEY` or provide it in the working directory.
@@ -27,18 +34,40 @@ Notes:
 
 import logging
 import os
+import time
 from pathlib import Path
+from typing import Optional
 
 import openai
 import typer
 from dotenv import load_dotenv
 
-from gpt_engineer.data.file_repository import FileRepository, FileRepositories, archive
+from gpt_engineer.data.file_repository import (
+    DEFAULT_CACHE_BYTES,
+    FileRepository,
+    FileRepositories,
+    archive,
+)
 from gpt_engineer.core.ai import AI
+from gpt_engineer.core.cassette import RECORD, REPLAY, Cassette
+from gpt_engineer.core.checkpoint import Checkpoints
+from gpt_engineer.core.model_registry import ModelAccessRegistry
+from gpt_engineer.core.rate_limiter import RateLimiter
+from gpt_engineer.core.response_cache import ResponseCache
+from gpt_engineer.core.step_cache import StepCache
+from gpt_engineer.core.step_graph import (
+    STEP_TIMELINE_NAME,
+    StepGraph,
+    serialize_timeline,
+)
+from gpt_engineer.core.step_report import (
+    STEP_REPORT_NAME,
+    build_step_reports,
+    serialize_step_reports,
+)
 from gpt_engineer.core.steps import STEPS, Config as StepsConfig
 from gpt_engineer.cli.collect import collect_learnings
 from gpt_engineer.cli.learning import check_collection_consent
-from gpt_engineer.data.code_vector_repository import CodeVectorRepository
 
 app = typer.Typer()  # creates a CLI app
 
@@ -91,6 +120,13 @@ def main(
         "-i",
         help="Improve code from existing project.",
     ),
+    in_batches: bool = typer.Option(
+        False,
+        "--in-batches",
+        "-b",
+        help="""With --improve, split files that do not fit into one request into
+          batches, improved concurrently.""",
+    ),
     vector_improve_mode: bool = typer.Option(
         False,
         "--vector-improve",
@@ -110,12 +146,64 @@ def main(
         help="""Endpoint for your Azure OpenAI Service (https://xx.openai.azure.com).
             In that case, the given model is the deployment name chosen in the Azure AI Studio.""",
     ),
+    api_base: str = typer.Option(
+        "",
+        "--api-base",
+        help="""Base URL of an OpenAI compatible API, e.g. a local stub server.
+            Defaults to OPENAI_API_BASE or the OpenAI API.""",
+    ),
     use_custom_preprompts: bool = typer.Option(
         False,
         "--use-custom-preprompts",
         help="""Use your project's custom preprompts instead of the default ones.
           Copies all original preprompts to the project's workspace if they don't exist there.""",
     ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Bypass the on-disk LLM response and step caches for this run.",
+    ),
+    skip_model_check: bool = typer.Option(
+        False,
+        "--skip-model-check",
+        help="""Use the given model without checking that it is available.
+          Otherwise the check is done once a day per model and API key.""",
+    ),
+    requests_per_minute: Optional[int] = typer.Option(
+        None,
+        "--requests-per-minute",
+        envvar="GPTE_REQUESTS_PER_MINUTE",
+        help="""Send at most this many requests per minute to the model, shared by all
+          gpt-engineer processes using the same model and API key.""",
+    ),
+    tokens_per_minute: Optional[int] = typer.Option(
+        None,
+        "--tokens-per-minute",
+        envvar="GPTE_TOKENS_PER_MINUTE",
+        help="""Send at most this many tokens per minute to the model, shared by all
+          gpt-engineer processes using the same model and API key.""",
+    ),
+    record: Optional[Path] = typer.Option(
+        None,
+        "--record",
+        help="Record every request to the model and its response to this cassette file.",
+    ),
+    replay: Optional[Path] = typer.Option(
+        None,
+        "--replay",
+        help="Answer requests from this cassette file instead of calling the model.",
+    ),
+    replay_latency: float = typer.Option(
+        0.0,
+        "--replay-latency",
+        help="Seconds every replayed response is delayed by.",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="""Resume the last run, skipping the steps that finished with the same
+          inputs and whose logs are present.""",
+    ),
     verbose: bool = typer.Option(False, "--verbose", "-v"),
 ):
     logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO)
@@ -129,7 +217,11 @@ def main(
         assert (
             steps_config == StepsConfig.DEFAULT
         ), "Improve mode not compatible with other step configs"
-        steps_config = StepsConfig.IMPROVE_CODE
+        steps_config = (
+            StepsConfig.IMPROVE_CODE_IN_BATCHES
+            if in_batches
+            else StepsConfig.IMPROVE_CODE
+        )
 
     if vector_improve_mode:
         assert (
@@ -137,12 +229,32 @@ def main(
         ), "Vector improve mode not compatible with other step configs"
         steps_config = StepsConfig.VECTOR_IMPROVE
 
+    assert not (record and replay), "Cannot record and replay at the same time"
+    cassette = None
+    if record:
+        cassette = Cassette(record, mode=RECORD)
+    elif replay:
+        cassette = Cassette(replay, mode=REPLAY, latency=replay_latency)
+
     load_env_if_needed()
 
+    rate_limiter = None
+    if requests_per_minute or tokens_per_minute:
+        rate_limiter = RateLimiter.for_model(
+            model, openai.api_key, requests_per_minute, tokens_per_minute
+        )
+
     ai = AI(
         model_name=model,
         temperature=temperature,
         azure_endpoint=azure_endpoint,
+        api_base=api_base,
+        # recorded and replayed requests must all reach the model
+        cache=None if no_cache or cassette else ResponseCache(),
+        model_registry=ModelAccessRegistry(),
+        skip_model_check=skip_model_check,
+        cassette=cassette,
+        rate_limiter=rate_limiter,
     )
 
     project_path = os.path.abspath(
@@ -163,35 +275,74 @@ def main(
         logs=FileRepository(memory_path / "logs"),
         input=FileRepository(input_path),
         workspace=FileRepository(workspace_path),
-        preprompts=FileRepository(preprompts_path(use_custom_preprompts, input_path)),
+        # read by most steps and never written
+        preprompts=FileRepository(
+            preprompts_path(use_custom_preprompts, input_path),
+            cache_bytes=DEFAULT_CACHE_BYTES,
+        ),
         archive=FileRepository(archive_path),
         project_metadata=FileRepository(project_metadata_path),
     )
 
-    codeVectorRepository = CodeVectorRepository()
-
     if steps_config not in [
         StepsConfig.EXECUTE_ONLY,
         StepsConfig.USE_FEEDBACK,
         StepsConfig.EVALUATE,
         StepsConfig.IMPROVE_CODE,
+        StepsConfig.IMPROVE_CODE_IN_BATCHES,
         StepsConfig.VECTOR_IMPROVE,
         StepsConfig.SELF_HEAL,
     ]:
-        archive(fileRepositories)
+        if not resume:
+            archive(fileRepositories)
         load_prompt(fileRepositories)
 
     steps = STEPS[steps_config]
-    for step in steps:
+    step_cache = None if ai.cache is None else StepCache()
+    if step_cache is not None:
+        steps = [step_cache.wrap(step) for step in steps]
+    wall_times = {}
+    graph = StepGraph(steps, fileRepositories)
+    checkpoints = Checkpoints(fileRepositories.logs)
+    ran = set()
+
+    def run_step(step):
+        dependencies = graph.dependencies[step.__name__]
+        input_hash = checkpoints.input_hash(
+            step.__name__, ai, fileRepositories, dependencies
+        )
+        # once a step runs again, the steps depending on it see new inputs
+        if (
+            resume
+            and not ran.intersection(dependencies)
+            and checkpoints.is_complete(step.__name__, input_hash)
+        ):
+            print(f"Skipping {step.__name__}, it finished in the last run")
+            return
+        ran.add(step.__name__)
+
+        started = time.perf_counter()
         messages = step(ai, fileRepositories)
+        wall_times[step.__name__] = time.perf_counter() - started
         fileRepositories.logs[step.__name__] = AI.serialize_messages(messages)
+        checkpoints.mark_complete(step.__name__, input_hash)
+
+    timeline = graph.run(run_step)
 
     print("Total api cost: $ ", ai.token_usage_log.usage_cost())
+    if ai.cache is not None:
+        print("Response cache:", ai.cache.stats())
+    if step_cache is not None:
+        print("Step cache:", step_cache.stats())
 
     if check_collection_consent():
         collect_learnings(model, temperature, steps, fileRepositories)
 
     fileRepositories.logs["token_usage"] = ai.token_usage_log.format_log()
+    fileRepositories.logs[STEP_REPORT_NAME] = serialize_step_reports(
+        build_step_reports(ai, wall_times)
+    )
+    fileRepositories.logs[STEP_TIMELINE_NAME] = serialize_timeline(timeline)
 
 
 if __name__ == "__main__":
@@ -10,6 +10,17 @@ Modules:
     - domain: Contains type annotations related to the steps workflow in GPT Engineer.
     - chat_to_files: Provides utilities for converting chat model outputs to files.
     - steps: Primary workflow definition & configuration for GPT Engineer.
+    - response_cache: On-disk cache of LLM responses keyed by request content.
+    - step_executor: Concurrent execution of independent steps.
+    - model_registry: Local cache of which models an API key has access to.
+    - step_report: Per-step report of the time and tokens a run used.
+    - cassette: Recording and replaying of requests to the language model.
+    - rate_limiter: Requests and tokens per minute limits shared across processes.
+    - context_budget: Packing of files into the context window of a model.
+    - checkpoint: Checkpoints of finished steps, to resume an interrupted run.
+    - step_cache: Memoization of steps, shared across projects.
+    - step_graph: Scheduling of steps by the files they read and write.
+    - stub_openai_server: Local stand-in for the OpenAI API, for tests and load tests.
     - db: Provides file system operations for GPT Engineer projects.
 
 For more specific details, refer to the docstrings within each module.
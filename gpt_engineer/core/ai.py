@@ -6,7 +6,10 @@ The AI class encapsulates the chat functionalities, allowing to start, advance,
 Key Features:
 - Integration with Azure-based OpenAI instances through the LangChain AzureChatOpenAI class.
 - Token usage logging to monitor the number of tokens consumed during a conversation.
-- Seamless fallback to default models in case the desired model is unavailable.
+- Seamless fallback to default models in case the desired model is unavailable, with the
+  availability check cached locally or skipped entirely.
+- Optional on-disk caching of responses to skip repeated identical requests.
+- Asyncio counterparts of the chat methods, to run several conversations concurrently.
 - Serialization and deserialization of chat messages for easier transmission and storage.
 
 Classes:
@@ -27,13 +30,19 @@ import json
 import logging
 import os
 
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 import backoff
 import openai
 
+from gpt_engineer.core.cassette import Cassette, ReplayChatModel
+from gpt_engineer.core.model_registry import ModelAccessRegistry
+from gpt_engineer.core.rate_limiter import RateLimiter
+from gpt_engineer.core.response_cache import ResponseCache
+from gpt_engineer.core.step_report import FirstTokenTimer
 from gpt_engineer.core.token_usage import TokenUsageLog
 
+from langchain.callbacks.base import BaseCallbackHandler
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from langchain.chat_models import AzureChatOpenAI, ChatOpenAI
 from langchain.chat_models.base import BaseChatModel
@@ -51,6 +60,16 @@ Message = Union[AIMessage, HumanMessage, SystemMessage]
 # Set up logging
 logger = logging.getLogger(__name__)
 
+CACHE_HIT_NOTICE = (
+    "(Answer from the response cache, run with --no-cache to ask the model again)"
+)
+
+
+class CachedAIMessage(AIMessage):
+    """
+    A response answered from the response cache instead of the model.
+    """
+
 
 class AI:
     """
@@ -67,12 +86,26 @@ class AI:
         The temperature setting for the model, affecting the randomness of the output.
     azure_endpoint : str
         The Azure endpoint URL, if applicable.
+    api_base : str
+        The base URL of the OpenAI compatible API, if not the default one.
+    rate_limiter : Optional[RateLimiter]
+        The limiter of requests and tokens per minute, if any.
     model_name : str
         The name of the model being used.
     llm : Any
         The chat model instance.
     token_usage_log : Any
         The token usage log used to store cumulitive tokens used during the lifetime of the ai class
+    cache : Optional[ResponseCache]
+        The response cache consulted before sending a request, if any.
+    model_registry : Optional[ModelAccessRegistry]
+        The registry of model availability consulted before probing the API, if any.
+    skip_model_check : bool
+        Whether to use the model as given, without checking that it is available.
+    cassette : Optional[Cassette]
+        The cassette requests and responses are recorded to or replayed from, if any.
+    time_to_first_token : Dict[str, float]
+        Seconds until the first token of the first response of every step arrived.
 
     Methods
     -------
@@ -80,8 +113,18 @@ class AI:
         Start the conversation with a system and user message.
     next(messages, prompt, step_name) -> List[Message]:
         Advance the conversation by interacting with the language model.
+    astart(system, user, step_name) -> List[Message]:
+        Asyncio counterpart of `start`.
+    anext(messages, prompt, step_name) -> List[Message]:
+        Asyncio counterpart of `next`.
+    cached_inference(messages, callbacks) -> Message:
+        Answer from the response cache if possible, otherwise call `backoff_inference`.
     backoff_inference(messages, callbacks) -> Any:
         Interact with the model using an exponential backoff strategy in case of rate limits.
+    acached_inference(messages, callbacks) -> Message:
+        Asyncio counterpart of `cached_inference`.
+    abackoff_inference(messages, callbacks) -> Any:
+        Asyncio counterpart of `backoff_inference`.
     serialize_messages(messages) -> str:
         Serialize a list of messages to a JSON string.
     deserialize_messages(jsondictstr) -> List[Message]:
@@ -89,7 +132,18 @@ class AI:
 
     """
 
-    def __init__(self, model_name="gpt-4", temperature=0.1, azure_endpoint=""):
+    def __init__(
+        self,
+        model_name="gpt-4",
+        temperature=0.1,
+        azure_endpoint="",
+        cache: Optional[ResponseCache] = None,
+        model_registry: Optional[ModelAccessRegistry] = None,
+        skip_model_check: bool = False,
+        cassette: Optional[Cassette] = None,
+        api_base: str = "",
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
         """
         Initialize the AI class.
 
@@ -99,17 +153,52 @@ class AI:
             The name of the model to use, by default "gpt-4".
         temperature : float, optional
             The temperature to use for the model, by default 0.1.
+        cache : Optional[ResponseCache], optional
+            The response cache to answer repeated requests from, by default None.
+        model_registry : Optional[ModelAccessRegistry], optional
+            The registry to look up and store model availability in, by default None.
+        skip_model_check : bool, optional
+            Use the model without checking that it is available, by default False.
+        cassette : Optional[Cassette], optional
+            The cassette to record requests and responses to, or to replay them from
+            instead of calling the model, by default None.
+        api_base : str, optional
+            The base URL of an OpenAI compatible API to use instead of the OpenAI API,
+            e.g. of a local stub server, by default "" (`OPENAI_API_BASE` or the OpenAI API).
+        rate_limiter : Optional[RateLimiter], optional
+            The limiter every request waits for before it is sent, by default None.
         """
         self.temperature = temperature
         self.azure_endpoint = azure_endpoint
+        self.api_base = api_base
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.model_registry = model_registry
+        self.cassette = cassette
+        self.skip_model_check = skip_model_check or (
+            cassette is not None and not cassette.recording
+        )
+        if cassette is not None and not cassette.recording:
+            # replayed requests are keyed by the model they were recorded with, which
+            # may be the fallback of the requested one
+            model_name = cassette.model_name or model_name
         self.model_name = self._check_model_access_and_fallback(model_name)
+        if cassette is not None and cassette.recording:
+            cassette.record_model(self.model_name)
 
         self.llm = self._create_chat_model()
         self.token_usage_log = TokenUsageLog(model_name)
+        self.time_to_first_token: Dict[str, float] = {}
 
         logger.debug(f"Using model {self.model_name}")
 
-    def start(self, system: str, user: str, step_name: str) -> List[Message]:
+    def start(
+        self,
+        system: str,
+        user: str,
+        step_name: str,
+        callbacks: Optional[List[BaseCallbackHandler]] = None,
+    ) -> List[Message]:
         """
         Start the conversation with a system message and a user message.
 
@@ -121,6 +210,8 @@ class AI:
             The content of the user message.
         step_name : str
             The name of the step.
+        callbacks : Optional[List[BaseCallbackHandler]], optional
+            Additional handlers of the streamed response, by default None.
 
         Returns
         -------
@@ -132,7 +223,7 @@ class AI:
             SystemMessage(content=system),
             HumanMessage(content=user),
         ]
-        return self.next(messages, step_name=step_name)
+        return self.next(messages, step_name=step_name, callbacks=callbacks)
 
     def next(
         self,
@@ -140,6 +231,7 @@ class AI:
         prompt: Optional[str] = None,
         *,
         step_name: str,
+        callbacks: Optional[List[BaseCallbackHandler]] = None,
     ) -> List[Message]:
         """
         Advances the conversation by sending message history
@@ -153,6 +245,8 @@ class AI:
             The prompt to use, by default None.
         step_name : str
             The name of the step.
+        callbacks : Optional[List[BaseCallbackHandler]], optional
+            Additional handlers of the streamed response, by default None.
 
         Returns
         -------
@@ -168,17 +262,66 @@ class AI:
 
         logger.debug(f"Creating a new chat completion: {messages}")
 
-        callbacks = [StreamingStdOutCallbackHandler()]
-        response = self.backoff_inference(messages, callbacks)
+        timer = FirstTokenTimer()
+        response = self.cached_inference(
+            messages, [StreamingStdOutCallbackHandler(), timer, *(callbacks or [])]
+        )
+        self._record_time_to_first_token(step_name, timer)
 
         self.token_usage_log.update_log(
-            messages=messages, answer=response.content, step_name=step_name
+            messages=messages,
+            answer=response.content,
+            step_name=step_name,
+            cached=isinstance(response, CachedAIMessage),
         )
         messages.append(response)
         logger.debug(f"Chat completion finished: {messages}")
 
         return messages
 
+    def _record_time_to_first_token(self, step_name: str, timer: FirstTokenTimer):
+        # responses from the cache or models that do not stream arrive all at once
+        time_to_first_token = timer.time_to_first_token
+        if time_to_first_token is None:
+            time_to_first_token = timer.elapsed()
+        self.time_to_first_token.setdefault(step_name, time_to_first_token)
+
+    def cached_inference(self, messages: List[Message], callbacks) -> Message:
+        """
+        Perform inference, answering from the response cache when possible.
+
+        Without a cache this is `backoff_inference`. With a cache, the request is looked up
+        by API endpoint, model name, temperature and serialized messages; a hit is printed
+        instead of streamed, with a notice that it is not a new answer, and a miss is sent
+        to the model and stored. Hits are logged as cached, at no cost.
+
+        Parameters
+        ----------
+        messages : List[Message]
+            A list of chat messages which will be passed to the language model for processing.
+        callbacks : List[Callable]
+            The callbacks passed on to `backoff_inference` on a cache miss.
+
+        Returns
+        -------
+        Message
+            The response of the language model.
+        """
+        if self.cache is None:
+            return self.backoff_inference(messages, callbacks)
+
+        cache_key = self._cache_key(messages)
+        content = self.cache.get(cache_key)
+        if content is not None:
+            logger.debug(f"Response cache hit: {cache_key}")
+            print(CACHE_HIT_NOTICE)
+            print(content)
+            return CachedAIMessage(content=content)
+
+        response = self.backoff_inference(messages, callbacks)
+        self.cache.set(cache_key, response.content)
+        return response
+
     @backoff.on_exception(
         backoff.expo, openai.error.RateLimitError, max_tries=7, max_time=45
     )
@@ -216,7 +359,167 @@ class AI:
         >>> callbacks = [some_logging_callback]
         >>> response = backoff_inference(messages, callbacks)
         """
-        return self.llm(messages, callbacks=callbacks)  # type: ignore
+        if self.rate_limiter is not None:
+            self._log_wait(self.rate_limiter.acquire(self._prompt_tokens(messages)))
+        response = self.llm(messages, callbacks=callbacks)  # type: ignore
+        self._record(messages, response)
+        return response
+
+    async def astart(
+        self,
+        system: str,
+        user: str,
+        step_name: str,
+        callbacks: Optional[List[BaseCallbackHandler]] = None,
+    ) -> List[Message]:
+        """
+        Start the conversation with a system message and a user message, without blocking
+        the event loop.
+
+        Parameters
+        ----------
+        system : str
+            The content of the system message.
+        user : str
+            The content of the user message.
+        step_name : str
+            The name of the step.
+        callbacks : Optional[List[BaseCallbackHandler]], optional
+            Additional handlers of the streamed response, by default None.
+
+        Returns
+        -------
+        List[Message]
+            The list of messages in the conversation.
+        """
+        messages: List[Message] = [
+            SystemMessage(content=system),
+            HumanMessage(content=user),
+        ]
+        return await self.anext(messages, step_name=step_name, callbacks=callbacks)
+
+    async def anext(
+        self,
+        messages: List[Message],
+        prompt: Optional[str] = None,
+        *,
+        step_name: str,
+        callbacks: Optional[List[BaseCallbackHandler]] = None,
+    ) -> List[Message]:
+        """
+        Asyncio counterpart of `next`.
+
+        The response is not streamed to stdout, since output of concurrent conversations
+        would interleave. The token usage is recorded in the shared `token_usage_log`.
+
+        Parameters
+        ----------
+        messages : List[Message]
+            The list of messages in the conversation.
+        prompt : Optional[str], optional
+            The prompt to use, by default None.
+        step_name : str
+            The name of the step.
+        callbacks : Optional[List[BaseCallbackHandler]], optional
+            Additional handlers of the streamed response, by default None.
+
+        Returns
+        -------
+        List[Message]
+            The updated list of messages in the conversation.
+        """
+        if prompt:
+            messages.append(HumanMessage(content=prompt))
+
+        logger.debug(f"Creating a new async chat completion: {messages}")
+
+        timer = FirstTokenTimer()
+        response = await self.acached_inference(messages, [timer, *(callbacks or [])])
+        self._record_time_to_first_token(step_name, timer)
+
+        self.token_usage_log.update_log(
+            messages=messages,
+            answer=response.content,
+            step_name=step_name,
+            cached=isinstance(response, CachedAIMessage),
+        )
+        messages.append(response)
+        logger.debug(f"Async chat completion finished: {messages}")
+
+        return messages
+
+    async def acached_inference(self, messages: List[Message], callbacks) -> Message:
+        """
+        Asyncio counterpart of `cached_inference`.
+
+        Parameters
+        ----------
+        messages : List[Message]
+            A list of chat messages which will be passed to the language model for processing.
+        callbacks : List[Callable]
+            The callbacks passed on to `abackoff_inference` on a cache miss.
+
+        Returns
+        -------
+        Message
+            The response of the language model.
+        """
+        if self.cache is None:
+            return await self.abackoff_inference(messages, callbacks)
+
+        cache_key = self._cache_key(messages)
+        content = self.cache.get(cache_key)
+        if content is not None:
+            logger.info(f"{CACHE_HIT_NOTICE} ({cache_key})")
+            return CachedAIMessage(content=content)
+
+        response = await self.abackoff_inference(messages, callbacks)
+        self.cache.set(cache_key, response.content)
+        return response
+
+    @backoff.on_exception(
+        backoff.expo, openai.error.RateLimitError, max_tries=7, max_time=45
+    )
+    async def abackoff_inference(self, messages, callbacks):
+        """
+        Asyncio counterpart of `backoff_inference`, retrying rate limited requests with
+        the same exponential backoff strategy while yielding to other tasks.
+
+        Parameters
+        ----------
+        messages : List[Message]
+            A list of chat messages which will be passed to the language model for processing.
+        callbacks : List[Callable]
+            A list of callback functions that are triggered during the inference.
+
+        Returns
+        -------
+        Any
+            The output from the language model after processing the provided messages.
+        """
+        if self.rate_limiter is not None:
+            self._log_wait(
+                await self.rate_limiter.aacquire(self._prompt_tokens(messages))
+            )
+        response = await self.llm.apredict_messages(messages, callbacks=callbacks)
+        self._record(messages, response)
+        return response
+
+    def _prompt_tokens(self, messages: List[Message]) -> int:
+        return self.token_usage_log.tokenizer.num_tokens_from_messages(messages)
+
+    def _log_wait(self, waited: float) -> None:
+        if waited:
+            logger.info(f"Waited {waited:.1f}s for the rate limit of {self.model_name}")
+
+    def _record(self, messages: List[Message], response: Message) -> None:
+        if self.rate_limiter is not None:
+            # the completion counts against the token limit as well
+            self.rate_limiter.consume(
+                self.token_usage_log.tokenizer.num_tokens(response.content)
+            )
+        if self.cassette is not None and self.cassette.recording:
+            self.cassette.record(self._request_key(messages), response.content)
 
     @staticmethod
     def serialize_messages(messages: List[Message]) -> str:
@@ -258,10 +561,38 @@ class AI:
         ]
         return list(messages_from_dict(prevalidated_data))  # type: ignore
 
+    def _request_key(self, messages: List[Message]) -> str:
+        # Streamed replies are AIMessageChunks, key on plain messages so that
+        # conversations continued from a cached reply hash the same as live ones.
+        return ResponseCache.key(
+            self.model_name, self.temperature, self._plain_messages(messages)
+        )
+
+    def _cache_key(self, messages: List[Message]) -> str:
+        # the same request to another API or deployment may be answered differently
+        return ResponseCache.key(
+            self.model_name,
+            self.temperature,
+            self._plain_messages(messages),
+            endpoint=self.azure_endpoint or self.api_base,
+        )
+
+    @classmethod
+    def _plain_messages(cls, messages: List[Message]) -> str:
+        return cls.serialize_messages(
+            [
+                AIMessage(content=m.content) if isinstance(m, AIMessage) else m
+                for m in messages
+            ]
+        )
+
     def _check_model_access_and_fallback(self, model_name) -> str:
         """
         Retrieve the specified model, or fallback to "gpt-3.5-turbo" if the model is not available.
 
+        The check is skipped if `skip_model_check` is set, and answered from the model
+        registry if it holds a recent result for the model and API key.
+
         Parameters
         ----------
         model : str
@@ -272,9 +603,29 @@ class AI:
         str
             The name of the retrieved model, or "gpt-3.5-turbo" if the specified model is not available.
         """
-        try:
-            openai.Model.retrieve(model_name)
-        except openai.InvalidRequestError:
+        if self.skip_model_check:
+            return model_name
+
+        # availability differs between APIs, so another API is registered separately
+        registry_key = (
+            f"{self.api_base} {openai.api_key}" if self.api_base else openai.api_key
+        )
+        available = None
+        if self.model_registry is not None:
+            available = self.model_registry.get(model_name, registry_key)
+
+        if available is None:
+            try:
+                openai.Model.retrieve(
+                    model_name, **({"api_base": self.api_base} if self.api_base else {})
+                )
+                available = True
+            except openai.InvalidRequestError:
+                available = False
+            if self.model_registry is not None:
+                self.model_registry.set(model_name, registry_key, available)
+
+        if not available:
             print(
                 f"Model {model_name} not available for provided API key. Reverting "
                 "to gpt-3.5-turbo. Sign up for the GPT-4 wait list here: "
@@ -300,6 +651,9 @@ class AI:
         BaseChatModel
             The created chat model.
         """
+        if self.cassette is not None and not self.cassette.recording:
+            return ReplayChatModel(cassette=self.cassette, request_key=self._request_key)
+
         if self.azure_endpoint:
             return AzureChatOpenAI(
                 openai_api_base=self.azure_endpoint,
@@ -314,6 +668,7 @@ class AI:
             temperature=self.temperature,
             streaming=True,
             client=openai.ChatCompletion,
+            **({"openai_api_base": self.api_base} if self.api_base else {}),
         )
 
 
@@ -0,0 +1,247 @@
+"""
+This module provides recording and replaying of the requests sent to the language model.
+
+A run in record mode writes every request and the response it got to a cassette file. A run
+in replay mode answers the same requests from the cassette instead of the API, optionally
+after a simulated latency. This makes it possible to benchmark everything but the language
+model, such as parsing, applying edits, chunking, file I/O and the orchestration of steps,
+offline, deterministically and without API costs.
+
+Classes:
+- Cassette: A JSON lines file of recorded requests and responses.
+- ReplayChatModel: A chat model streaming the responses recorded on a cassette.
+- CassetteMissError: Raised when a replayed request was not recorded.
+
+Functions:
+- cassette_options: The gpt-engineer CLI options of a run recording to or replaying from a
+  directory of cassettes, as used by the benchmark and eval runners.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from langchain.callbacks import manager
+from langchain.chat_models.base import BaseChatModel
+from langchain.schema import AIMessage, BaseMessage, ChatGeneration, ChatResult
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class CassetteMissError(LookupError):
+    """
+    A request was replayed that is not on the cassette.
+    """
+
+
+class Cassette:
+    """
+    A file of requests to the language model and their responses.
+
+    Every line of the file is a JSON object with the key of a request, as computed by
+    `AI`, and the content of the response, except for a line naming the model the requests
+    were sent to. Opening a cassette in record mode empties the file. In replay mode,
+    identical requests get the recorded responses in the order they were recorded, and the
+    last one once they are used up.
+
+    Attributes
+    ----------
+    path : Path
+        The cassette file.
+    mode : str
+        Either "record" or "replay".
+    latency : float
+        Seconds a replayed response is delayed by, to simulate the language model.
+    model_name : Optional[str]
+        The model the requests were sent to, after any fallback, if it was recorded.
+    """
+
+    def __init__(self, path: Union[str, Path], mode: str = REPLAY, latency: float = 0.0):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._responses: Dict[str, List[str]] = {}
+        self._played: Dict[str, int] = {}
+        self.model_name: Optional[str] = None
+
+        if mode == RECORD:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text("", encoding="utf-8")
+        else:
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                if not line.strip():
+                    continue
+                interaction = json.loads(line)
+                if "model" in interaction:
+                    self.model_name = interaction["model"]
+                else:
+                    self._responses.setdefault(interaction["key"], []).append(
+                        interaction["content"]
+                    )
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD
+
+    def record_model(self, model_name: str) -> None:
+        """
+        Record the model the requests are sent to, to send replayed requests to the same.
+
+        Parameters
+        ----------
+        model_name : str
+            The name of the model, after any fallback.
+        """
+        self.model_name = model_name
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"model": model_name}) + "\n")
+
+    def record(self, key: str, content: str) -> None:
+        """
+        Append a request and its response to the cassette.
+
+        Parameters
+        ----------
+        key : str
+            The key of the request.
+        content : str
+            The content of the response.
+        """
+        line = json.dumps({"key": key, "content": content})
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def play(self, key: str) -> str:
+        """
+        Return the next recorded response to a request.
+
+        Parameters
+        ----------
+        key : str
+            The key of the request.
+
+        Returns
+        -------
+        str
+            The content of the response.
+
+        Raises
+        ------
+        CassetteMissError
+            If the request was not recorded.
+        """
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                raise CassetteMissError(
+                    f"No response to request {key[:12]} recorded in {self.path}"
+                )
+            played = self._played.get(key, 0)
+            self._played[key] = played + 1
+            return responses[min(played, len(responses) - 1)]
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    A chat model answering from a cassette.
+
+    The response is streamed word by word to the callbacks, after the latency of the
+    cassette, so that streaming consumers behave as with a live model.
+    """
+
+    cassette: Cassette
+    request_key: Callable[[List[BaseMessage]], str]
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat-model"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[manager.CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        content = self.cassette.play(self.request_key(messages))
+        if self.cassette.latency:
+            time.sleep(self.cassette.latency)
+        if run_manager:
+            for token in _tokens(content):
+                run_manager.on_llm_new_token(token)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))]
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[manager.AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        content = self.cassette.play(self.request_key(messages))
+        if self.cassette.latency:
+            await asyncio.sleep(self.cassette.latency)
+        if run_manager:
+            for token in _tokens(content):
+                await run_manager.on_llm_new_token(token)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=content))]
+        )
+
+
+def _tokens(content: str) -> List[str]:
+    # words with the whitespace before them, as a model would stream them
+    return re.findall(r"\s*\S+|\s+", content)
+
+
+def cassette_options(
+    name: str,
+    record_dir: Optional[Path] = None,
+    replay_dir: Optional[Path] = None,
+    replay_latency: float = 0.0,
+) -> List[str]:
+    """
+    Return the gpt-engineer CLI options to record to, or replay from, the cassette
+    `<name>.jsonl` in a directory.
+
+    Parameters
+    ----------
+    name : str
+        The name of the run, e.g. of a benchmark.
+    record_dir : Optional[Path], optional
+        The directory to record the cassette to, by default None.
+    replay_dir : Optional[Path], optional
+        The directory to replay the cassette from, by default None.
+    replay_latency : float, optional
+        Seconds every replayed response is delayed by, by default 0.
+
+    Returns
+    -------
+    List[str]
+        The CLI options, empty if neither directory is given.
+    """
+    if record_dir:
+        return ["--record", str(Path(record_dir) / f"{name}.jsonl")]
+    if replay_dir:
+        return [
+            "--replay",
+            str(Path(replay_dir) / f"{name}.jsonl"),
+            "--replay-latency",
+            str(replay_latency),
+        ]
+    return []
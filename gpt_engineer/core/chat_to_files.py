@@ -9,6 +9,7 @@ Key Features:
 - Store and overwrite files within a workspace based on chat content.
 - Format files to be used as inputs for AI agents.
 - Retrieve files and their content based on a provided list.
+- Write files and apply edits while the chat is still being streamed.
 
 Dependencies:
 - `os` and `pathlib`: For handling OS-level operations and path manipulations.
@@ -19,26 +20,42 @@ Dependencies:
 Functions:
 - parse_chat: Extracts code blocks from chat messages.
 - to_files_and_memory: Saves chat content to memory and adds extracted files to a workspace.
+- finish_files_and_memory: Saves streamed chat content to memory and adds the files that
+  were not streamed to a workspace.
 - to_files: Adds extracted files to a workspace.
 - get_code_strings: Retrieves file names and their content.
 - format_file_to_input: Formats file content for AI input.
 - overwrite_files_with_edits: Overwrites workspace files based on parsed edits from chat.
 - apply_edits: Applies file edits to a workspace.
+- merge_edits: Merges edits of independent requests, detecting conflicting ones.
+
+Classes:
+- ChatStreamParser: Incrementally extracts code blocks from a streamed chat.
+- EditStreamParser: Incrementally extracts edits from a streamed chat.
+- StreamingFileWriter: Callback handler writing files to a workspace as they are streamed.
+- EditConflict: Two edits of independent requests to the same part of a file.
 """
 
+import contextlib
 import os
 import re
 import logging
 
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.callbacks.base import BaseCallbackHandler
 
 from gpt_engineer.data.file_repository import FileRepository, FileRepositories
 from gpt_engineer.cli.file_selector import FILE_LIST_NAME
+from gpt_engineer.data.workspace_walker import walk_files
 
 
 logger = logging.getLogger(__name__)
 
+# A ``` block and the filename preceding it
+CHAT_FILE_REGEX = re.compile(r"(\S+)\n\s*```[^\n]*\n(.+?)```", re.DOTALL)
+
 
 def parse_chat(chat) -> List[Tuple[str, str]]:
     """
@@ -56,28 +73,12 @@ def parse_chat(chat) -> List[Tuple[str, str]]:
         A list of tuples, where each tuple contains a filename and a code block.
     """
     # Get all ``` blocks and preceding filenames
-    regex = r"(\S+)\n\s*```[^\n]*\n(.+?)```"
-    matches = re.finditer(regex, chat, re.DOTALL)
+    matches = CHAT_FILE_REGEX.finditer(chat)
 
     files = []
     for match in matches:
-        # Strip the filename of any non-allowed characters and convert / to \
-        path = re.sub(r'[\:<>"|?*]', "", match.group(1))
-
-        # Remove leading and trailing brackets
-        path = re.sub(r"^\[(.*)\]$", r"\1", path)
-
-        # Remove leading and trailing backticks
-        path = re.sub(r"^`(.*)`$", r"\1", path)
-
-        # Remove trailing ]
-        path = re.sub(r"[\]\:]$", "", path)
-
-        # Get the code
-        code = match.group(2)
-
         # Add the file to the list
-        files.append((path, code))
+        files.append((_clean_file_path(match.group(1)), match.group(2)))
 
     # Get all the text before the first ``` block
     readme = chat.split("```")[0]
@@ -87,6 +88,59 @@ def parse_chat(chat) -> List[Tuple[str, str]]:
     return files
 
 
+def _clean_file_path(path: str) -> str:
+    # Strip the filename of any non-allowed characters and convert / to \\
+    path = re.sub(r'[\:<>"|?*]', "", path)
+
+    # Remove leading and trailing brackets
+    path = re.sub(r"^\[(.*)\]$", r"\1", path)
+
+    # Remove leading and trailing backticks
+    path = re.sub(r"^`(.*)`$", r"\1", path)
+
+    # Remove trailing ]
+    path = re.sub(r"[\]\:]$", "", path)
+
+    return path
+
+
+class ChatStreamParser:
+    """
+    Extracts code blocks from a chat while it is being streamed.
+
+    Yields the same (filename, codeblock) tuples as `parse_chat`, except for the README,
+    each as soon as the closing fence of its block has been fed.
+    """
+
+    def __init__(self):
+        self._chat = ""
+        self._parsed_until = 0
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """
+        Add streamed text and return the code blocks it completed.
+
+        Parameters
+        ----------
+        text : str
+            The next piece of the chat.
+
+        Returns
+        -------
+        List[Tuple[str, str]]
+            The (filename, codeblock) tuples completed by `text`.
+        """
+        self._chat += text
+        if "`" not in text:
+            return []  # a block can only be completed by its closing fence
+
+        files = []
+        for match in CHAT_FILE_REGEX.finditer(self._chat, self._parsed_until):
+            files.append((_clean_file_path(match.group(1)), match.group(2)))
+            self._parsed_until = match.end()
+        return files
+
+
 def to_files_and_memory(chat: str, dbs: FileRepositories):
     """
     Save chat to memory, and parse chat to extracted file and save them to the workspace.
@@ -102,6 +156,26 @@ def to_files_and_memory(chat: str, dbs: FileRepositories):
     to_files(chat, dbs.workspace)
 
 
+def finish_files_and_memory(
+    chat: str, dbs: FileRepositories, writer: "StreamingFileWriter"
+):
+    """
+    Save chat to memory, and save the files of the chat that were not written to the
+    workspace while it was streamed.
+
+    Parameters
+    ----------
+    chat : str
+        The complete chat.
+    dbs : DBs
+        The databases that include the memory and workspace database
+    writer : StreamingFileWriter
+        The writer the chat was streamed to.
+    """
+    dbs.memory["all_output.txt"] = chat
+    writer.finish(chat)
+
+
 def to_files(chat: str, workspace: FileRepository):
     """
     Parse the chat and add all extracted files to the workspace.
@@ -113,9 +187,11 @@ def to_files(chat: str, workspace: FileRepository):
     workspace : DB
         The database containing the workspace.
     """
-    files = parse_chat(chat)
-    for file_name, file_content in files:
-        workspace[file_name] = file_content
+    # all files are written, or none if parsing or writing fails
+    with _batch(workspace):
+        files = parse_chat(chat)
+        for file_name, file_content in files:
+            workspace[file_name] = file_content
 
 
 def get_code_strings(
@@ -196,76 +272,301 @@ class Edit:
 
 
 def parse_edits(llm_response):
-    def parse_one_edit(lines):
-        HEAD = "<<<<<<< HEAD"
-        DIVIDER = "======="
-        UPDATE = ">>>>>>> updated"
+    parser = EditStreamParser()
+    return parser.feed(llm_response + "\n")
 
-        filename = lines.pop(0)
-        text = "\n".join(lines)
-        splits = text.split(DIVIDER)
-        if len(splits) != 2:
-            raise ValueError(f"Could not parse following text as code edit: \n{text}")
-        before, after = splits
 
-        before = before.replace(HEAD, "").strip()
-        after = after.replace(UPDATE, "").strip()
+def _parse_one_edit(lines: List[str]) -> Edit:
+    HEAD = "<<<<<<< HEAD"
+    DIVIDER = "======="
+    UPDATE = ">>>>>>> updated"
 
-        return Edit(filename, before, after)
+    filename, *lines = lines
+    text = "\n".join(lines)
+    splits = text.split(DIVIDER)
+    if len(splits) != 2:
+        raise ValueError(f"Could not parse following text as code edit: \n{text}")
+    before, after = splits
+
+    before = before.replace(HEAD, "").strip()
+    after = after.replace(UPDATE, "").strip()
+
+    return Edit(filename, before, after)
+
+
+class EditStreamParser:
+    """
+    Extracts edits from a chat while it is being streamed.
+
+    Yields the same edits as `parse_edits`, each as soon as the line holding the closing
+    fence of its block has been fed. A malformed edit raises a ValueError once all of the
+    fed text has been parsed, so that the parser can go on with the edits after it.
+    """
+
+    def __init__(self):
+        self._partial_line = ""
+        self._current_edit: List[str] = []
+        self._in_fence = False
+
+    def feed(self, text: str) -> List[Edit]:
+        """
+        Add streamed text and return the edits it completed.
+
+        Parameters
+        ----------
+        text : str
+            The next piece of the chat.
+
+        Returns
+        -------
+        List[Edit]
+            The edits completed by `text`.
+        """
+        lines = (self._partial_line + text).split("\n")
+        self._partial_line = lines.pop()
 
-    def parse_all_edits(txt):
         edits = []
-        current_edit = []
-        in_fence = False
-
-        for line in txt.split("\n"):
-            if line.startswith("```") and in_fence:
-                edits.append(parse_one_edit(current_edit))
-                current_edit = []
-                in_fence = False
+        error = None
+        for line in lines:
+            if line.startswith("```") and self._in_fence:
+                edit_lines, self._current_edit = self._current_edit, []
+                self._in_fence = False
+                try:
+                    edits.append(_parse_one_edit(edit_lines))
+                except ValueError as e:
+                    error = error or e
                 continue
-            elif line.startswith("```") and not in_fence:
-                in_fence = True
+            elif line.startswith("```") and not self._in_fence:
+                self._in_fence = True
                 continue
 
-            if in_fence:
-                current_edit.append(line)
+            if self._in_fence:
+                self._current_edit.append(line)
 
+        if error is not None:
+            raise error
         return edits
 
-    return parse_all_edits(llm_response)
+
+class StreamingFileWriter(BaseCallbackHandler):
+    """
+    Writes files to a workspace while the chat producing them is being streamed.
+
+    Pass an instance as callback to `AI.start` or `AI.next`. Every file is written to the
+    workspace as soon as its closing fence arrives, so that watchers, linters and the like
+    can start on it before the generation has finished. Afterwards, call `finish` with the
+    complete chat to write whatever was not streamed, e.g. because the response came from
+    the cache.
+
+    With `edits`, edits are parsed as they arrive, but only applied by `finish`, all of
+    them or none: a later edit of the response may be malformed, and edits depend on the
+    content earlier ones leave behind. Streaming thus only saves parsing the complete chat.
+
+    Parameters
+    ----------
+    workspace : FileRepository
+        The workspace to write the files to.
+    edits : bool, optional
+        Whether the chat holds edits in the `parse_edits` format instead of files in the
+        `parse_chat` format, by default False.
+    """
+
+    def __init__(self, workspace: FileRepository, edits: bool = False):
+        self.workspace = workspace
+        self.edits = edits
+        self.files_written = 0
+        self.staged_edits: List[Edit] = []
+        self._written: Dict[str, str] = {}
+        self._edits_applied = 0
+        self._reset_parser()
+
+    def _reset_parser(self) -> None:
+        self._parser = EditStreamParser() if self.edits else ChatStreamParser()
+        self.staged_edits = []
+        self._streamed = False
+        self._parse_error: Optional[ValueError] = None
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self._streamed = True
+        # exceptions raised here would be swallowed by langchain, see `finish`
+        try:
+            parsed = self._parser.feed(token)
+        except ValueError as e:
+            logger.warning(f"Could not parse a streamed edit, see the full response: {e}")
+            self._parse_error = self._parse_error or e
+            return
+
+        if self.edits:
+            self.staged_edits += parsed
+            return
+
+        for file_name, file_content in parsed:
+            self.workspace[file_name] = file_content
+            self._written[file_name] = file_content
+        self.files_written += len(parsed)
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        # the request is retried from scratch, see `AI.backoff_inference`
+        self._reset_parser()
+
+    def finish(self, chat: str) -> None:
+        """
+        Write everything of the complete chat that has not been streamed.
+
+        With `edits`, the edits parsed from the stream are applied, and the chat is only
+        parsed if nothing was streamed.
+
+        Parameters
+        ----------
+        chat : str
+            The complete chat.
+
+        Raises
+        ------
+        ValueError
+            If the chat holds a malformed edit, in which case no edit is applied.
+        """
+        if self.edits:
+            if self._streamed:
+                # the closing fence of the last edit may not be followed by a newline
+                self.on_llm_new_token("\n")
+                if self._parse_error is not None:
+                    raise self._parse_error
+                edits = self.staged_edits
+            else:  # e.g. the response came from the cache
+                edits = parse_edits(chat)
+            apply_edits(edits[self._edits_applied :], self.workspace)
+            self.files_written += len(edits) - self._edits_applied
+            self._edits_applied = len(edits)
+            return
+
+        with _batch(self.workspace):
+            for file_name, file_content in parse_chat(chat):
+                if self._written.get(file_name) != file_content:
+                    self.workspace[file_name] = file_content
+                    self._written[file_name] = file_content
+                    self.files_written += 1
 
 
 def apply_edits(edits: List[Edit], workspace: FileRepository):
-    for edit in edits:
-        filename = edit.filename
-        if edit.before == "":
-            if workspace.get(filename) is not None:
-                logger.warn(
-                    f"The edit to be applied wants to create a new file `{filename}`, but that already exists. The file will be overwritten. See `.gpteng/memory` for previous version."
-                )
-            workspace[filename] = edit.after  # new file
-        else:
-            occurrences_cnt = workspace[filename].count(edit.before)
-            if occurrences_cnt == 0:
-                logger.warn(
-                    f"While applying an edit to `{filename}`, the code block to be replaced was not found. No instances will be replaced."
-                )
-            if occurrences_cnt > 1:
-                logger.warn(
-                    f"While applying an edit to `{filename}`, the code block to be replaced was found multiple times. All instances will be replaced."
+    # every file is read and written once, however many edits it gets, and all edits are
+    # applied or none
+    with _batch(workspace), _cached(workspace):
+        for edit in edits:
+            filename = edit.filename
+            if edit.before == "":
+                if filename in workspace:
+                    logger.warn(
+                        f"The edit to be applied wants to create a new file `{filename}`, but that already exists. The file will be overwritten. See `.gpteng/memory` for previous version."
+                    )
+                workspace[filename] = edit.after  # new file
+            else:
+                content = workspace[filename]
+                occurrences_cnt = content.count(edit.before)
+                if occurrences_cnt == 0:
+                    logger.warn(
+                        f"While applying an edit to `{filename}`, the code block to be replaced was not found. No instances will be replaced."
+                    )
+                if occurrences_cnt > 1:
+                    logger.warn(
+                        f"While applying an edit to `{filename}`, the code block to be replaced was found multiple times. All instances will be replaced."
+                    )
+                workspace[filename] = content.replace(
+                    edit.before, edit.after
+                )  # existing file
+
+
+def _batch(workspace: FileRepository):
+    # plain dicts standing in for a workspace have no transactions
+    return getattr(workspace, "batch", contextlib.nullcontext)()
+
+
+def _cached(workspace: FileRepository):
+    return getattr(workspace, "cached", contextlib.nullcontext)()
+
+
+@dataclass
+class EditConflict:
+    kept: Edit
+    dropped: Edit
+
+    @property
+    def filename(self) -> str:
+        return self.kept.filename
+
+
+def merge_edits(
+    edit_lists: List[List[Edit]], workspace: FileRepository
+) -> Tuple[List[Edit], List[EditConflict]]:
+    """
+    Merge the edits of independent requests about the same workspace.
+
+    Edits of different requests conflict if they create the same file, or replace code
+    blocks that overlap in the current content of a file. Of two conflicting edits, the
+    one of the earlier request is kept. Edits of the same request never conflict, they
+    are applied in order as usual.
+
+    Parameters
+    ----------
+    edit_lists : List[List[Edit]]
+        The edits of every request.
+    workspace : FileRepository
+        The workspace the edits will be applied to.
+
+    Returns
+    -------
+    Tuple[List[Edit], List[EditConflict]]
+        The edits to apply, and the conflicting edits that were dropped.
+    """
+    merged: List[Edit] = []
+    conflicts: List[EditConflict] = []
+    claimed: dict = {}  # file name -> [(span, edit, request index)]
+
+    for request, edits in enumerate(edit_lists):
+        for edit in edits:
+            span = _edit_span(edit, workspace)
+            conflict = next(
+                (
+                    other
+                    for other_span, other, other_request in claimed.get(edit.filename, [])
+                    if other_request != request and _overlaps(span, other_span)
+                ),
+                None,
+            )
+            if conflict is not None:
+                logger.warning(
+                    f"Dropped an edit to `{edit.filename}` conflicting with another one."
                 )
-            workspace[filename] = workspace[filename].replace(
-                edit.before, edit.after
-            )  # existing file
+                conflicts.append(EditConflict(kept=conflict, dropped=edit))
+                continue
+            claimed.setdefault(edit.filename, []).append((span, edit, request))
+            merged.append(edit)
+
+    return merged, conflicts
+
+
+def _edit_span(edit: Edit, workspace: FileRepository) -> Optional[Tuple[int, int]]:
+    # the part of the file an edit replaces, (0, 0) for a new file, None if not found
+    if edit.before == "":
+        return (0, 0)
+    content = workspace.get(edit.filename)
+    start = content.find(edit.before) if content is not None else -1
+    if start == -1:
+        return None
+    return (start, start + len(edit.before))
+
+
+def _overlaps(span: Optional[Tuple[int, int]], other: Optional[Tuple[int, int]]):
+    if span is None or other is None:
+        return False
+    if span == (0, 0) or other == (0, 0):
+        return span == other  # only two new files conflict
+    return span[0] < other[1] and other[0] < span[1]
 
 
 def _get_all_files_in_dir(directory):
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            yield os.path.join(root, file)
-    for dir in dirs:
-        yield from _get_all_files_in_dir(os.path.join(root, dir))
+    for file_path in walk_files(directory):
+        yield str(file_path)
 
 
 def _open_file(file_path) -> str:
@@ -0,0 +1,124 @@
+"""
+This module provides checkpoints of the steps of a run, so that an interrupted run can be
+resumed.
+
+Every step that finishes is recorded in a checkpoint file next to the step logs, together
+with a hash of its inputs. When a run is resumed, a step is skipped if it was recorded with
+the same input hash and its log is still present. Its results, the files in the memory and
+the workspace, are then used as they are. A step that is not skipped, e.g. the
+`execute_entrypoint` a crash or Ctrl-C interrupted, and all steps depending on it run again.
+
+The input hash of a step covers what the steps of a pipeline are given from outside: the
+model and temperature, the prompt and feedback, the preprompts, and the checkpoints and logs
+of the steps it depends on. The workspace is not part of it, as steps write to it themselves.
+
+Classes:
+- Checkpoints: The completion markers and input hashes of the steps of a run.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import threading
+
+from typing import Dict, List, Optional
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.data.file_repository import FileRepositories, FileRepository
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINTS_NAME = "checkpoints"
+
+# the inputs of the user that steps read
+INPUT_NAMES = ["prompt", "feedback"]
+
+
+class Checkpoints:
+    """
+    The completion markers and input hashes of steps, stored in the `checkpoints` file of
+    the logs.
+
+    Attributes
+    ----------
+    logs : FileRepository
+        The logs of the run, holding the message log of every finished step.
+    """
+
+    def __init__(self, logs: FileRepository):
+        self.logs = logs
+        self._lock = threading.Lock()
+        try:
+            self._checkpoints: Dict[str, dict] = json.loads(
+                logs.get(CHECKPOINTS_NAME, "{}")
+            )
+        except ValueError:
+            logger.warning("Ignoring the unreadable checkpoints of the last run")
+            self._checkpoints = {}
+
+    def input_hash(
+        self,
+        step_name: str,
+        ai: AI,
+        dbs: FileRepositories,
+        dependencies: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Compute the hash of the inputs of a step.
+
+        Parameters
+        ----------
+        step_name : str
+            The name of the step.
+        ai : AI
+            The AI the step is run with.
+        dbs : FileRepositories
+            The file repositories the step is run with.
+        dependencies : Optional[List[str]], optional
+            The names of the steps it depends on, see `StepGraph`, by default None.
+
+        Returns
+        -------
+        str
+            The hex digest of the inputs.
+        """
+        sha = hashlib.sha256()
+
+        def update(*values: Optional[str]) -> None:
+            for value in values:
+                encoded = (value or "").encode("utf-8")
+                sha.update(str(len(encoded)).encode("ascii") + b":" + encoded)
+
+        update(step_name, ai.model_name, str(ai.temperature))
+        for name in INPUT_NAMES:
+            update(name, dbs.input.get(name))
+        for path in sorted(dbs.preprompts.path.iterdir()):
+            if path.is_file():
+                update(path.name, path.read_text(encoding="utf-8"))
+        for dependency in dependencies or []:
+            checkpoint = self._checkpoints.get(dependency, {})
+            update(dependency, checkpoint.get("input_hash"), self.logs.get(dependency))
+        return sha.hexdigest()
+
+    def is_complete(self, step_name: str, input_hash: str) -> bool:
+        """
+        Check whether a step was completed with the same inputs and its log is present.
+        """
+        checkpoint = self._checkpoints.get(step_name)
+        return (
+            checkpoint is not None
+            and checkpoint["input_hash"] == input_hash
+            and step_name in self.logs
+        )
+
+    def mark_complete(self, step_name: str, input_hash: str) -> None:
+        """
+        Record that a step was completed with the given inputs, immediately on disk.
+        """
+        with self._lock:
+            self._checkpoints[step_name] = {
+                "input_hash": input_hash,
+                "completed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            self.logs[CHECKPOINTS_NAME] = json.dumps(self._checkpoints, indent=2)
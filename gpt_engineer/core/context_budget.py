@@ -0,0 +1,259 @@
+"""
+This module provides packing of files into the context window of a model.
+
+In improve mode every selected file is sent to the model. A selection larger than the context
+window of the model fails only after the whole request has been uploaded, and costs money
+nonetheless. The budgeter counts the tokens of the files up front and packs them, in the
+order they were selected, into the tokens left by the rest of the prompt and the answer.
+The file that no longer fits is truncated, later files that do not fit are left out and only
+listed by name, so the model knows they exist.
+
+Classes:
+- PackedFiles: The files that fit into a token budget, and those that did not.
+
+Functions:
+- context_window: The number of tokens a model can process per request.
+- available_tokens: The tokens left for files by a prompt and the answer.
+- pack_files: Pack files into a token budget in priority order.
+- batch_files: Split files into batches that each fit into a token budget.
+"""
+
+import logging
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from langchain.schema import HumanMessage
+
+from gpt_engineer.core.chat_to_files import format_file_to_input
+from gpt_engineer.core.token_usage import Message, Tokenizer
+
+logger = logging.getLogger(__name__)
+
+# by prefix of the model name, the longest matching prefix applies
+CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-1106": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16384,
+    "gpt-3.5-turbo-1106": 16384,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# share of the context window kept free for the answer of the model
+ANSWER_SHARE = 0.25
+
+# a file is only truncated if at least this many tokens of it fit
+MIN_TRUNCATED_TOKENS = 256
+
+TRUNCATION_NOTE = "... ({} more lines truncated to fit the context window)"
+
+
+@dataclass
+class PackedFiles:
+    """
+    The result of packing files into a token budget.
+
+    Attributes
+    ----------
+    files : Dict[str, str]
+        The files to send, by name, in priority order. Truncated files hold the lines that
+        fit and a note of how many lines were cut off.
+    truncated : List[str]
+        The names of the files that were truncated.
+    dropped : List[str]
+        The names of the files that were left out.
+    tokens : int
+        The number of tokens of the files to send.
+    """
+
+    files: Dict[str, str] = field(default_factory=dict)
+    truncated: List[str] = field(default_factory=list)
+    dropped: List[str] = field(default_factory=list)
+    tokens: int = 0
+
+    def dropped_files_note(self) -> Optional[str]:
+        """
+        A note listing the files that were left out, to be sent instead of them.
+        """
+        if not self.dropped:
+            return None
+        return (
+            "The following files also exist but were left out to fit the context "
+            "window. Do not edit them:\n" + "\n".join(self.dropped)
+        )
+
+    def report(self) -> str:
+        report = f"{len(self.files)} files in the prompt ({self.tokens} tokens)"
+        if self.truncated:
+            report += f", truncated: {', '.join(self.truncated)}"
+        if self.dropped:
+            report += f", left out: {', '.join(self.dropped)}"
+        return report
+
+
+def context_window(model_name: str) -> int:
+    """
+    Return the number of tokens a model can process per request, prompt and answer.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model.
+
+    Returns
+    -------
+    int
+        The size of the context window, `DEFAULT_CONTEXT_WINDOW` for unknown models.
+    """
+    prefixes = [prefix for prefix in CONTEXT_WINDOWS if model_name.startswith(prefix)]
+    if not prefixes:
+        return DEFAULT_CONTEXT_WINDOW
+    return CONTEXT_WINDOWS[max(prefixes, key=len)]
+
+
+def available_tokens(
+    model_name: str, tokenizer: Tokenizer, messages: List[Message]
+) -> int:
+    """
+    Return the tokens left for files in a request holding `messages`, keeping
+    `ANSWER_SHARE` of the context window free for the answer.
+
+    Parameters
+    ----------
+    model_name : str
+        The name of the model the request is sent to.
+    tokenizer : Tokenizer
+        The tokenizer of the model.
+    messages : List[Message]
+        The messages of the request other than the files.
+
+    Returns
+    -------
+    int
+        The number of tokens available, at least 0.
+    """
+    window = context_window(model_name)
+    used = tokenizer.num_tokens_from_messages(messages)
+    return max(int(window * (1 - ANSWER_SHARE)) - used, 0)
+
+
+def pack_files(files: Dict[str, str], tokenizer: Tokenizer, budget: int) -> PackedFiles:
+    """
+    Pack files, each to be sent as a message formatted by `format_file_to_input`, into a
+    token budget.
+
+    Files are taken in the order of `files`. A file that does not fit is truncated to the
+    lines that do, if that is at least `MIN_TRUNCATED_TOKENS` tokens, and left out otherwise;
+    later, smaller files may still fit.
+
+    Parameters
+    ----------
+    files : Dict[str, str]
+        The contents of the files by name, in priority order.
+    tokenizer : Tokenizer
+        The tokenizer of the model.
+    budget : int
+        The number of tokens available.
+
+    Returns
+    -------
+    PackedFiles
+        The files to send and those that were truncated or left out.
+    """
+    packed = PackedFiles()
+    for file_name, content in files.items():
+        remaining = budget - packed.tokens
+        tokens = _file_tokens(tokenizer, file_name, content)
+        if tokens <= remaining:
+            packed.files[file_name] = content
+            packed.tokens += tokens
+            continue
+
+        truncated = None
+        if remaining >= MIN_TRUNCATED_TOKENS:
+            truncated = _truncate(tokenizer, file_name, content, remaining)
+        if truncated is None:
+            packed.dropped.append(file_name)
+            continue
+
+        packed.files[file_name] = truncated
+        packed.truncated.append(file_name)
+        packed.tokens += _file_tokens(tokenizer, file_name, truncated)
+
+    logger.debug(f"Packed into {budget} tokens: {packed.report()}")
+    return packed
+
+
+def batch_files(
+    files: Dict[str, str], tokenizer: Tokenizer, budget: int
+) -> List[Dict[str, str]]:
+    """
+    Split files into consecutive batches that each fit into a token budget.
+
+    Files keep their order. A file that does not fit into the budget on its own is
+    truncated as by `pack_files` and makes up a batch by itself.
+
+    Parameters
+    ----------
+    files : Dict[str, str]
+        The contents of the files by name.
+    tokenizer : Tokenizer
+        The tokenizer of the model.
+    budget : int
+        The number of tokens available per batch.
+
+    Returns
+    -------
+    List[Dict[str, str]]
+        The batches, each mapping file names to contents.
+    """
+    batches: List[Dict[str, str]] = []
+    batch: Dict[str, str] = {}
+    batch_tokens = 0
+    for file_name, content in files.items():
+        tokens = _file_tokens(tokenizer, file_name, content)
+        if batch and batch_tokens + tokens > budget:
+            batches.append(batch)
+            batch, batch_tokens = {}, 0
+        if tokens > budget:
+            truncated = _truncate(tokenizer, file_name, content, budget)
+            if truncated is None:
+                logger.warning(f"Left out {file_name}, it does not fit any batch")
+                continue
+            content, tokens = truncated, _file_tokens(tokenizer, file_name, truncated)
+        batch[file_name] = content
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _file_tokens(tokenizer: Tokenizer, file_name: str, content: str) -> int:
+    message = HumanMessage(content=format_file_to_input(file_name, content))
+    # without the 2 tokens priming the answer, which are counted once per request
+    return tokenizer.num_tokens_from_messages([message]) - 2
+
+
+def _truncate(
+    tokenizer: Tokenizer, file_name: str, content: str, budget: int
+) -> Optional[str]:
+    # the most lines, found by bisection, that fit into the budget with the note
+    lines = content.splitlines(keepends=True)
+
+    def head(n: int) -> str:
+        return "".join(lines[:n]) + TRUNCATION_NOTE.format(len(lines) - n) + "\n"
+
+    low, high = 0, len(lines)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if _file_tokens(tokenizer, file_name, head(mid)) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+
+    if low == 0:
+        return None
+    return head(low)
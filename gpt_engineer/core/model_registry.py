@@ -0,0 +1,112 @@
+"""
+This module provides a local registry of model availability.
+
+Checking whether the API key has access to a model costs a network round trip on every start
+of gpt-engineer. The registry remembers the outcome of that check, per API key and model, in
+the user cache directory for a limited time.
+
+Classes:
+- ModelAccessRegistry: A JSON file of model availability results with a time to live.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+from pathlib import Path
+from typing import Optional, Union
+
+from gpt_engineer.core.response_cache import user_cache_dir
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60  # one day
+
+
+class ModelAccessRegistry:
+    """
+    A cache of which models an API key has access to.
+
+    Results are stored in a JSON file, keyed by a hash of the API key and the model name,
+    so that neither keys nor results of different accounts are mixed up.
+
+    Attributes
+    ----------
+    path : Path
+        The JSON file the results are stored in.
+    ttl_seconds : float
+        How long a stored result is trusted.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.path = Path(path) if path else user_cache_dir() / "model_access.json"
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, model_name: str, api_key: Optional[str]) -> Optional[bool]:
+        """
+        Look up whether a model was available for an API key.
+
+        Parameters
+        ----------
+        model_name : str
+            The name of the model.
+        api_key : Optional[str]
+            The API key the model was checked with.
+
+        Returns
+        -------
+        Optional[bool]
+            The stored availability, or None if there is no result younger than the TTL.
+        """
+        entry = self._load().get(self._key(model_name, api_key))
+        if entry is None or time.time() - entry["checked_at"] > self.ttl_seconds:
+            return None
+        return entry["available"]
+
+    def set(self, model_name: str, api_key: Optional[str], available: bool) -> None:
+        """
+        Store whether a model is available for an API key.
+
+        Parameters
+        ----------
+        model_name : str
+            The name of the model.
+        api_key : Optional[str]
+            The API key the model was checked with.
+        available : bool
+            Whether the model is available.
+        """
+        entries = {
+            key: entry
+            for key, entry in self._load().items()
+            if time.time() - entry["checked_at"] <= self.ttl_seconds
+        }
+        entries[self._key(model_name, api_key)] = {
+            "available": available,
+            "checked_at": time.time(),
+        }
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(entries))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.debug(f"Could not store model availability in {self.path}: {e}")
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _key(model_name: str, api_key: Optional[str]) -> str:
+        key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        return f"{key_hash}:{model_name}"
@@ -0,0 +1,215 @@
+"""
+This module provides a client-side rate limiter for requests to the language model.
+
+`AI.backoff_inference` only reacts to rate limit errors after the API has rejected a request.
+When several processes, e.g. the benchmark or eval runners, send requests at the same time,
+they each burn retries on the same limit. The limiter instead holds a request back until
+the requests per minute and tokens per minute it is allowed are available. Its token buckets
+are stored in a file, and every process using the same file shares them.
+
+Classes:
+- RateLimiter: Request and token buckets shared through a locked file.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+from gpt_engineer.core.response_cache import user_cache_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Token buckets of the requests and tokens that may be sent to a model per minute.
+
+    Each bucket holds up to a minute's worth of its limit and is refilled continuously.
+    `acquire` takes one request and the tokens of the prompt from the buckets, waiting until
+    they are available. The tokens of the completion are only known afterwards and are
+    taken with `consume`, which may leave the bucket in debt that later requests wait out.
+
+    The buckets are kept in a JSON file next to a lock file, so that all processes
+    limiting requests to the same model with the same API key share them.
+
+    Attributes
+    ----------
+    requests_per_minute : Optional[int]
+        The number of requests allowed per minute, unlimited if None.
+    tokens_per_minute : Optional[int]
+        The number of tokens allowed per minute, unlimited if None.
+    path : Path
+        The file the buckets are stored in.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        path: Optional[Union[str, Path]] = None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.path = Path(path) if path else user_cache_dir() / "rate_limits.json"
+        self._lock_path = self.path.with_suffix(".lock")
+
+    @classmethod
+    def for_model(
+        cls,
+        model_name: str,
+        api_key: Optional[str],
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ) -> "RateLimiter":
+        """
+        Create a limiter sharing its buckets with all processes using the same model and
+        API key, the scope in which the API enforces its limits.
+        """
+        key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        return cls(
+            requests_per_minute,
+            tokens_per_minute,
+            user_cache_dir() / "rate_limits" / f"{key_hash}-{model_name}.json",
+        )
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Wait until a request with `tokens` prompt tokens may be sent, and take it from the
+        buckets.
+
+        A request needing more tokens than the limit allows per minute is sent once the
+        token bucket is full, as it could never fit otherwise.
+
+        Parameters
+        ----------
+        tokens : int
+            The number of tokens of the prompt.
+
+        Returns
+        -------
+        float
+            The number of seconds waited.
+        """
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, tokens: int) -> float:
+        """
+        Asyncio counterpart of `acquire`, waiting without blocking the event loop.
+        """
+        waited = 0.0
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def consume(self, tokens: int) -> None:
+        """
+        Take tokens from the token bucket without waiting, e.g. those of a completion.
+
+        Parameters
+        ----------
+        tokens : int
+            The number of tokens used.
+        """
+        if not self.tokens_per_minute:
+            return
+        with self._locked():
+            state = self._refilled_state()
+            state["tokens"] -= tokens
+            self._write_state(state)
+
+    def _try_acquire(self, tokens: int) -> float:
+        # returns 0 if the request and tokens were taken, otherwise the seconds to wait
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return 0.0
+
+        with self._locked():
+            state = self._refilled_state()
+            wait = 0.0
+            if self.requests_per_minute and state["requests"] < 1:
+                wait = (1 - state["requests"]) * 60 / self.requests_per_minute
+            if self.tokens_per_minute:
+                needed = min(tokens, self.tokens_per_minute)
+                if state["tokens"] < needed:
+                    wait = max(
+                        wait,
+                        (needed - state["tokens"]) * 60 / self.tokens_per_minute,
+                    )
+            if wait > 0:
+                return wait
+
+            if self.requests_per_minute:
+                state["requests"] -= 1
+            if self.tokens_per_minute:
+                state["tokens"] -= tokens
+            self._write_state(state)
+            return 0.0
+
+    def _refilled_state(self) -> dict:
+        now = time.time()
+        try:
+            state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            state = {
+                "requests": self.requests_per_minute or 0,
+                "tokens": self.tokens_per_minute or 0,
+                "updated": now,
+            }
+
+        elapsed = max(now - state["updated"], 0.0)
+        if self.requests_per_minute:
+            state["requests"] = min(
+                state["requests"] + elapsed * self.requests_per_minute / 60,
+                self.requests_per_minute,
+            )
+        if self.tokens_per_minute:
+            state["tokens"] = min(
+                state["tokens"] + elapsed * self.tokens_per_minute / 60,
+                self.tokens_per_minute,
+            )
+        state["updated"] = now
+        return state
+
+    def _write_state(self, state: dict) -> None:
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(state))
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._lock_path, "a+b") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,203 @@
+"""
+This module provides an on-disk cache for LLM responses.
+
+Identical requests (same API, model, temperature and message history) are answered from
+disk instead of being sent to the API again, which makes deterministic re-runs of
+benchmarks, evals and CI near-instant.
+
+Classes:
+- ResponseCache: A content-addressed store of chat completions with size- and age-based eviction.
+
+Functions:
+- user_cache_dir() -> Path: The per-user directory gpt-engineer stores caches in.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+
+from pathlib import Path
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE_BYTES = 100 * 1024 * 1024  # 100 MB
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 60 * 60  # one week
+
+
+def user_cache_dir() -> Path:
+    """
+    Return the per-user cache directory of gpt-engineer.
+
+    Honors `GPTE_CACHE_DIR` and `XDG_CACHE_HOME`, and falls back to `~/.cache/gpt-engineer`.
+
+    Returns
+    -------
+    Path
+        The cache directory. It is not created by this function.
+    """
+    if os.getenv("GPTE_CACHE_DIR"):
+        return Path(os.environ["GPTE_CACHE_DIR"])
+    cache_home = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "gpt-engineer"
+
+
+class ResponseCache:
+    """
+    A content-addressed, on-disk cache of LLM responses.
+
+    Each entry is stored as a JSON file named after the SHA-256 hash of the API endpoint,
+    the model name, the temperature and the serialized message list. Reading an entry refreshes its
+    modification time, so eviction by size removes the least recently used entries first.
+
+    Attributes
+    ----------
+    path : Path
+        The directory the cache entries are stored in.
+    max_size_bytes : int
+        The total size the cache is trimmed down to after every write.
+    max_age_seconds : float
+        Entries older than this are treated as misses and evicted.
+    hits : int
+        The number of lookups answered from the cache.
+    misses : int
+        The number of lookups that were not in the cache.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+    ):
+        self.path = Path(path) if path else user_cache_dir() / "responses"
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(
+        model_name: str,
+        temperature: float,
+        serialized_messages: str,
+        endpoint: str = "",
+    ) -> str:
+        """
+        Compute the cache key of a request.
+
+        Parameters
+        ----------
+        model_name : str
+            The name of the model the request is sent to.
+        temperature : float
+            The sampling temperature of the request.
+        serialized_messages : str
+            The message list, as serialized by `AI.serialize_messages`.
+        endpoint : str, optional
+            The API or deployment the request is sent to, by default "" for the OpenAI API.
+
+        Returns
+        -------
+        str
+            The hex digest identifying the request.
+        """
+        request = [model_name, temperature, serialized_messages]
+        payload = json.dumps(request + [endpoint] if endpoint else request)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response, counting the lookup as a hit or a miss.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by `ResponseCache.key`.
+
+        Returns
+        -------
+        Optional[str]
+            The cached response content, or None if there is no fresh entry.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            age = time.time() - entry_path.stat().st_mtime
+            if age > self.max_age_seconds:
+                entry_path.unlink()
+                raise FileNotFoundError(entry_path)
+            content = json.loads(entry_path.read_text(encoding="utf-8"))["content"]
+            os.utime(entry_path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return content
+
+    def set(self, key: str, content: str) -> None:
+        """
+        Store a response and evict entries that exceed the age or size limits.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by `ResponseCache.key`.
+        content : str
+            The response content to store.
+        """
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"content": content}), encoding="utf-8")
+        os.replace(tmp_path, entry_path)
+
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove expired entries, then the least recently used ones until the cache fits
+        into `max_size_bytes`.
+        """
+        now = time.time()
+        entries = []
+        for entry_path in self.path.glob("*.json"):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.max_age_seconds:
+                entry_path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_size -= size
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache.
+        """
+        for entry_path in self.path.glob("*.json"):
+            entry_path.unlink(missing_ok=True)
+
+    def stats(self) -> str:
+        """
+        Format the hit and miss counters for display.
+
+        Returns
+        -------
+        str
+            A one-line summary of the cache counters.
+        """
+        return f"{self.hits} hits, {self.misses} misses"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.path / f"{key}.json"
@@ -0,0 +1,172 @@
+"""
+This module provides memoization of whole steps, shared across projects.
+
+A step that declares the files it reads and writes can be memoized: it is fingerprinted by
+its code, the model and temperature, and the content of the files it reads. When a step with
+the same fingerprint ran before, in any project, the files it wrote and its message log are
+restored from the cache instead of running it again. Entries are kept in a `ResponseCache`,
+which evicts the least recently used ones once the cache exceeds its size.
+
+Classes:
+- StepFiles: The files of the repositories a step reads or writes.
+- StepCache: Memoizes steps that declare their inputs and outputs.
+
+Functions:
+- memoizable: Decorator declaring the inputs and outputs of a step.
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.domain import Step
+from gpt_engineer.core.response_cache import ResponseCache, user_cache_dir
+from gpt_engineer.data.file_repository import FileRepositories
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE_BYTES = 20 * 1024 * 1024  # 20 MB
+
+
+@dataclass(frozen=True)
+class StepFiles:
+    """
+    Files of the repositories of a run, by repository.
+
+    Attributes
+    ----------
+    preprompts : List[str]
+        Names of files in the preprompts.
+    input : List[str]
+        Names of files in the input, such as the prompt.
+    memory : List[str]
+        Names of files in the memory, such as all_output.txt.
+    workspace : List[str]
+        Names of files in the workspace, such as run.sh.
+    """
+
+    preprompts: List[str] = field(default_factory=list)
+    input: List[str] = field(default_factory=list)
+    memory: List[str] = field(default_factory=list)
+    workspace: List[str] = field(default_factory=list)
+
+    def read(self, dbs: FileRepositories) -> Dict[str, Dict[str, Optional[str]]]:
+        # missing files are read as None, so that they are part of a fingerprint
+        return {
+            repository: {name: getattr(dbs, repository).get(name) for name in names}
+            for repository, names in vars(self).items()
+        }
+
+
+def memoizable(inputs: StepFiles, outputs: StepFiles) -> Callable[[Step], Step]:
+    """
+    Declare the files a step reads and writes, which allows `StepCache` to memoize it.
+
+    The step must not depend on anything else, such as user input, and must not have
+    effects other than writing `outputs`.
+
+    Parameters
+    ----------
+    inputs : StepFiles
+        The files the step reads.
+    outputs : StepFiles
+        The files the step writes.
+
+    Returns
+    -------
+    Callable[[Step], Step]
+        A decorator attaching the declaration to the step, unchanged otherwise.
+    """
+
+    def decorator(step: Step) -> Step:
+        step.memo_inputs = inputs
+        step.memo_outputs = outputs
+        return step
+
+    return decorator
+
+
+class StepCache:
+    """
+    A cache of the results of memoizable steps, shared by all projects.
+
+    Attributes
+    ----------
+    cache : ResponseCache
+        The store of the entries, evicting the least recently used ones.
+    """
+
+    def __init__(self, cache: Optional[ResponseCache] = None):
+        self.cache = cache or ResponseCache(
+            user_cache_dir() / "steps", max_size_bytes=DEFAULT_MAX_SIZE_BYTES
+        )
+
+    @staticmethod
+    def fingerprint(step: Step, ai: AI, dbs: FileRepositories) -> str:
+        """
+        Compute the fingerprint of a memoizable step in a run.
+
+        Parameters
+        ----------
+        step : Step
+            The step, declared with `memoizable`.
+        ai : AI
+            The AI the step is run with.
+        dbs : FileRepositories
+            The file repositories the step is run with.
+
+        Returns
+        -------
+        str
+            The hex digest of the code, model, temperature and inputs of the step.
+        """
+        payload = json.dumps(
+            [
+                step.__name__,
+                inspect.getsource(step),
+                ai.model_name,
+                ai.temperature,
+                step.memo_inputs.read(dbs),
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def wrap(self, step: Step) -> Step:
+        """
+        Return a memoized version of a step, or the step itself if it is not memoizable.
+        """
+        if not hasattr(step, "memo_inputs"):
+            return step
+
+        @wraps(step)
+        def memoized(ai: AI, dbs: FileRepositories) -> List[dict]:
+            key = self.fingerprint(step, ai, dbs)
+            entry = self.cache.get(key)
+            if entry is not None:
+                entry = json.loads(entry)
+                for repository, files in entry["outputs"].items():
+                    for name, content in files.items():
+                        if content is not None:
+                            getattr(dbs, repository)[name] = content
+                print(f"Reusing the result of {step.__name__} from the step cache")
+                return AI.deserialize_messages(entry["messages"])
+
+            messages = step(ai, dbs)
+            entry = {
+                "outputs": step.memo_outputs.read(dbs),
+                "messages": AI.serialize_messages(messages),
+            }
+            self.cache.set(key, json.dumps(entry))
+            return messages
+
+        return memoized
+
+    def stats(self) -> str:
+        return self.cache.stats()
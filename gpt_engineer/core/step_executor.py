@@ -0,0 +1,69 @@
+"""
+This module provides an executor that runs independent steps concurrently.
+
+The steps of a `STEPS` configuration are normally run one after the other. Steps that do not
+depend on each other's output, such as generating the entrypoint of a codebase and writing
+documentation for it, can instead be run side by side in one interpreter with this executor.
+It schedules them with a `StepGraph` without dependencies. Coroutine steps (built on
+`AI.astart` / `AI.anext`) run on an event loop of their own worker. All steps share the `AI`
+instance and thereby its `TokenUsageLog`.
+
+Functions:
+- run_steps_concurrently: Run independent steps concurrently.
+"""
+
+import asyncio
+import inspect
+import logging
+
+from typing import Dict, List, Optional
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.domain import Step
+from gpt_engineer.core.step_graph import StepGraph
+from gpt_engineer.data.file_repository import FileRepositories
+
+logger = logging.getLogger(__name__)
+
+
+def run_steps_concurrently(
+    ai: AI,
+    dbs: FileRepositories,
+    steps: List[Step],
+    max_workers: Optional[int] = None,
+) -> List[List[dict]]:
+    """
+    Run independent steps concurrently and wait for all of them to finish.
+
+    The message log of every step is stored in `dbs.logs` under the step's name, as done
+    for sequentially run steps.
+
+    Parameters
+    ----------
+    ai : AI
+        The AI instance shared by all steps.
+    dbs : FileRepositories
+        The file repositories shared by all steps.
+    steps : List[Step]
+        The steps to run. They must not depend on each other's output.
+    max_workers : Optional[int], optional
+        The maximum number of steps running at the same time, by default one per step.
+
+    Returns
+    -------
+    List[List[dict]]
+        The messages returned by each step, in the order of `steps`.
+    """
+    results: Dict[str, List[dict]] = {}
+
+    def run_step(step: Step) -> None:
+        if inspect.iscoroutinefunction(step):
+            messages = asyncio.run(step(ai, dbs))
+        else:
+            messages = step(ai, dbs)
+        results[step.__name__] = messages
+        dbs.logs[step.__name__] = AI.serialize_messages(messages)
+
+    graph = StepGraph(steps, dbs, independent=True)
+    graph.run(run_step, max_workers=max_workers or max(len(steps), 1))
+    return [results[step.__name__] for step in steps]
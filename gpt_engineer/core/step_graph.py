@@ -0,0 +1,268 @@
+"""
+This module provides a scheduler running the steps of a pipeline as a dependency graph.
+
+The steps of a `STEPS` configuration are a list. Steps can declare, with `step_io`, the
+files of the `FileRepositories` they read and write. The scheduler derives from these
+declarations which step has to wait for which earlier step, and runs every step whose
+dependencies have finished in a thread pool, so that independent steps overlap. The order
+of the list is kept wherever the declarations do not say otherwise: a step that declares
+nothing, e.g. one asking the user for input, waits for all steps before it and all steps
+after it wait for it. With a single worker, steps run exactly in the order of the list.
+
+The steps of the built-in `STEPS` configurations each depend on the one before, so the
+CLI runs them with a single worker. Independent steps are run side by side by
+`run_steps_concurrently`.
+
+Every run produces a timeline of when each step ran on which worker, which can be
+written as a trace viewable in chrome://tracing or https://ui.perfetto.dev.
+
+Classes:
+- StepTiming: When and where a step ran.
+- StepGraph: The dependencies between the steps of a pipeline, and their scheduler.
+
+Functions:
+- step_io: Decorator declaring the files a step reads and writes.
+- serialize_timeline: Format step timings in the Chrome trace event format.
+"""
+
+import json
+import logging
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Set
+
+from gpt_engineer.core.domain import Step
+from gpt_engineer.data.file_repository import FileRepositories
+
+logger = logging.getLogger(__name__)
+
+STEP_TIMELINE_NAME = "step_timeline"
+
+
+def step_io(reads: List[str], writes: List[str]) -> Callable[[Step], Step]:
+    """
+    Declare the files a step reads and writes, allowing it to run alongside the steps
+    that do not touch them.
+
+    Files are given as `<repository>/<name>`, e.g. "memory/all_output.txt", or as
+    `<repository>` for all files of a repository, e.g. "workspace". Every step also writes
+    its log, "logs/<step name>".
+
+    Parameters
+    ----------
+    reads : List[str]
+        The files the step reads.
+    writes : List[str]
+        The files the step writes.
+
+    Returns
+    -------
+    Callable[[Step], Step]
+        A decorator attaching the declaration to the step, unchanged otherwise.
+    """
+
+    def decorator(step: Step) -> Step:
+        step.reads = list(reads)
+        step.writes = list(writes) + [f"logs/{step.__name__}"]
+        return step
+
+    return decorator
+
+
+@dataclass
+class StepTiming:
+    """
+    When and where a step ran.
+
+    Attributes
+    ----------
+    step_name : str
+        The name of the step.
+    worker : str
+        The name of the thread the step ran on.
+    start : float
+        Seconds from the start of the run to the start of the step.
+    end : float
+        Seconds from the start of the run to the end of the step.
+    """
+
+    step_name: str
+    worker: str
+    start: float
+    end: float
+
+
+class StepGraph:
+    """
+    The steps of a pipeline and the earlier steps each of them has to wait for.
+
+    Attributes
+    ----------
+    steps : List[Step]
+        The steps, in the order of the pipeline. Their names must be unique.
+    dependencies : Dict[str, List[str]]
+        The names of the steps each step waits for, by step name.
+    """
+
+    def __init__(
+        self,
+        steps: List[Step],
+        dbs: FileRepositories,
+        independent: bool = False,
+    ):
+        """
+        Parameters
+        ----------
+        steps : List[Step]
+            The steps, in the order of the pipeline.
+        dbs : FileRepositories
+            The file repositories the steps are run with, resolving the files declared
+            with `step_io`.
+        independent : bool, optional
+            Whether the steps are known not to depend on each other, whatever they
+            declare, by default False.
+        """
+        names = [step.__name__ for step in steps]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Step names must be unique: {names}")
+
+        self.steps = steps
+        self.dependencies: Dict[str, List[str]] = {}
+        for i, step in enumerate(steps):
+            self.dependencies[step.__name__] = [
+                earlier.__name__
+                for earlier in steps[:i]
+                if not independent and _depends_on(step, earlier, dbs)
+            ]
+
+    def run(
+        self, run_step: Callable[[Step], None], max_workers: int = 1
+    ) -> List[StepTiming]:
+        """
+        Run every step once the steps it depends on have finished, at most `max_workers`
+        at a time, preferring earlier steps of the pipeline.
+
+        With a single worker, the steps run one after the other on the calling thread, so
+        that Ctrl-C interrupts them as before. Otherwise, if a step raises, no further
+        steps are started, the running ones are waited for and the exception is raised.
+
+        Parameters
+        ----------
+        run_step : Callable[[Step], None]
+            Runs a step, e.g. calling it with the AI and file repositories and storing
+            its messages.
+        max_workers : int, optional
+            The maximum number of steps running at the same time, by default 1.
+
+        Returns
+        -------
+        List[StepTiming]
+            The timings of the steps, in the order they finished.
+        """
+        started = time.perf_counter()
+        pending = list(self.steps)
+        finished: Set[str] = set()
+        running = {}
+        timings = []
+
+        def timed(step: Step) -> StepTiming:
+            start = time.perf_counter() - started
+            run_step(step)
+            return StepTiming(
+                step.__name__,
+                threading.current_thread().name,
+                start,
+                time.perf_counter() - started,
+            )
+
+        if max_workers == 1:
+            # every step depends on earlier steps only, so the order of the list is valid
+            return [timed(step) for step in self.steps]
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="step"
+        ) as pool:
+            while pending or running:
+                for step in list(pending):
+                    if len(running) >= max_workers:
+                        break
+                    if set(self.dependencies[step.__name__]) <= finished:
+                        pending.remove(step)
+                        logger.debug(f"Starting step {step.__name__}")
+                        running[pool.submit(timed, step)] = step
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    timing = future.result()
+                    logger.debug(f"Finished step {step.__name__}")
+                    timings.append(timing)
+                    finished.add(step.__name__)
+
+        return timings
+
+
+def serialize_timeline(timings: List[StepTiming]) -> str:
+    """
+    Format step timings as a trace in the Chrome trace event format, with a row per worker.
+
+    Parameters
+    ----------
+    timings : List[StepTiming]
+        The timings, as returned by `StepGraph.run`.
+
+    Returns
+    -------
+    str
+        The JSON of the trace.
+    """
+    workers: Dict[str, int] = {}
+    events = []
+    for timing in timings:
+        thread_id = workers.setdefault(timing.worker, len(workers))
+        events.append(
+            {
+                "name": timing.step_name,
+                "ph": "X",
+                "ts": round(timing.start * 1e6),
+                "dur": round((timing.end - timing.start) * 1e6),
+                "pid": 0,
+                "tid": thread_id,
+            }
+        )
+    return json.dumps({"traceEvents": events}, indent=2)
+
+
+def _depends_on(step: Step, earlier: Step, dbs: FileRepositories) -> bool:
+    if not hasattr(step, "reads") or not hasattr(earlier, "reads"):
+        return True
+
+    def paths(files: List[str]) -> List[Path]:
+        return [_resolve(file, dbs) for file in files]
+
+    reads, writes = paths(step.reads), paths(step.writes)
+    earlier_reads, earlier_writes = paths(earlier.reads), paths(earlier.writes)
+    return (
+        _overlaps(reads, earlier_writes)
+        or _overlaps(writes, earlier_reads)
+        or _overlaps(writes, earlier_writes)
+    )
+
+
+def _resolve(file: str, dbs: FileRepositories) -> Path:
+    # repositories may share directories, e.g. the input and the workspace of the CLI
+    repository, _, name = file.partition("/")
+    path = getattr(dbs, repository).path
+    return (path / name if name else path).resolve()
+
+
+def _overlaps(paths: List[Path], other_paths: List[Path]) -> bool:
+    return any(
+        path == other or path in other.parents or other in path.parents
+        for path in paths
+        for other in other_paths
+    )
@@ -0,0 +1,120 @@
+"""
+This module provides a per-step report of the time and tokens a run of gpt-engineer used.
+
+The report is stored as JSON in the logs of a project, next to the token usage CSV, so that
+runs, e.g. of the benchmarks, can be compared across commits.
+
+Classes:
+- FirstTokenTimer: Callback handler recording when the first token of a response arrived.
+- StepReport: The time, tokens and cost of one step.
+
+Functions:
+- build_step_reports: Combine measured step durations with the token usage of an AI.
+- serialize_step_reports: Format step reports as JSON.
+"""
+
+import json
+import time
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.callbacks.openai_info import get_openai_token_cost_for_model
+
+STEP_REPORT_NAME = "step_report"
+
+
+class FirstTokenTimer(BaseCallbackHandler):
+    """
+    Measures the time from its creation until the first streamed token.
+
+    Attributes
+    ----------
+    time_to_first_token : Optional[float]
+        Seconds until the first token arrived, or None if no token has been streamed.
+    """
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.time_to_first_token: Optional[float] = None
+
+    def on_llm_start(self, *args: Any, **kwargs: Any) -> None:
+        # a retried request starts over
+        if self.time_to_first_token is None:
+            self._started = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self._started
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+
+@dataclass
+class StepReport:
+    """
+    The wall time, latency, tokens and cost of one step of a run.
+    """
+
+    step_name: str
+    wall_time: float
+    time_to_first_token: Optional[float]
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+
+
+def build_step_reports(ai, wall_times: Dict[str, float]) -> List[StepReport]:
+    """
+    Build a report for every step that was run.
+
+    Parameters
+    ----------
+    ai : AI
+        The AI the steps were run with, holding their token usage and latencies.
+    wall_times : Dict[str, float]
+        The seconds every step took, by step name, in the order the steps were run.
+
+    Returns
+    -------
+    List[StepReport]
+        A report per step, in the order of `wall_times`.
+    """
+    reports = []
+    for step_name, wall_time in wall_times.items():
+        usages = [
+            usage for usage in ai.token_usage_log.log() if usage.step_name == step_name
+        ]
+        prompt_tokens = sum(usage.in_step_prompt_tokens for usage in usages)
+        completion_tokens = sum(usage.in_step_completion_tokens for usage in usages)
+        # answers from the response cache were not paid for
+        paid = [usage for usage in usages if not usage.cached]
+        cost = 0.0
+        if paid:
+            cost = get_openai_token_cost_for_model(
+                ai.model_name, sum(usage.in_step_prompt_tokens for usage in paid)
+            ) + get_openai_token_cost_for_model(
+                ai.model_name,
+                sum(usage.in_step_completion_tokens for usage in paid),
+                is_completion=True,
+            )
+        reports.append(
+            StepReport(
+                step_name=step_name,
+                wall_time=wall_time,
+                time_to_first_token=ai.time_to_first_token.get(step_name),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                cost=cost,
+            )
+        )
+    return reports
+
+
+def serialize_step_reports(reports: List[StepReport]) -> str:
+    """
+    Format step reports as a JSON list of objects.
+    """
+    return json.dumps([asdict(report) for report in reports], indent=2)
@@ -45,6 +45,7 @@ Note:
   workflows. As such, it should be used carefully, with attention to the correct order and sequence of operations.
 """
 
+import asyncio
 import inspect
 import re
 import subprocess
@@ -60,18 +61,29 @@ from pathlib import Path
 
 from gpt_engineer.core.ai import AI
 from gpt_engineer.core.chat_to_files import (
+    StreamingFileWriter,
+    apply_edits,
+    finish_files_and_memory,
     format_file_to_input,
     get_code_strings,
-    overwrite_files_with_edits,
+    merge_edits,
+    parse_edits,
     to_files_and_memory,
 )
+from gpt_engineer.core.context_budget import (
+    available_tokens,
+    batch_files,
+    pack_files,
+)
+from gpt_engineer.core.step_cache import StepFiles, memoizable
+from gpt_engineer.core.step_graph import step_io
 from gpt_engineer.data.file_repository import FileRepositories
 from gpt_engineer.cli.file_selector import FILE_LIST_NAME, ask_for_files
 from gpt_engineer.cli.learning import human_review_input
-from gpt_engineer.data.code_vector_repository import CodeVectorRepository
 
 MAX_SELF_HEAL_ATTEMPTS = 2  # constants for self healing code
 ASSUME_WORKING_TIMEOUT = 30
+MAX_CONCURRENT_BATCHES = 4  # improve requests sent at the same time in batched mode
 
 # Type hint for chat messages
 Message = Union[AIMessage, HumanMessage, SystemMessage]
@@ -161,6 +173,9 @@ def curr_fn() -> str:
     return inspect.stack()[1].function
 
 
+@step_io(
+    reads=["input/prompt", "preprompts"], writes=["workspace", "memory/all_output.txt"]
+)
 def lite_gen(ai: AI, dbs: FileRepositories) -> List[Message]:
     """
     Executes the AI model using the main prompt and saves the generated results.
@@ -182,13 +197,20 @@ def lite_gen(ai: AI, dbs: FileRepositories) -> List[Message]:
     The function assumes the `ai.start` method and the `to_files` utility to be correctly
     set up and functional. Ensure these prerequisites before invoking `lite_gen`.
     """
+    writer = StreamingFileWriter(dbs.workspace)
     messages = ai.start(
-        dbs.input["prompt"], dbs.preprompts["file_format"], step_name=curr_fn()
+        dbs.input["prompt"],
+        dbs.preprompts["file_format"],
+        step_name=curr_fn(),
+        callbacks=[writer],
     )
-    to_files_and_memory(messages[-1].content.strip(), dbs)
+    finish_files_and_memory(messages[-1].content.strip(), dbs, writer)
     return messages
 
 
+@step_io(
+    reads=["input/prompt", "preprompts"], writes=["workspace", "memory/all_output.txt"]
+)
 def simple_gen(ai: AI, dbs: FileRepositories) -> List[Message]:
     """
     Executes the AI model using the default system prompts and saves the output.
@@ -210,8 +232,14 @@ def simple_gen(ai: AI, dbs: FileRepositories) -> List[Message]:
     The function assumes the `ai.start` method and the `to_files` utility are correctly
     set up and functional. Ensure these prerequisites are in place before invoking `simple_gen`.
     """
-    messages = ai.start(setup_sys_prompt(dbs), dbs.input["prompt"], step_name=curr_fn())
-    to_files_and_memory(messages[-1].content.strip(), dbs)
+    writer = StreamingFileWriter(dbs.workspace)
+    messages = ai.start(
+        setup_sys_prompt(dbs),
+        dbs.input["prompt"],
+        step_name=curr_fn(),
+        callbacks=[writer],
+    )
+    finish_files_and_memory(messages[-1].content.strip(), dbs, writer)
     return messages
 
 
@@ -273,6 +301,9 @@ def clarify(ai: AI, dbs: FileRepositories) -> List[Message]:
     return messages
 
 
+@step_io(
+    reads=["logs/clarify", "preprompts"], writes=["workspace", "memory/all_output.txt"]
+)
 def gen_clarified_code(ai: AI, dbs: FileRepositories) -> List[dict]:
     """
     Generates code based on clarifications obtained from the user.
@@ -297,13 +328,14 @@ def gen_clarified_code(ai: AI, dbs: FileRepositories) -> List[dict]:
     ] + messages[
         1:
     ]  # skip the first clarify message, which was the original clarify priming prompt
+    writer = StreamingFileWriter(dbs.workspace)
     messages = ai.next(
         messages,
         dbs.preprompts["generate"].replace("FILE_FORMAT", dbs.preprompts["file_format"]),
         step_name=curr_fn(),
+        callbacks=[writer],
     )
-
-    to_files_and_memory(messages[-1].content.strip(), dbs)
+    finish_files_and_memory(messages[-1].content.strip(), dbs, writer)
     return messages
 
 
@@ -373,6 +405,10 @@ def execute_entrypoint(ai: AI, dbs: FileRepositories) -> List[dict]:
     return []
 
 
+@step_io(reads=["memory/all_output.txt"], writes=["workspace/run.sh"])
+@memoizable(
+    inputs=StepFiles(memory=["all_output.txt"]), outputs=StepFiles(workspace=["run.sh"])
+)
 def gen_entrypoint(ai: AI, dbs: FileRepositories) -> List[dict]:
     """
     Generates an entry point script based on a given codebase's information.
@@ -424,6 +460,10 @@ def gen_entrypoint(ai: AI, dbs: FileRepositories) -> List[dict]:
     return messages
 
 
+@step_io(
+    reads=["input/prompt", "input/feedback", "preprompts", "memory/all_output.txt"],
+    writes=["workspace", "memory/all_output.txt"],
+)
 def use_feedback(ai: AI, dbs: FileRepositories):
     """
     Uses the provided feedback to improve the generated code.
@@ -495,8 +535,17 @@ def set_improve_filelist(ai: AI, dbs: FileRepositories):
     return []
 
 
+@step_io(
+    reads=["input/prompt", "preprompts", "project_metadata", "workspace"],
+    writes=["workspace", "project_metadata/vector_index"],
+)
 def vector_improve(ai: AI, dbs: FileRepositories):
-    code_vector_repository = CodeVectorRepository()
+    # imported here, llama_index is slow to load and only needed by this step
+    from gpt_engineer.data.code_vector_repository import CodeVectorRepository
+
+    code_vector_repository = CodeVectorRepository(
+        persist_dir=dbs.project_metadata.path / "vector_index"
+    )
     code_vector_repository.load_from_directory(dbs.workspace.path)
     releventDocuments = code_vector_repository.relevent_code_chunks(dbs.input["prompt"])
 
@@ -520,12 +569,14 @@ def vector_improve(ai: AI, dbs: FileRepositories):
     messages.append(HumanMessage(content=f"{relevent_file_contents}"))
     messages.append(HumanMessage(content=f"Request: {dbs.input['prompt']}"))
 
-    messages = ai.next(messages, step_name=curr_fn())
+    writer = StreamingFileWriter(dbs.workspace, edits=True)
+    messages = ai.next(messages, step_name=curr_fn(), callbacks=[writer])
 
-    overwrite_files_with_edits(messages[-1].content.strip(), dbs)
+    writer.finish(messages[-1].content.strip())
     return messages
 
 
+# declares no files, so that the steps after it wait for the check to pass
 def assert_files_ready(ai: AI, dbs: FileRepositories):
     """
     Verify the presence of required files for headless 'improve code' execution.
@@ -594,6 +645,10 @@ def get_improve_prompt(ai: AI, dbs: FileRepositories):
     return []
 
 
+@step_io(
+    reads=["input/prompt", "preprompts", "project_metadata", "workspace"],
+    writes=["workspace"],
+)
 def improve_existing_code(ai: AI, dbs: FileRepositories):
     """
     Process and improve the code from a specified set of existing files based on a user prompt.
@@ -629,22 +684,116 @@ def improve_existing_code(ai: AI, dbs: FileRepositories):
         dbs.workspace, dbs.project_metadata
     )  # this has file names relative to the workspace path
 
-    messages = [
-        SystemMessage(content=setup_sys_prompt_existing_code(dbs)),
-    ]
+    system_message = SystemMessage(content=setup_sys_prompt_existing_code(dbs))
+    request_message = HumanMessage(content=f"Request: {dbs.input['prompt']}")
+
+    # Fit the files into the context window before anything is sent
+    tokenizer = ai.token_usage_log.tokenizer
+    packed = pack_files(
+        files_info,
+        tokenizer,
+        available_tokens(ai.model_name, tokenizer, [system_message, request_message]),
+    )
+    if packed.truncated or packed.dropped:
+        print(colored(f"Context window exceeded: {packed.report()}", "yellow"))
+
+    messages = [system_message]
     # Add files as input
-    for file_name, file_str in files_info.items():
+    for file_name, file_str in packed.files.items():
         code_input = format_file_to_input(file_name, file_str)
         messages.append(HumanMessage(content=f"{code_input}"))
+    if packed.dropped:
+        messages.append(HumanMessage(content=packed.dropped_files_note()))
 
-    messages.append(HumanMessage(content=f"Request: {dbs.input['prompt']}"))
+    messages.append(request_message)
 
-    messages = ai.next(messages, step_name=curr_fn())
+    writer = StreamingFileWriter(dbs.workspace, edits=True)
+    messages = ai.next(messages, step_name=curr_fn(), callbacks=[writer])
 
-    overwrite_files_with_edits(messages[-1].content.strip(), dbs)
+    writer.finish(messages[-1].content.strip())
     return messages
 
 
+@step_io(
+    reads=["input/prompt", "preprompts", "project_metadata", "workspace"],
+    writes=["workspace"],
+)
+def improve_existing_code_in_batches(ai: AI, dbs: FileRepositories):
+    """
+    Improve existing code that does not fit into one request, in batches of files.
+
+    The selected files are split into batches that each fit into the context window of the
+    model. The improvement prompt is sent for every batch, concurrently, listing the files
+    of the other batches by name. The edits of all batches are then merged; edits that
+    conflict with those of an earlier batch are dropped and reported. With a selection that
+    fits into one request, this amounts to `improve_existing_code`.
+
+    Parameters:
+    - ai (AI): An instance of the AI model.
+    - dbs (DBs): An instance containing the database configurations, user prompts, and project metadata.
+
+    Returns:
+    - list[Message]: The conversations of all batches, one after the other.
+    """
+    step_name = curr_fn()
+    files_info = get_code_strings(dbs.workspace, dbs.project_metadata)
+
+    system_message = SystemMessage(content=setup_sys_prompt_existing_code(dbs))
+    request_message = HumanMessage(content=f"Request: {dbs.input['prompt']}")
+
+    def other_files_note(batch):
+        return HumanMessage(
+            content="The following files also exist and are improved separately. "
+            "Do not edit them:\n"
+            + "\n".join(name for name in files_info if name not in batch)
+        )
+
+    tokenizer = ai.token_usage_log.tokenizer
+    budget = available_tokens(
+        ai.model_name,
+        tokenizer,
+        [system_message, request_message, other_files_note({})],
+    )
+    batches = batch_files(files_info, tokenizer, budget)
+    print(f"Improving {len(files_info)} files in {len(batches)} batches")
+
+    async def improve_batch(batch, semaphore):
+        messages = [system_message]
+        for file_name, file_str in batch.items():
+            messages.append(
+                HumanMessage(content=format_file_to_input(file_name, file_str))
+            )
+        if len(batches) > 1:
+            messages.append(other_files_note(batch))
+        messages.append(request_message)
+        async with semaphore:
+            return await ai.anext(messages, step_name=step_name)
+
+    async def improve_batches():
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+        return await asyncio.gather(
+            *(improve_batch(batch, semaphore) for batch in batches)
+        )
+
+    conversations = asyncio.run(improve_batches())
+
+    edits, conflicts = merge_edits(
+        [parse_edits(messages[-1].content.strip()) for messages in conversations],
+        dbs.workspace,
+    )
+    apply_edits(edits, dbs.workspace)
+    for conflict in conflicts:
+        print(
+            colored(
+                f"Dropped a conflicting edit to {conflict.filename}:\n"
+                f"{conflict.dropped.before}\n=======\n{conflict.dropped.after}",
+                "yellow",
+            )
+        )
+
+    return [message for messages in conversations for message in messages]
+
+
 def human_review(ai: AI, dbs: FileRepositories):
     """
     Collects human feedback on the code and stores it in memory.
@@ -754,6 +903,7 @@ class Config(str, Enum):
     - EVALUATE: Execute the code and then undergo a human review.
     - USE_FEEDBACK: Uses prior feedback for code generation and subsequent steps.
     - IMPROVE_CODE: Focuses on improving existing code based on a provided prompt.
+    - IMPROVE_CODE_IN_BATCHES: Improves existing code too large for one request in batches.
     - EVAL_IMPROVE_CODE: Validates files and improves existing code.
     - EVAL_NEW_CODE: Evaluates newly generated code without further steps.
 
@@ -769,6 +919,7 @@ class Config(str, Enum):
     EVALUATE = "evaluate"
     USE_FEEDBACK = "use_feedback"
     IMPROVE_CODE = "improve_code"
+    IMPROVE_CODE_IN_BATCHES = "improve_code_in_batches"
     EVAL_IMPROVE_CODE = "eval_improve_code"
     EVAL_NEW_CODE = "eval_new_code"
     VECTOR_IMPROVE = "vector_improve"
@@ -809,6 +960,11 @@ STEPS = {
         get_improve_prompt,
         improve_existing_code,
     ],
+    Config.IMPROVE_CODE_IN_BATCHES: [
+        set_improve_filelist,
+        get_improve_prompt,
+        improve_existing_code_in_batches,
+    ],
     Config.VECTOR_IMPROVE: [vector_improve],
     Config.EVAL_IMPROVE_CODE: [assert_files_ready, improve_existing_code],
     Config.EVAL_NEW_CODE: [simple_gen],
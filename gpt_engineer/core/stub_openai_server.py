@@ -0,0 +1,222 @@
+"""
+This module provides a local stand-in for the OpenAI chat completions API, to test and
+load-test the AI class without network access or API costs.
+
+Run it with `python -m gpt_engineer.core.stub_openai_server` and point gpt-engineer at it
+with `--api-base http://127.0.0.1:8000/v1` or `OPENAI_API_BASE=http://127.0.0.1:8000/v1`.
+The speed of the stream, the latency before the first token and the share of requests
+that are rejected with a 429 rate limit error are configurable.
+
+Classes:
+- StubConfig: The canned responses and simulated behavior of the server.
+- StubStats: The counters of the requests the server answered.
+- StubOpenAIServer: The server, run in a background thread.
+"""
+
+import json
+import re
+import threading
+import time
+
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from typer import Option, run
+
+
+@dataclass
+class StubConfig:
+    responses: List[str] = field(
+        default_factory=lambda: ["Hello from the stub OpenAI server."]
+    )  # answered in turn
+    tokens_per_second: Optional[float] = None  # unlimited if None
+    latency: float = 0.0  # seconds before the first token
+    rate_limit_every: int = 0  # reject every n-th request with a 429, never if 0
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    rate_limited: int = 0
+    completions: int = 0
+    tokens_streamed: int = 0
+
+
+class StubOpenAIServer:
+    """
+    An OpenAI compatible server answering chat completions with canned responses.
+
+    Use it as a context manager; `api_base` is the URL to point clients at.
+    """
+
+    def __init__(self, config: Optional[StubConfig] = None, port: int = 0):
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def api_base(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self) -> "StubOpenAIServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def admit(self) -> Optional[str]:
+        """
+        Count a request and return the response to send, or None to rate limit it.
+        """
+        with self._lock:
+            self.stats.requests += 1
+            every = self.config.rate_limit_every
+            if every and self.stats.requests % every == 0:
+                self.stats.rate_limited += 1
+                return None
+            response = self.config.responses[
+                self.stats.completions % len(self.config.responses)
+            ]
+            self.stats.completions += 1
+            return response
+
+    def count_tokens(self, tokens: int) -> None:
+        with self._lock:
+            self.stats.tokens_streamed += tokens
+
+
+def tokenize(content: str) -> List[str]:
+    return re.findall(r"\s*\S+|\s+", content)
+
+
+def _handler(stub: StubOpenAIServer):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass  # keep the output of tests and load tests clean
+
+        def do_GET(self):
+            # model availability check, see `AI._check_model_access_and_fallback`
+            if not self.path.startswith("/v1/models/"):
+                return self._send_json(404, _error("Not found", "invalid_request_error"))
+            model = self.path.rsplit("/", 1)[-1]
+            self._send_json(200, {"id": model, "object": "model", "owned_by": "stub"})
+
+        def do_POST(self):
+            if self.path != "/v1/chat/completions":
+                return self._send_json(404, _error("Not found", "invalid_request_error"))
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            model = request.get("model", "stub")
+
+            content = stub.admit()
+            if content is None:
+                return self._send_json(
+                    429, _error("Rate limit reached (stub)", "rate_limit_error")
+                )
+
+            time.sleep(stub.config.latency)
+            tokens = tokenize(content)
+            if not request.get("stream"):
+                stub.count_tokens(len(tokens))
+                return self._send_json(200, _completion(model, content, len(tokens)))
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for token in tokens:
+                if stub.config.tokens_per_second:
+                    time.sleep(1 / stub.config.tokens_per_second)
+                self._send_event(_chunk(model, {"content": token}, None))
+                stub.count_tokens(1)
+            self._send_event(_chunk(model, {}, "stop"))
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def _send_event(self, data: dict):
+            self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def _send_json(self, status: int, data: dict):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def _error(message: str, type_: str) -> dict:
+    return {"error": {"message": message, "type": type_, "param": None, "code": None}}
+
+
+def _chunk(model: str, delta: dict, finish_reason: Optional[str]) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _completion(model: str, content: str, completion_tokens: int) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": 0,
+            "completion_tokens": completion_tokens,
+            "total_tokens": completion_tokens,
+        },
+    }
+
+
+def main(
+    port: int = 8000,
+    response: List[str] = Option(
+        ["Hello from the stub OpenAI server."], help="Canned response, repeatable."
+    ),
+    tokens_per_second: Optional[float] = None,
+    latency: float = 0.0,
+    rate_limit_every: int = 0,
+):
+    config = StubConfig(
+        responses=response,
+        tokens_per_second=tokens_per_second,
+        latency=latency,
+        rate_limit_every=rate_limit_every,
+    )
+    with StubOpenAIServer(config, port) as server:
+        print(f"Serving the stub OpenAI API at {server.api_base}, Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        print(server.stats)
+
+
+if __name__ == "__main__":
+    run(main)
@@ -1,5 +1,7 @@
+import functools
 import tiktoken
 import logging
+import threading
 from dataclasses import dataclass
 from typing import List, Union
 from langchain.callbacks.openai_info import get_openai_token_cost_for_model
@@ -9,11 +11,16 @@ Message = Union[AIMessage, HumanMessage, SystemMessage]
 
 logger = logging.getLogger(__name__)
 
+# the number of texts MemoizingTokenizer remembers the token counts of
+DEFAULT_MEMO_SIZE = 1024
+
 
 @dataclass
 class TokenUsage:
     """
     Represents token usage statistics for a conversation step.
+
+    A `cached` answer came from the response cache, its tokens were not paid for.
     """
 
     step_name: str
@@ -23,6 +30,7 @@ class TokenUsage:
     total_prompt_tokens: int
     total_completion_tokens: int
     total_tokens: int
+    cached: bool = False
 
 
 class Tokenizer:
@@ -78,9 +86,32 @@ class Tokenizer:
         return n_tokens
 
 
+class MemoizingTokenizer(Tokenizer):
+    """
+    Tokenizer that remembers the token counts of the texts it has encoded most recently.
+
+    A conversation is re-counted in full on every turn, but only its newest messages have
+    not been seen before. Python strings cache their hash, so looking up the content of a
+    message that was counted before costs nothing close to encoding it again. The least
+    recently counted texts are forgotten beyond `maxsize`, so that the memo does not keep
+    every counted text alive.
+    """
+
+    def __init__(self, model_name, maxsize: int = DEFAULT_MEMO_SIZE):
+        super().__init__(model_name)
+        self._count_tokens = functools.lru_cache(maxsize=maxsize)(super().num_tokens)
+
+    def num_tokens(self, txt: str) -> int:
+        return self._count_tokens(txt)
+
+
 class TokenUsageLog:
     """
     Represents a log of token usage statistics for a conversation.
+
+    The log may be shared by conversations running concurrently, updates are serialized
+    with a lock so the cumulative totals stay consistent. Token counts are memoized per
+    message content, so each update only encodes the messages new to the conversation.
     """
 
     def __init__(self, model_name):
@@ -89,9 +120,23 @@ class TokenUsageLog:
         self._cumulative_completion_tokens = 0
         self._cumulative_total_tokens = 0
         self._log = []
-        self._tokenizer = Tokenizer(model_name)
+        self._tokenizer = MemoizingTokenizer(model_name)
+        self._lock = threading.Lock()
 
-    def update_log(self, messages: List[Message], answer: str, step_name: str) -> None:
+    @property
+    def tokenizer(self) -> Tokenizer:
+        """
+        The tokenizer counting the tokens of the log, shared to reuse its memo.
+        """
+        return self._tokenizer
+
+    def update_log(
+        self,
+        messages: List[Message],
+        answer: str,
+        step_name: str,
+        cached: bool = False,
+    ) -> None:
         """
         Update the token usage log with the number of tokens used in the current step.
 
@@ -103,26 +148,30 @@ class TokenUsageLog:
             The answer from the AI.
         step_name : str
             The name of the step.
+        cached : bool, optional
+            Whether the answer came from the response cache, by default False.
         """
         prompt_tokens = self._tokenizer.num_tokens_from_messages(messages)
         completion_tokens = self._tokenizer.num_tokens(answer)
         total_tokens = prompt_tokens + completion_tokens
 
-        self._cumulative_prompt_tokens += prompt_tokens
-        self._cumulative_completion_tokens += completion_tokens
-        self._cumulative_total_tokens += total_tokens
-
-        self._log.append(
-            TokenUsage(
-                step_name=step_name,
-                in_step_prompt_tokens=prompt_tokens,
-                in_step_completion_tokens=completion_tokens,
-                in_step_total_tokens=total_tokens,
-                total_prompt_tokens=self._cumulative_prompt_tokens,
-                total_completion_tokens=self._cumulative_completion_tokens,
-                total_tokens=self._cumulative_total_tokens,
+        with self._lock:
+            self._cumulative_prompt_tokens += prompt_tokens
+            self._cumulative_completion_tokens += completion_tokens
+            self._cumulative_total_tokens += total_tokens
+
+            self._log.append(
+                TokenUsage(
+                    step_name=step_name,
+                    in_step_prompt_tokens=prompt_tokens,
+                    in_step_completion_tokens=completion_tokens,
+                    in_step_total_tokens=total_tokens,
+                    total_prompt_tokens=self._cumulative_prompt_tokens,
+                    total_completion_tokens=self._cumulative_completion_tokens,
+                    total_tokens=self._cumulative_total_tokens,
+                    cached=cached,
+                )
             )
-        )
 
     def log(self) -> List[TokenUsage]:
         """
@@ -151,7 +200,8 @@ class TokenUsageLog:
 
     def usage_cost(self) -> float:
         """
-        Return the total cost in USD of the API usage.
+        Return the total cost in USD of the API usage, answers from the response cache
+        cost nothing.
 
         Returns
         -------
@@ -160,10 +210,12 @@ class TokenUsageLog:
         """
         result = 0
         for log in self.log():
+            if log.cached:
+                continue
             result += get_openai_token_cost_for_model(
-                self.model_name, log.total_prompt_tokens, is_completion=False
+                self.model_name, log.in_step_prompt_tokens, is_completion=False
             )
             result += get_openai_token_cost_for_model(
-                self.model_name, log.total_completion_tokens, is_completion=True
+                self.model_name, log.in_step_completion_tokens, is_completion=True
             )
         return result
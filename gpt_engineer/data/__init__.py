@@ -3,9 +3,12 @@ gpt_engineer.data
 -----------------
 
 Modules:
+    - archive_store
     - code_vector_repository
     - document_chunker
     - file_repository
+    - snapshot
     - supported_languages
+    - workspace_walker
 
 """
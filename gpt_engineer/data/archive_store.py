@@ -0,0 +1,345 @@
+"""
+Module for a deduplicated, content-addressed index of workspace snapshots.
+
+`archive` keeps a snapshot of the workspace for every run, taken by `snapshot_directory` as
+a plain directory tree, with the files unchanged since the previous run hardlinked to it.
+On top of that, this module stores every distinct file content once, as a zlib compressed
+blob named after its SHA-256 hash, and gives every snapshot a manifest mapping the paths of
+its files to their blobs. Files with the same content share a blob even when they were
+renamed, moved or changed back. The blobs are copies of their own, so that changing an
+archived file cannot change what a snapshot restores to:
+
+    archive/
+        <timestamp>/            the workspace files, readable with any tool
+            memory/             the memory of the run, moved as before
+        .store/
+            blobs/ab/cdef...    the distinct file contents, compressed
+            manifests/<timestamp>.json
+                                path -> hash, size, modification time and mode
+
+A file with the same size and modification time as in the previous manifest is not read
+again.
+
+Snapshots taken before there was a store, or whose manifest is missing, can still be
+listed, restored and pruned.
+
+Classes:
+    ArchiveStore:
+        Stores, restores and prunes the snapshots of a workspace.
+    ArchiveStats:
+        What a snapshot linked and copied, and added to the store.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import zlib
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Collection, Dict, List, Optional, Union
+
+from gpt_engineer.data.snapshot import SnapshotStats, snapshot_directory
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = ".store"  # snapshots are named by timestamp, never starting with a dot
+BLOBS_DIR = "blobs"
+MANIFESTS_DIR = "manifests"
+MEMORY_DIR = "memory"
+MANIFEST_VERSION = 2
+COMPRESSION_LEVEL = 6
+
+
+@dataclass
+class ArchiveStats:
+    """
+    What taking a snapshot did.
+
+    Attributes
+    ----------
+    files : int
+        The number of files in the snapshot, not counting symbolic links.
+    new_blobs : int
+        The number of file contents that were not in the store yet.
+    stored_bytes : int
+        The compressed size of the new blobs.
+    snapshot : SnapshotStats
+        What `snapshot_directory` linked to the previous snapshot, cloned and copied.
+    """
+
+    files: int = 0
+    new_blobs: int = 0
+    stored_bytes: int = 0
+    snapshot: SnapshotStats = field(default_factory=SnapshotStats)
+
+
+class ArchiveStore:
+    """
+    The snapshots of a workspace and the blobs of their files.
+
+    Attributes
+    ----------
+    path : Path
+        The archive directory, holding a directory per snapshot and the store.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.blobs_path = self.path / STORE_DIR / BLOBS_DIR
+        self.manifests_path = self.path / STORE_DIR / MANIFESTS_DIR
+
+    def snapshots(self) -> List[str]:
+        """
+        Return the names of the snapshots, oldest first.
+
+        Snapshots are named by timestamp, so their names sort by age.
+        """
+        if not self.path.is_dir():
+            return []
+        return sorted(
+            entry.name
+            for entry in self.path.iterdir()
+            if entry.is_dir() and not entry.name.startswith(".")
+        )
+
+    def unused_name(self, timestamp: str) -> str:
+        """
+        Return the timestamp as the name of a new snapshot, with a counter appended if
+        there is a snapshot of that name already, e.g. of another run in the same second.
+        """
+        name, counter = timestamp, 0
+        while (self.path / name).exists():
+            counter += 1
+            name = f"{timestamp}_{counter}"
+        return name
+
+    def snapshot(
+        self, source: Path, name: str, exclude: Collection[str] = ()
+    ) -> ArchiveStats:
+        """
+        Snapshot the files of a directory tree, and add them to the store.
+
+        Parameters
+        ----------
+        source : Path
+            The directory to snapshot.
+        name : str
+            The name of the snapshot, a timestamp.
+        exclude : Collection[str], optional
+            Names of entries at the top level of `source` to leave out, by default none.
+
+        Returns
+        -------
+        ArchiveStats
+            How many files the snapshot has, and what it added to the store.
+
+        Raises
+        ------
+        FileExistsError
+            If there already is a snapshot of that name, see `unused_name`.
+        """
+        if (self.path / name).exists() or (self.manifests_path / f"{name}.json").exists():
+            raise FileExistsError(f"Snapshot '{name}' already exists in '{self.path}'")
+
+        previous = [s for s in self.snapshots() if s < name]
+        previous_name = previous[-1] if previous else None
+        stats = ArchiveStats()
+        stats.snapshot = snapshot_directory(
+            source,
+            self.path / name,
+            previous=self.path / previous_name if previous_name else None,
+            exclude=exclude,
+        )
+
+        previous_manifest = (
+            self._manifest(previous_name) if previous_name else None
+        ) or {}
+        files = {}
+        snapshot_path = self.path / name
+        # os.walk does not follow links, which the snapshot has as links too
+        for directory, dir_names, file_names in os.walk(snapshot_path):
+            dir_names.sort()
+            for file_name in sorted(dir_names + file_names):
+                path = Path(directory) / file_name
+                key = path.relative_to(snapshot_path).as_posix()
+                if path.is_symlink():
+                    files[key] = {"link": os.readlink(path)}
+                elif file_name in file_names:
+                    files[key] = self._index(path, previous_manifest.get(key), stats)
+                    stats.files += 1
+
+        # the manifest is written last, a snapshot without one was interrupted
+        manifest_path = self.manifests_path / f"{name}.json"
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "files": files}, indent=1),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, manifest_path)
+
+        logger.debug(f"Snapshot {name} of {source}: {stats}")
+        return stats
+
+    def restore(self, name: str, destination: Path) -> int:
+        """
+        Write the files of a snapshot to a directory.
+
+        Parameters
+        ----------
+        name : str
+            The name of the snapshot.
+        destination : Path
+            The directory to restore into. Files of the snapshot are overwritten, other
+            files are left alone.
+
+        Returns
+        -------
+        int
+            The number of files restored.
+
+        Raises
+        ------
+        KeyError
+            If there is no snapshot of that name.
+        """
+        if name not in self.snapshots():
+            raise KeyError(f"Snapshot '{name}' could not be found in '{self.path}'")
+
+        manifest = self._manifest(name)
+        if manifest is None:
+            return self._restore_copy(self.path / name, destination)
+
+        for key, entry in manifest.items():
+            path = destination / key
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if path.is_symlink() or ("link" in entry and path.exists()):
+                path.unlink()
+            if "link" in entry:
+                os.symlink(entry["link"], path)
+                continue
+            path.write_bytes(
+                zlib.decompress(self._blob_path(entry["sha256"]).read_bytes())
+            )
+            os.chmod(path, entry["mode"])
+            os.utime(path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+        return len(manifest)
+
+    def prune(self, keep: int) -> List[str]:
+        """
+        Delete all but the `keep` latest snapshots, and then the blobs no longer used.
+
+        Parameters
+        ----------
+        keep : int
+            The number of snapshots to keep.
+
+        Returns
+        -------
+        List[str]
+            The names of the deleted snapshots.
+        """
+        snapshots = self.snapshots()
+        pruned = snapshots[: max(len(snapshots) - keep, 0)]
+        for name in pruned:
+            (self.manifests_path / f"{name}.json").unlink(missing_ok=True)
+            shutil.rmtree(self.path / name)
+        self.gc()
+        return pruned
+
+    def gc(self) -> int:
+        """
+        Delete the blobs no snapshot refers to. Must not run while a snapshot is taken.
+
+        Returns
+        -------
+        int
+            The number of bytes freed.
+        """
+        used = set()
+        for name in self.snapshots():
+            used.update(
+                entry["sha256"]
+                for entry in (self._manifest(name) or {}).values()
+                if "sha256" in entry
+            )
+
+        freed = 0
+        if not self.blobs_path.is_dir():
+            return freed
+        for blob_path in self.blobs_path.glob("*/*"):
+            if blob_path.parent.name + blob_path.name not in used:
+                freed += blob_path.stat().st_size
+                blob_path.unlink()
+        return freed
+
+    def disk_usage(self) -> int:
+        """
+        Return the number of bytes the archive takes up, counting linked files once.
+        """
+        seen = set()
+        total = 0
+        for directory, _, file_names in os.walk(self.path):
+            for file_name in file_names:
+                stat = os.lstat(os.path.join(directory, file_name))
+                if (stat.st_dev, stat.st_ino) not in seen:
+                    seen.add((stat.st_dev, stat.st_ino))
+                    total += stat.st_size
+        return total
+
+    def _index(self, path: Path, previous: Optional[dict], stats: ArchiveStats) -> dict:
+        stat = path.stat()
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if not (
+            previous
+            and "sha256" in previous
+            and previous["size"] == stat.st_size
+            and previous["mtime_ns"] == stat.st_mtime_ns
+            and self._blob_path(previous["sha256"]).exists()
+        ):
+            entry["sha256"] = self._store(path.read_bytes(), stats)
+        else:
+            entry["sha256"] = previous["sha256"]
+        return {**entry, "mode": stat.st_mode & 0o777}
+
+    def _store(self, content: bytes, stats: ArchiveStats) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not blob_path.exists():
+            compressed = zlib.compress(content, COMPRESSION_LEVEL)
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(compressed)
+            os.replace(tmp_path, blob_path)
+            stats.new_blobs += 1
+            stats.stored_bytes += len(compressed)
+        return digest
+
+    def _restore_copy(self, snapshot_path: Path, destination: Path) -> int:
+        # a snapshot without a manifest, the workspace files next to the memory
+        restored = 0
+        for directory, dir_names, file_names in os.walk(snapshot_path):
+            relative = Path(directory).relative_to(snapshot_path)
+            if relative == Path("."):
+                dir_names[:] = [d for d in dir_names if d != MEMORY_DIR]
+            for file_name in file_names:
+                path = destination / relative / file_name
+                path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(Path(directory) / file_name, path, follow_symlinks=False)
+                restored += 1
+        return restored
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs_path / digest[:2] / digest[2:]
+
+    def _manifest(self, name: str) -> Optional[Dict[str, dict]]:
+        try:
+            manifest = json.loads(
+                (self.manifests_path / f"{name}.json").read_text(encoding="utf-8")
+            )
+        except (OSError, ValueError):
+            return None
+        return manifest["files"]
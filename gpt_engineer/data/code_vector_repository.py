@@ -1,44 +1,178 @@
-from typing import Dict, List
+import hashlib
+import json
+import logging
+import os
 
-from llama_index import VectorStoreIndex, SimpleDirectoryReader
-from llama_index import Document, ServiceContext
-from llama_index.schema import NodeWithScore
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from llama_index import (
+    Document,
+    ServiceContext,
+    SimpleDirectoryReader,
+    StorageContext,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
 from llama_index.retrievers import BM25Retriever
+from llama_index.schema import NodeWithScore
 
 from gpt_engineer.data.document_chunker import DocumentChunker
+from gpt_engineer.data.workspace_walker import walk_files
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+class IndexUpdate(NamedTuple):
+    """
+    The files an index update had to re-index, by path relative to the indexed directory.
+    """
+
+    added: List[str]
+    modified: List[str]
+    removed: List[str]
+
+    @property
+    def files_touched(self) -> int:
+        return len(self.added) + len(self.modified) + len(self.removed)
 
 
 class CodeVectorRepository:
-    def __init__(self):
+    """
+    A searchable index over the code files of a directory.
+
+    If a `persist_dir` is given, the index is stored there together with a manifest of the
+    size, modification time, hash and index documents of every indexed file. Loading the
+    same directory again reads the stored index and only re-indexes the files that were
+    added, changed or removed since, instead of re-chunking and re-embedding every file.
+
+    Files are chunked in `chunk_workers` processes, see `DocumentChunker.chunk_documents`.
+    """
+
+    def __init__(
+        self,
+        persist_dir: Optional[Union[str, Path]] = None,
+        service_context: Optional[ServiceContext] = None,
+        chunk_workers: Optional[int] = None,
+    ):
         self._index = None
         self._query_engine = None
         self._retriever = None
+        self._manifest: Dict[str, Dict] = {}
+        self._persist_dir = Path(persist_dir) if persist_dir else None
+        self._service_context = service_context
+        self._chunk_workers = chunk_workers
+
+    def _directory_files(self, directory_path) -> List[Path]:
+        # hidden files and what the ignore files of the directory ignore are not indexed
+        return list(walk_files(directory_path, hidden=False))
 
     def _load_documents_from_directory(self, directory_path) -> List[Document]:
-        def name_metadata_storer(filename: str) -> Dict:
-            return {"filename": filename}
+        return self._load_documents_from_files(self._directory_files(directory_path))
 
-        excluded_file_globs = ["*/.gpteng/*"]
+    def _load_documents_from_files(self, file_paths: List[Path]) -> List[Document]:
+        if not file_paths:
+            return []
 
         return SimpleDirectoryReader(
-            directory_path,
-            recursive=True,
-            exclude=excluded_file_globs,
-            file_metadata=name_metadata_storer,
+            input_files=file_paths, file_metadata=_name_metadata_storer
         ).load_data()
 
     def load_from_directory(self, directory_path: str):
+        if self._persist_dir is not None and self._load_persisted_index():
+            self.update_from_directory(directory_path)
+            return
+
         documents = self._load_documents_from_directory(directory_path)
+        chunked_documents = _chunk_documents(documents, self._chunk_workers)
 
-        chunked_langchain_documents = DocumentChunker.chunk_documents(
-            [doc.to_langchain_format() for doc in documents]
+        self._index = VectorStoreIndex.from_documents(
+            chunked_documents, service_context=self._service_context
         )
+        self._query_engine = None
+        self._retriever = None
+
+        if self._persist_dir is not None:
+            self._manifest, _, _ = _diff_files(
+                self._directory_files(directory_path), directory_path, {}
+            )
+            _assign_documents(self._manifest, chunked_documents, directory_path)
+            self._persist()
+
+    def update_from_directory(self, directory_path: str) -> IndexUpdate:
+        """
+        Bring a loaded index up to date with the files in a directory.
 
-        chunked_documents = [
-            Document.from_langchain_format(doc) for doc in chunked_langchain_documents
-        ]
+        Files are compared with the manifest of the index. Only added and modified files
+        are read and chunked again, and the index documents of modified and removed files
+        are deleted. The BM25 retriever is rebuilt on next use, so its term statistics
+        match the updated documents.
 
-        self._index = VectorStoreIndex.from_documents(chunked_documents)
+        Returns
+        -------
+        IndexUpdate
+            The files that were re-indexed.
+        """
+        if self._index is None:
+            raise ValueError("Index has not been loaded yet.")
+
+        self._manifest, update, stale_doc_ids = _diff_files(
+            self._directory_files(directory_path),
+            directory_path,
+            self._manifest,
+        )
+        if update.files_touched == 0:
+            return update
+
+        for doc_id in stale_doc_ids:
+            self._index.delete_ref_doc(doc_id, delete_from_docstore=True)
+
+        documents = self._load_documents_from_files(
+            [Path(directory_path) / name for name in update.added + update.modified]
+        )
+        chunked_documents = _chunk_documents(documents, self._chunk_workers)
+        for document in chunked_documents:
+            self._index.insert(document)
+        _assign_documents(self._manifest, chunked_documents, directory_path)
+
+        self._query_engine = None
+        self._retriever = None
+        if self._persist_dir is not None:
+            self._persist()
+
+        logger.info(
+            f"Re-indexed {update.files_touched} files: {len(update.added)} added, "
+            f"{len(update.modified)} modified, {len(update.removed)} removed"
+        )
+        return update
+
+    def _load_persisted_index(self) -> bool:
+        manifest = _read_manifest(self._persist_dir)
+        if manifest is None:
+            return False
+
+        try:
+            storage_context = StorageContext.from_defaults(
+                persist_dir=str(self._persist_dir)
+            )
+            self._index = load_index_from_storage(
+                storage_context, service_context=self._service_context
+            )
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not load index from {self._persist_dir}: {e}")
+            return False
+
+        self._manifest = manifest
+        self._query_engine = None
+        self._retriever = None
+        return True
+
+    def _persist(self) -> None:
+        self._index.storage_context.persist(persist_dir=str(self._persist_dir))
+        _write_manifest(self._persist_dir, self._manifest)
 
     def query(self, query_string: str):
         """
@@ -69,3 +203,91 @@ class CodeVectorRepository:
             self._retriever = BM25Retriever.from_defaults(self._index, similarity_top_k=2)
 
         return self._retriever.retrieve(query_string)
+
+
+def _name_metadata_storer(filename: str) -> Dict:
+    return {"filename": filename}
+
+
+def _chunk_documents(
+    documents: List[Document], workers: Optional[int] = None
+) -> List[Document]:
+    chunked_langchain_documents = DocumentChunker.chunk_documents(
+        [doc.to_langchain_format() for doc in documents], workers
+    )
+
+    return [Document.from_langchain_format(doc) for doc in chunked_langchain_documents]
+
+
+def _read_manifest(persist_dir: Path) -> Optional[Dict[str, Dict]]:
+    try:
+        manifest = json.loads((persist_dir / MANIFEST_FILE_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest["files"]
+
+
+def _write_manifest(persist_dir: Path, files: Dict[str, Dict]) -> None:
+    persist_dir.mkdir(parents=True, exist_ok=True)
+    (persist_dir / MANIFEST_FILE_NAME).write_text(
+        json.dumps({"version": MANIFEST_VERSION, "files": files}, indent=1)
+    )
+
+
+def _diff_files(
+    file_paths: List[Path],
+    directory_path: Union[str, Path],
+    previous: Dict[str, Dict],
+) -> Tuple[Dict[str, Dict], IndexUpdate, List[str]]:
+    """
+    Describe the files of a directory and compare them with a previous manifest.
+
+    A file whose size and modification time match the previous manifest is not hashed
+    again. Changed and new files get an entry without index documents. Returns the new
+    manifest, the changed files and the index documents of modified and removed files.
+    """
+    files = {}
+    added, modified = [], []
+    for file_path in file_paths:
+        name = os.path.relpath(file_path, directory_path)
+        stat = Path(file_path).stat()
+        known = previous.get(name)
+
+        if known and (known["size"], known["mtime_ns"]) == (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            files[name] = known
+            continue
+
+        sha256 = hashlib.sha256(Path(file_path).read_bytes()).hexdigest()
+        if known and known["sha256"] == sha256:
+            files[name] = {**known, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            continue
+
+        files[name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "doc_ids": [],
+        }
+        (modified if known else added).append(name)
+
+    removed = [name for name in previous if name not in files]
+    stale_doc_ids = [
+        doc_id for name in modified + removed for doc_id in previous[name]["doc_ids"]
+    ]
+    return files, IndexUpdate(added, modified, removed), stale_doc_ids
+
+
+def _assign_documents(
+    files: Dict[str, Dict],
+    chunked_documents: List[Document],
+    directory_path: Union[str, Path],
+) -> None:
+    for document in chunked_documents:
+        name = os.path.relpath(document.metadata["filename"], directory_path)
+        if name in files:
+            files[name]["doc_ids"].append(document.doc_id)
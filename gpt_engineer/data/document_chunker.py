@@ -1,11 +1,48 @@
-from typing import Any, List, Dict, NamedTuple
+import os
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Any, List, Dict, NamedTuple, Optional
 from pathlib import Path
 from collections import defaultdict
+from functools import lru_cache
 from langchain.text_splitter import TextSplitter
 from langchain.docstore.document import Document
 from gpt_engineer.data.supported_languages import SUPPORTED_LANGUAGES
 import tree_sitter_languages
 
+# Below this many code documents, starting worker processes costs more than it saves
+PARALLEL_CHUNKING_MIN_DOCUMENTS = 64
+
+# tree-sitter parsers are not thread-safe, so the pool keeps one parser per language
+# and thread. Loading a language from the bundled library is what makes parsers costly.
+_parser_pool = threading.local()
+
+
+def get_parser(language: str) -> Any:
+    """
+    Get the parser of a language from the process-wide pool, creating it on first use.
+
+    Parameters
+    ----------
+    language : str
+        The tree-sitter name of the language.
+
+    Returns
+    -------
+    tree_sitter.Parser
+        A parser for the language, owned by the calling thread.
+    """
+    parsers = getattr(_parser_pool, "parsers", None)
+    if parsers is None:
+        parsers = _parser_pool.parsers = {}
+
+    parser = parsers.get(language)
+    if parser is None:
+        parser = parsers[language] = tree_sitter_languages.get_parser(language)
+    return parser
+
 
 class CodeSplitter(TextSplitter):
     """Split code using a AST parser."""
@@ -50,7 +87,7 @@ class CodeSplitter(TextSplitter):
         """Split incoming code and return chunks using the AST."""
 
         try:
-            parser = tree_sitter_languages.get_parser(self.language)
+            parser = get_parser(self.language)
         except Exception as e:
             print(
                 f"Could not get parser for language {self.language}. Check "
@@ -75,25 +112,72 @@ class SortedDocuments(NamedTuple):
 
 
 class DocumentChunker:
-    def chunk_documents(documents: List[Document]) -> List[Document]:
-        chunked_documents = []
-
+    @staticmethod
+    def chunk_documents(
+        documents: List[Document], workers: Optional[int] = None
+    ) -> List[Document]:
+        """
+        Split code documents into chunks along their syntax tree.
+
+        Large inputs are chunked in a pool of worker processes. The chunks are returned
+        in the same order as when chunking serially: grouped by language, then in the
+        order of the input documents.
+
+        Parameters
+        ----------
+        documents : List[Document]
+            The documents to chunk. Documents that are not code are left out.
+        workers : Optional[int], optional
+            The number of worker processes, by default one per CPU. With 1, or fewer than
+            `PARALLEL_CHUNKING_MIN_DOCUMENTS` code documents, chunking runs in-process.
+
+        Returns
+        -------
+        List[Document]
+            The chunks of the code documents.
+        """
         sorted_documents = _sort_documents_by_programming_language_or_other(documents)
 
-        for language, language_documents in sorted_documents.by_language.items():
-            code_splitter = CodeSplitter(
-                language=language.lower(),
-                chunk_lines=40,
-                chunk_lines_overlap=15,
-                max_chars=1500,
-            )
-
-            chunked_documents.extend(code_splitter.split_documents(language_documents))
+        code_documents = list(chain.from_iterable(sorted_documents.by_language.values()))
+        workers = workers or os.cpu_count() or 1
 
         # for now only include code files!
         # chunked_documents.extend(sorted_documents.other)
 
-        return chunked_documents
+        if workers == 1 or len(code_documents) < PARALLEL_CHUNKING_MIN_DOCUMENTS:
+            chunked_documents = []
+            for language, language_documents in sorted_documents.by_language.items():
+                code_splitter = _code_splitter(language.lower())
+
+                chunked_documents.extend(
+                    code_splitter.split_documents(language_documents)
+                )
+            return chunked_documents
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks_per_document = pool.map(
+                _chunk_document,
+                code_documents,
+                chunksize=max(1, len(code_documents) // (workers * 4)),
+            )
+            return list(chain.from_iterable(chunks_per_document))
+
+
+def _chunk_document(document: Document) -> List[Document]:
+    code_splitter = _code_splitter(
+        document.metadata["code_language_tree_sitter_name"].lower()
+    )
+    return code_splitter.split_documents([document])
+
+
+@lru_cache(maxsize=None)
+def _code_splitter(language: str) -> CodeSplitter:
+    return CodeSplitter(
+        language=language,
+        chunk_lines=40,
+        chunk_lines_overlap=15,
+        max_chars=1500,
+    )
 
 
 @staticmethod
@@ -10,11 +10,14 @@ databases like memory, logs, preprompts, etc.
 Functions:
     archive(dbs: DBs) -> None:
         Archives the memory and workspace databases, moving their contents to
-        the archive database with a timestamp.
+        the archive database with a timestamp. The workspace is snapshotted
+        incrementally, and its files are stored once per distinct content, see
+        `ArchiveStore`.
 
 Classes:
     DB:
-        A simple key-value store implemented as a file-based system.
+        A simple key-value store implemented as a file-based system, optionally with an
+        in-memory write-back cache.
 
     DBs:
         A dataclass containing multiple DB instances representing different databases.
@@ -28,12 +31,24 @@ Imports:
 """
 
 import datetime
+import os
 import shutil
+import tempfile
+import threading
+import time
 
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Optional, Union
-from gpt_engineer.data.supported_languages import SUPPORTED_LANGUAGES
+from typing import Any, Dict, Iterator, Optional, Set, Union
+from gpt_engineer.data.archive_store import ArchiveStore
+from gpt_engineer.data.workspace_walker import walk_files
+
+DEFAULT_CACHE_BYTES = 16 * 1024 * 1024  # 16 MB
+METADATA_DIR = ".gpteng"
+BATCHES_DIR = "batches"  # in the metadata directory
+STALE_BATCH_SECONDS = 60 * 60  # left behind by a process that died while committing
 
 
 # This class represents a simple database that stores its data as files in a directory.
@@ -45,10 +60,21 @@ class FileRepository:
     facilitate CRUD-like interactions. It allows for quick checks on the existence of keys,
     retrieval of values based on keys, and setting new key-value pairs.
 
+    In cached mode, file contents are additionally kept in memory, up to `cache_bytes`.
+    Reads are answered from memory once a file was read, and writes only go to memory
+    until `flush` is called, or until the file is evicted as the least recently used one.
+    Code reading the directory itself, rather than through this class, must call `flush`
+    first.
+
+    Within a `batch`, writes and deletions of the thread running it are kept aside and only
+    take effect together when the batch ends without an exception.
+
     Attributes
     ----------
     path : Path
         The directory path where the database files are stored.
+    cache_bytes : Optional[int]
+        The size of the in-memory cache in bytes, or None if the cache is off.
 
     Methods
     -------
@@ -64,6 +90,15 @@ class FileRepository:
     __setitem__(key: Union[str, Path], val: str):
         Set or update the content of a file in the database.
 
+    flush():
+        Write the files changed in the cache to disk.
+
+    cached(cache_bytes: int) -> ContextManager:
+        Turn on the cache for a block of code, and flush it at the end.
+
+    batch() -> ContextManager:
+        Apply all writes and deletions of a block of code at once, or none of them.
+
     Note:
     -----
     Care should be taken when choosing keys (filenames) to avoid potential
@@ -73,7 +108,7 @@ class FileRepository:
 
     """A simple key-value store, where keys are filenames and values are file contents."""
 
-    def __init__(self, path: Union[str, Path]):
+    def __init__(self, path: Union[str, Path], cache_bytes: Optional[int] = None):
         """
         Initialize the DB class.
 
@@ -81,11 +116,29 @@ class FileRepository:
         ----------
         path : Union[str, Path]
             The path to the directory where the database files are stored.
+        cache_bytes : Optional[int], optional
+            The size of the in-memory cache in bytes, by default None for no cache.
         """
         self.path: Path = Path(path).absolute()
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_sizes = {}
+        self._cached_bytes = 0
+        self._dirty: Set[str] = set()
+        self._lock = threading.RLock()
+        self._local = threading.local()
 
         self.path.mkdir(parents=True, exist_ok=True)
 
+    @property
+    def _batch(self) -> Optional["_Batch"]:
+        # batches are per thread, other threads see the repository as it was
+        return getattr(self._local, "batch", None)
+
+    @_batch.setter
+    def _batch(self, batch: Optional["_Batch"]) -> None:
+        self._local.batch = batch
+
     def __contains__(self, key: str) -> bool:
         """
         Check if a file with the specified name exists in the database.
@@ -100,6 +153,12 @@ class FileRepository:
         bool
             True if the file exists, False otherwise.
         """
+        if self._batch is not None and self._batch.knows(str(key)):
+            return self._batch.read(str(key)) is not None
+        if self.cache_bytes is not None:
+            with self._lock:
+                if str(key) in self._cache:
+                    return True
         return (self.path / key).is_file()
 
     def __getitem__(self, key: str) -> str:
@@ -121,12 +180,23 @@ class FileRepository:
         KeyError
             If the file does not exist in the database.
         """
-        full_path = self.path / key
+        if self._batch is not None and self._batch.knows(str(key)):
+            val = self._batch.read(str(key))
+            if val is None:
+                raise KeyError(f"File '{key}' was deleted from '{self.path}'")
+            return val
 
-        if not full_path.is_file():
-            raise KeyError(f"File '{key}' could not be found in '{self.path}'")
-        with full_path.open("r", encoding="utf-8") as f:
-            return f.read()
+        if self.cache_bytes is None:
+            return self._read(key)
+
+        with self._lock:
+            if str(key) in self._cache:
+                self._cache.move_to_end(str(key))
+                return self._cache[str(key)]
+
+            val = self._read(key)
+            self._cache_put(str(key), val, dirty=False)
+            return val
 
     def get(self, key: str, default: Optional[Any] = None) -> Any:
         """
@@ -170,10 +240,18 @@ class FileRepository:
 
         assert isinstance(val, str), "val must be str"
 
-        full_path = self.path / key
-        full_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._batch is not None:
+            self._batch.write(str(key), val)
+            return
 
-        full_path.write_text(val, encoding="utf-8")
+        if self.cache_bytes is None:
+            self._write(str(key), val)
+            return
+
+        with self._lock:
+            if not self._cache_put(str(key), val, dirty=True):
+                self._cache_pop(str(key))
+                self._write(str(key), val)
 
     def __delitem__(self, key: Union[str, Path]) -> None:
         """
@@ -189,42 +267,260 @@ class FileRepository:
         KeyError
             If the file or directory does not exist in the database.
         """
-        item_path = self.path / key
-        if not item_path.exists():
-            raise KeyError(f"Item '{key}' could not be found in '{self.path}'")
+        with self._lock:
+            if self._batch is not None:
+                if str(key) not in self and not (self.path / key).exists():
+                    raise KeyError(f"Item '{key}' could not be found in '{self.path}'")
+                self._batch.delete(str(key))
+                return
+
+            # a changed file may not have been written yet
+            cached = self._cache_pop(str(key))
+            prefix = str(key).rstrip("/") + "/"
+            for cached_key in [k for k in self._cache if k.startswith(prefix)]:
+                cached = self._cache_pop(cached_key) or cached
+
+            item_path = self.path / key
+            if not item_path.exists():
+                if cached:
+                    return
+                raise KeyError(f"Item '{key}' could not be found in '{self.path}'")
+
+            if item_path.is_file():
+                item_path.unlink()
+            elif item_path.is_dir():
+                shutil.rmtree(item_path)
+
+    def flush(self) -> None:
+        """
+        Write the files changed in the cache to disk. They stay in the cache.
+        """
+        with self._lock:
+            for key in sorted(self._dirty):
+                self._write(key, self._cache[key])
+            self._dirty.clear()
+
+    @contextmanager
+    def cached(self, cache_bytes: int = DEFAULT_CACHE_BYTES) -> Iterator[None]:
+        """
+        Cache files in memory for the duration of a block, e.g. while applying many edits
+        to the same files, and flush the changes to disk at the end.
+
+        If the cache is already on, it is left as it is, and is only flushed.
+
+        Parameters
+        ----------
+        cache_bytes : int, optional
+            The size of the cache in bytes, by default `DEFAULT_CACHE_BYTES`.
+        """
+        with self._lock:
+            enabled = self.cache_bytes is None
+            if enabled:
+                self.cache_bytes = cache_bytes
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.flush()
+                if enabled:
+                    self.cache_bytes = None
+                    self._cache.clear()
+                    self._cache_sizes.clear()
+                    self._cached_bytes = 0
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Apply the writes and deletions of a block of code all at once when it ends, or not
+        at all if it raises.
+
+        Writes are kept in memory until the batch ends. On success, every written file is
+        staged once in the `.gpteng` metadata directory, on the same file system, the
+        staging directory is synced once, and the files are renamed into place; otherwise the writes are dropped and the repository is
+        left as it was. The batch only covers the thread running it, and a batch within a
+        batch joins the outer one.
+        """
+        if self._batch is not None:
+            yield
+            return
+
+        staging_root = _metadata_dir(self.path) / BATCHES_DIR
+        _remove_stale_batches(staging_root)
+        with self._lock:
+            self.flush()
+        self._batch = _Batch()
+        try:
+            yield
+        finally:
+            batch, self._batch = self._batch, None
+
+        with self._lock:
+            # drops what other threads read before the batch took effect
+            for key in list(self._cache):
+                if batch.knows(key):
+                    self._cache_pop(key)
+            batch.commit(self.path, staging_root)
+
+    def _read(self, key: Union[str, Path]) -> str:
+        full_path = self.path / key
+
+        if not full_path.is_file():
+            raise KeyError(f"File '{key}' could not be found in '{self.path}'")
+        with full_path.open("r", encoding="utf-8") as f:
+            return f.read()
 
-        if item_path.is_file():
-            item_path.unlink()
-        elif item_path.is_dir():
-            shutil.rmtree(item_path)
+    def _write(self, key: str, val: str) -> None:
+        full_path = self.path / key
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+
+        full_path.write_text(val, encoding="utf-8")
+
+    def _cache_put(self, key: str, val: str, dirty: bool) -> bool:
+        # returns False if the content is too large for the cache
+        size = len(val.encode("utf-8"))
+        if size > self.cache_bytes:
+            return False
+
+        self._cache_pop(key)
+        self._cache[key] = val
+        self._cache_sizes[key] = size
+        self._cached_bytes += size
+        if dirty:
+            self._dirty.add(key)
+
+        while self._cached_bytes > self.cache_bytes:
+            evicted, evicted_val = next(iter(self._cache.items()))
+            if evicted in self._dirty:
+                self._write(evicted, evicted_val)
+            self._cache_pop(evicted)
+        return True
+
+    def _cache_pop(self, key: str) -> bool:
+        # drops a file from the cache without writing it, returns whether it was changed
+        self._cache.pop(key, None)
+        self._cached_bytes -= self._cache_sizes.pop(key, 0)
+        dirty = key in self._dirty
+        self._dirty.discard(key)
+        return dirty
 
     def _supported_files(self, directory: Path) -> str:
-        valid_extensions = {
-            ext for lang in SUPPORTED_LANGUAGES for ext in lang["extensions"]
-        }
-        file_paths = [
-            str(item)
-            for item in sorted(directory.rglob("*"))
-            if item.is_file() and item.suffix in valid_extensions
-        ]
-        return "\n".join(file_paths)
+        return "\n".join(str(item) for item in walk_files(directory, supported_only=True))
 
     def _all_files(self, directory: Path) -> str:
-        file_paths = [
-            str(item) for item in sorted(directory.rglob("*")) if item.is_file()
-        ]
-        return "\n".join(file_paths)
+        return "\n".join(str(item) for item in walk_files(directory))
 
     def to_path_list_string(self, supported_code_files_only: bool = False) -> str:
         """
         Returns directory as a list of file paths. Useful for passing to the LLM where it needs to understand the wider context of files available for reference.
+
+        Files ignored by the `.gitignore` and `.gpteignore` files of the directory are left
+        out, see `walk_files`.
         """
+        self.flush()
         if supported_code_files_only:
             return self._supported_files(self.path)
         else:
             return self._all_files(self.path)
 
 
+class _Batch:
+    # the writes and deletions kept aside by `FileRepository.batch`
+
+    def __init__(self):
+        self.contents: Dict[str, str] = {}
+        self.deleted: Set[str] = set()
+
+    def knows(self, key: str) -> bool:
+        return key in self.contents or self._deleted(key)
+
+    def read(self, key: str) -> Optional[str]:
+        # None if the file was deleted in the batch
+        return self.contents.get(key)
+
+    def write(self, key: str, val: str) -> None:
+        self.contents[key] = val
+
+    def delete(self, key: str) -> None:
+        prefix = key.rstrip("/") + "/"
+        for written in [k for k in self.contents if k == key or k.startswith(prefix)]:
+            del self.contents[written]
+        self.deleted.add(key)
+
+    def commit(self, root: Path, staging_root: Path) -> None:
+        staging_root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f"{root.name}-", dir=staging_root))
+        try:
+            # staged flat, so that no directories have to be created before the renames
+            staged = {}
+            for key, val in self.contents.items():
+                path = staging / str(len(staged))
+                path.write_text(val, encoding="utf-8")
+                staged[key] = path
+            # a single sync for the whole batch, rather than one per file
+            _fsync_dir(staging)
+
+            for key in self.deleted:
+                path = root / key
+                if path.is_dir():
+                    shutil.rmtree(path)
+                elif path.exists():
+                    path.unlink()
+
+            created = set()
+            for key, path in staged.items():
+                target = root / key
+                if target.parent not in created:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    created.add(target.parent)
+                try:
+                    os.replace(path, target)
+                except OSError:  # e.g. the repository is a mount point
+                    shutil.move(str(path), str(target))
+            _fsync_dir(root)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _deleted(self, key: str) -> bool:
+        parts = Path(key).parts
+        return any(
+            Path(deleted).parts == parts[: len(Path(deleted).parts)]
+            for deleted in self.deleted
+        )
+
+
+def _metadata_dir(path: Path) -> Path:
+    # the `.gpteng` directory of the project a repository belongs to
+    for directory in [path, *path.parents]:
+        if directory.name == METADATA_DIR:
+            return directory
+    return path / METADATA_DIR
+
+
+def _remove_stale_batches(staging_root: Path) -> None:
+    if not staging_root.is_dir():
+        return
+    for staging in staging_root.iterdir():
+        try:
+            if time.time() - staging.stat().st_mtime > STALE_BATCH_SECONDS:
+                shutil.rmtree(staging, ignore_errors=True)
+        except OSError:  # removed by another process in the meantime
+            pass
+
+
+def _fsync_dir(path: Path) -> None:
+    # makes the entries of a directory durable, where directories can be opened
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # e.g. on Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
 # dataclass for all dbs:
 @dataclass
 class FileRepositories:
@@ -246,19 +542,11 @@ def archive(dbs: FileRepositories) -> None:
     dbs : DBs
         The databases to archive.
     """
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    shutil.move(
-        str(dbs.memory.path), str(dbs.archive.path / timestamp / dbs.memory.path.name)
-    )
-
-    exclude_dir = ".gpteng"
-    items_to_copy = [f for f in dbs.workspace.path.iterdir() if not f.name == exclude_dir]
-
-    for item_path in items_to_copy:
-        destination_path = dbs.archive.path / timestamp / item_path.name
-        if item_path.is_file():
-            shutil.copy2(item_path, destination_path)
-        elif item_path.is_dir():
-            shutil.copytree(item_path, destination_path)
+    dbs.memory.flush()
+    dbs.workspace.flush()
+    store = ArchiveStore(dbs.archive.path)
+    name = store.unused_name(datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
+    store.snapshot(dbs.workspace.path, name, exclude=[METADATA_DIR])
+    shutil.move(str(dbs.memory.path), str(dbs.archive.path / name / dbs.memory.path.name))
 
     return []
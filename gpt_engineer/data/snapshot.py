@@ -0,0 +1,177 @@
+"""
+Module for cheap snapshots of directories, as taken by `archive`.
+
+A snapshot is a plain copy of a directory tree, so old snapshots stay readable with any tool.
+Copying every file on every run is slow for big projects and duplicates their size on disk,
+though, while most files are the same as in the previous snapshot. This module therefore
+takes snapshots incrementally:
+
+- A file with the same size and modification time as in the previous snapshot is hardlinked
+  to it. Snapshots are never modified, so sharing their files is safe.
+- Any other file is cloned where the file system supports reflinks (copy-on-write copies,
+  e.g. on Btrfs and XFS), and copied otherwise.
+- Symbolic links are snapshotted as links and never followed, so links to directories
+  outside the tree, or cycles of links, cannot blow up a snapshot.
+
+`ArchiveStore` additionally deduplicates the files of the snapshots by content.
+
+Functions:
+    snapshot_directory(source, destination, previous, exclude) -> SnapshotStats:
+        Take an incremental snapshot of a directory.
+
+Classes:
+    SnapshotStats:
+        The number of files linked, cloned and copied by a snapshot.
+"""
+
+import logging
+import os
+import shutil
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Collection, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl request cloning a whole file on Linux, _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+@dataclass
+class SnapshotStats:
+    """
+    The number of files a snapshot linked to the previous snapshot, cloned and copied, the
+    number of symbolic links it recreated, and whether the file system supports reflinks.
+    Once cloning failed, files are copied without trying again.
+    """
+
+    linked: int = 0
+    cloned: int = 0
+    copied: int = 0
+    symlinks: int = 0
+    reflinks: bool = True
+
+
+def snapshot_directory(
+    source: Path,
+    destination: Path,
+    previous: Optional[Path] = None,
+    exclude: Collection[str] = (),
+) -> SnapshotStats:
+    """
+    Snapshot the files of a directory tree into a new directory.
+
+    Parameters
+    ----------
+    source : Path
+        The directory to snapshot.
+    destination : Path
+        The directory to snapshot into. It is created if it does not exist.
+    previous : Optional[Path], optional
+        The previous snapshot of `source`, on the same file system, by default None.
+    exclude : Collection[str], optional
+        Names of entries at the top level of `source` to leave out, by default none.
+
+    Returns
+    -------
+    SnapshotStats
+        How many files were linked, cloned and copied.
+    """
+    stats = SnapshotStats()
+    destination.mkdir(parents=True, exist_ok=True)
+
+    for directory, dir_names, file_names in os.walk(source):
+        relative = Path(directory).relative_to(source)
+        if relative == Path("."):
+            dir_names[:] = [name for name in dir_names if name not in exclude]
+            file_names = [name for name in file_names if name not in exclude]
+
+        for name in list(dir_names):
+            if os.path.islink(os.path.join(directory, name)):
+                # os.walk does not follow links to directories either
+                _snapshot_link(
+                    Path(directory) / name, destination / relative / name, stats
+                )
+                dir_names.remove(name)
+            else:
+                (destination / relative / name).mkdir(exist_ok=True)
+
+        for name in file_names:
+            source_file = Path(directory) / name
+            if source_file.is_symlink():
+                _snapshot_link(source_file, destination / relative / name, stats)
+                continue
+            previous_file = previous / relative / name if previous else None
+            _snapshot_file(
+                source_file, destination / relative / name, previous_file, stats
+            )
+
+    logger.debug(f"Snapshot of {source} into {destination}: {stats}")
+    return stats
+
+
+def _snapshot_file(
+    source: Path, destination: Path, previous: Optional[Path], stats: SnapshotStats
+) -> None:
+    # a file there may be linked to other snapshots, it is replaced and never written to
+    _remove(destination)
+    if previous is not None and _unchanged(source, previous):
+        try:
+            os.link(previous, destination)
+            stats.linked += 1
+            return
+        except OSError:  # e.g. too many links, or links not supported
+            pass
+
+    if stats.reflinks and _clone(source, destination):
+        stats.cloned += 1
+        return
+
+    stats.reflinks = False
+    shutil.copy2(source, destination)
+    stats.copied += 1
+
+
+def _snapshot_link(source: Path, destination: Path, stats: SnapshotStats) -> None:
+    _remove(destination)
+    try:
+        os.symlink(os.readlink(source), destination)
+        stats.symlinks += 1
+    except OSError as e:  # e.g. on Windows without the privilege to create links
+        logger.warning(f"Left out the link {source} from the snapshot: {e}")
+
+
+def _unchanged(source: Path, previous: Path) -> bool:
+    # the quick check of rsync: copies keep the size and modification time of the file
+    try:
+        source_stat, previous_stat = source.stat(), previous.stat()
+    except OSError:
+        return False
+    return (
+        source_stat.st_size == previous_stat.st_size
+        and source_stat.st_mtime_ns == previous_stat.st_mtime_ns
+    )
+
+
+def _clone(source: Path, destination: Path) -> bool:
+    if fcntl is None or not hasattr(fcntl, "ioctl"):
+        return False
+    try:
+        with open(source, "rb") as src, open(destination, "xb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        destination.unlink(missing_ok=True)
+        return False
+    shutil.copystat(source, destination)
+    return True
+
+
+def _remove(path: Path) -> None:
+    if os.path.lexists(path):
+        path.unlink()
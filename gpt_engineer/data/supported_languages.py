@@ -47,3 +47,8 @@ SUPPORTED_LANGUAGES = [
     #     "tree_sitter_name": "swift"
     # },
 ]
+
+# the extensions of all supported languages, for quick lookups
+SUPPORTED_EXTENSIONS = frozenset(
+    extension for language in SUPPORTED_LANGUAGES for extension in language["extensions"]
+)
@@ -0,0 +1,202 @@
+"""
+Module for walking the files of a workspace, as a user of the project would see them.
+
+Listing a project with `Path.rglob` visits every file in it, including version control
+metadata, installed dependencies, virtual environments and the `.gpteng` folder, which can
+be orders of magnitude more files than the project itself. The walker lists directories with
+`os.scandir` instead, and does not descend into directories that are ignored, either always,
+see `IGNORED_DIRECTORIES`, or by the `.gitignore` and `.gpteignore` files of the project.
+Ignore files apply to the directory they are in and below, with the pattern syntax of git.
+
+Files are yielded as they are found, in the order of the sorted paths.
+
+Classes:
+    IgnoreRules:
+        The ignore patterns in effect in a directory of a walked tree.
+
+Functions:
+    scan_directory(directory, rules) -> (IgnoreRules, List[os.DirEntry]):
+        List the entries of a directory that are not ignored.
+    walk_files(root, supported_only, hidden) -> Iterator[Path]:
+        Yield the files of a directory tree that are not ignored.
+"""
+
+import os
+
+from pathlib import Path
+from typing import Collection, Iterator, List, Optional, Tuple, Union
+
+from pathspec import GitIgnoreSpec
+
+from gpt_engineer.data.supported_languages import SUPPORTED_EXTENSIONS
+
+IGNORE_FILE_NAMES = (".gitignore", ".gpteignore")
+
+# never part of the code of a project
+IGNORED_DIRECTORIES = frozenset(
+    {
+        ".git",
+        ".gpteng",
+        "node_modules",
+        "venv",
+        ".venv",
+        "site-packages",
+        "__pycache__",
+    }
+)
+
+
+class IgnoreRules:
+    """
+    The ignore patterns in effect in a directory of a walked tree.
+
+    Attributes
+    ----------
+    root : Path
+        The root of the walked tree, which patterns are relative to.
+    """
+
+    def __init__(self, root: Union[str, Path], lines: Tuple[str, ...] = ()):
+        self.root = Path(root)
+        self._lines = lines
+        self._spec: Optional[GitIgnoreSpec] = (
+            GitIgnoreSpec.from_lines(lines) if lines else None
+        )
+
+    def enter(self, directory: Path, names: Collection[str]) -> "IgnoreRules":
+        """
+        Return the rules in effect in a directory, adding those of its ignore files.
+
+        Parameters
+        ----------
+        directory : Path
+            The directory, within the tree of `root`.
+        names : Collection[str]
+            The names of the entries of the directory, to read only existing ignore files.
+
+        Returns
+        -------
+        IgnoreRules
+            These rules, extended by the ignore files of the directory, if it has any.
+        """
+        prefix = directory.relative_to(self.root).as_posix()
+        lines = []
+        for name in IGNORE_FILE_NAMES:
+            if name not in names:
+                continue
+            try:
+                text = (directory / name).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            lines += [
+                line
+                for line in (_rebase(line, prefix) for line in text.splitlines())
+                if line
+            ]
+        if not lines:
+            return self
+        return IgnoreRules(self.root, self._lines + tuple(lines))
+
+    def ignored(self, path: Path, is_dir: bool) -> bool:
+        """
+        Check whether a file or directory within the tree of `root` is ignored.
+        """
+        if is_dir and path.name in IGNORED_DIRECTORIES:
+            return True
+        if self._spec is None:
+            return False
+        relative = path.relative_to(self.root).as_posix()
+        return self._spec.match_file(relative + "/" if is_dir else relative)
+
+
+def scan_directory(
+    directory: Path, rules: IgnoreRules, hidden: bool = True
+) -> Tuple[IgnoreRules, List[os.DirEntry]]:
+    """
+    List the entries of a directory that are not ignored, in the order of their paths.
+
+    Parameters
+    ----------
+    directory : Path
+        The directory to list.
+    rules : IgnoreRules
+        The rules in effect in the parent directory, or at the root.
+    hidden : bool, optional
+        Whether to list hidden entries, whose names start with a dot, by default True.
+
+    Returns
+    -------
+    Tuple[IgnoreRules, List[os.DirEntry]]
+        The rules in effect in the directory, to scan its subdirectories with, and its
+        entries.
+    """
+    with os.scandir(directory) as scanned:
+        entries = list(scanned)
+    rules = rules.enter(directory, {entry.name for entry in entries})
+    entries = [
+        entry
+        for entry in entries
+        if (hidden or not entry.name.startswith("."))
+        and not rules.ignored(Path(entry.path), entry.is_dir())
+    ]
+    # paths sort by their parts, so sorting the entries of every directory by name
+    # walks the tree in the order of the sorted paths
+    entries.sort(key=lambda entry: entry.name)
+    return rules, entries
+
+
+def walk_files(
+    root: Union[str, Path], supported_only: bool = False, hidden: bool = True
+) -> Iterator[Path]:
+    """
+    Yield the files of a directory tree that are not ignored, in the order of their paths.
+
+    Links to directories are not followed.
+
+    Parameters
+    ----------
+    root : Union[str, Path]
+        The directory to walk.
+    supported_only : bool, optional
+        Whether to yield only files of the supported languages, by default False.
+    hidden : bool, optional
+        Whether to yield hidden files and walk hidden directories, by default True.
+
+    Yields
+    ------
+    Path
+        The paths of the files, starting with `root`.
+    """
+
+    def walk(directory: Path, rules: IgnoreRules) -> Iterator[Path]:
+        rules, entries = scan_directory(directory, rules, hidden)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(Path(entry.path), rules)
+            elif entry.is_file() and (
+                not supported_only
+                or os.path.splitext(entry.name)[1] in SUPPORTED_EXTENSIONS
+            ):
+                yield Path(entry.path)
+
+    root = Path(root)
+    yield from walk(root, IgnoreRules(root))
+
+
+def _rebase(line: str, prefix: str) -> Optional[str]:
+    # makes a pattern of an ignore file in the directory `prefix` relative to the root
+    line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+    if not prefix or prefix == ".":
+        return line
+
+    negated = line.startswith("!")
+    pattern = line[1:] if negated else line
+    # patterns with a slash before the end are relative to the directory of the file,
+    # others match at any depth below it
+    if "/" in pattern.rstrip("/"):
+        rebased = f"{prefix}/{pattern.lstrip('/')}"
+    else:
+        rebased = f"{prefix}/**/{pattern}"
+    return "!" + rebased if negated else rebased
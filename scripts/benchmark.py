@@ -1,21 +1,46 @@
 # list all folders in benchmark folder
 # for each folder, run the benchmark
 import contextlib
+import csv
 import json
-import os
 import subprocess
+import time
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from itertools import islice
 from pathlib import Path
-from typing import Iterable, Union
+from typing import Iterable, List, Optional, Union
 
 from tabulate import tabulate
-from typer import run
+from typer import Option, run
+
+from gpt_engineer.core.cassette import cassette_options
 
 
 def main(
     n_benchmarks: Union[int, None] = None,
+    workers: int = Option(4, help="Number of benchmarks generated at the same time."),
+    timeout: float = Option(
+        30 * 60, help="Seconds after which a benchmark generation is killed."
+    ),
+    tokens_per_minute: Optional[int] = Option(
+        None,
+        help="Token budget per minute of all benchmarks together. Unlimited if not set.",
+    ),
+    requests_per_minute: Optional[int] = Option(
+        None,
+        help="Requests per minute of all benchmarks together. Unlimited if not set.",
+    ),
+    record: Optional[Path] = Option(
+        None, help="Directory to record a cassette of every benchmark's requests to."
+    ),
+    replay: Optional[Path] = Option(
+        None, help="Directory of cassettes to replay instead of calling the model."
+    ),
+    replay_latency: float = Option(
+        0.0, help="Seconds every replayed response is delayed by."
+    ),
 ):
     path = Path("benchmark")
 
@@ -24,68 +49,115 @@ def main(
     if n_benchmarks:
         folders = islice(folders, n_benchmarks)
 
-    benchmarks = []
-    results = []
-    for bench_folder in folders:
-        if os.path.isdir(bench_folder):
-            print(f"Running benchmark for {bench_folder}")
-
-            log_path = bench_folder / "log.txt"
-            log_file = open(log_path, "w")
-            process = subprocess.Popen(
+    benchmarks = [bench_folder for bench_folder in folders if bench_folder.is_dir()]
+    # the benchmark processes share the file-locked rate limiter of gpt-engineer, which
+    # charges every request its actual tokens
+    rate_limit_args = []
+    if requests_per_minute:
+        rate_limit_args += ["--requests-per-minute", str(requests_per_minute)]
+    if tokens_per_minute:
+        rate_limit_args += ["--tokens-per-minute", str(tokens_per_minute)]
+    extra_args = {
+        bench_folder: rate_limit_args
+        + cassette_options(bench_folder.name, record, replay, replay_latency)
+        for bench_folder in benchmarks
+    }
+
+    # generation runs unattended, so it is done in a pool of workers
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                run_benchmark,
+                bench_folder,
+                timeout,
+                extra_args[bench_folder],
+            ): bench_folder
+            for bench_folder in benchmarks
+        }
+        runs = {}
+        for future in as_completed(futures):
+            run_ = future.result()
+            runs[futures[future]] = run_
+            print("process", futures[future].name, "finished with", run_["outcome"])
+
+    # evaluation asks for human review, so it is done one benchmark at a time
+    for bench_folder in benchmarks:
+        print("Running", bench_folder.name, "Original benchmark prompt:")
+        print()
+        with open(bench_folder / "prompt") as f:
+            print(f.read())
+        print()
+
+        with contextlib.suppress(KeyboardInterrupt):
+            subprocess.run(
                 [
                     "python",
-                    "-u",  # Unbuffered output
                     "-m",
                     "gpt_engineer.cli.main",
                     bench_folder,
                     "--steps",
-                    "benchmark",
+                    "evaluate",
                 ],
-                stdout=log_file,
-                stderr=log_file,
-                bufsize=0,
             )
-            benchmarks.append(bench_folder)
-            results.append((process, log_file))
 
-            print("You can stream the log file by running:")
-            print(f"tail -f {log_path}")
-            print()
+    generate_report(benchmarks, path, runs)
 
-    for bench_folder, (process, file) in zip(benchmarks, results):
-        process.wait()
-        file.close()
 
-        print("process", bench_folder.name, "finished with code", process.returncode)
-        print("Running it. Original benchmark prompt:")
-        print()
-        with open(bench_folder / "prompt") as f:
-            print(f.read())
-        print()
+def run_benchmark(
+    bench_folder: Path,
+    timeout: float,
+    extra_args: Optional[List[str]] = None,
+) -> dict:
+    """
+    Generate the code of a benchmark in a subprocess and return how it ended, how long
+    it took and the step report it logged.
+    """
+    log_path = bench_folder / "log.txt"
+    print(f"Running benchmark for {bench_folder}, stream the log with:")
+    print(f"tail -f {log_path}")
 
-        with contextlib.suppress(KeyboardInterrupt):
-            subprocess.run(
+    started = time.perf_counter()
+    with open(log_path, "w") as log_file:
+        try:
+            process = subprocess.run(
                 [
                     "python",
+                    "-u",  # Unbuffered output
                     "-m",
                     "gpt_engineer.cli.main",
                     bench_folder,
                     "--steps",
-                    "evaluate",
+                    "benchmark",
+                    *(extra_args or []),
                 ],
+                stdin=subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=log_file,
+                timeout=timeout,
             )
+            outcome = f"code {process.returncode}"
+        except subprocess.TimeoutExpired:
+            outcome = f"timeout after {timeout:.0f}s"
+    wall_time = time.perf_counter() - started
 
-    generate_report(benchmarks, path)
+    # read now, the evaluation run overwrites the logs
+    step_report = bench_folder / ".gpteng" / "memory" / "logs" / "step_report"
+    try:
+        steps = json.loads(step_report.read_text())
+    except (OSError, ValueError):
+        steps = []
+    return {"outcome": outcome, "wall_time": wall_time, "steps": steps}
 
 
-def generate_report(benchmarks, benchmark_path):
+def generate_report(benchmarks, benchmark_path, runs=None):
     headers = ["Benchmark", "Ran", "Works", "Perfect", "Notes"]
     rows = []
+    reviews = {}
     for bench_folder in benchmarks:
         memory = bench_folder / ".gpteng" / "memory"
         with open(memory / "review") as f:
             review = json.loads(f.read())
+            reviews[bench_folder] = review
             rows.append(
                 [
                     bench_folder.name,
@@ -99,6 +171,8 @@ def generate_report(benchmarks, benchmark_path):
     print("\nBenchmark report:\n")
     print(table)
     print()
+    if runs:
+        write_run_report(benchmark_path, runs, reviews)
     append_to_results = ask_yes_no("Append report to the results file?")
     if append_to_results:
         results_path = benchmark_path / "RESULTS.md"
@@ -106,6 +180,85 @@ def generate_report(benchmarks, benchmark_path):
         insert_markdown_section(results_path, current_date, table, 2)
 
 
+def write_run_report(benchmark_path: Path, runs: dict, reviews: dict) -> None:
+    """
+    Append the timings, tokens and cost of every benchmark and step of this run to
+    RESULTS.json and RESULTS.csv, next to RESULTS.md, to compare runs across commits.
+    """
+    date = datetime.now().isoformat(timespec="seconds")
+    commit = current_commit()
+
+    benchmarks = []
+    for bench_folder, run_ in runs.items():
+        review = reviews.get(bench_folder, {})
+        benchmarks.append(
+            {
+                "benchmark": bench_folder.name,
+                "outcome": run_["outcome"],
+                "wall_time": run_["wall_time"],
+                "ran": review.get("ran"),
+                "works": review.get("works"),
+                "perfect": review.get("perfect"),
+                "prompt_tokens": sum(step["prompt_tokens"] for step in run_["steps"]),
+                "completion_tokens": sum(
+                    step["completion_tokens"] for step in run_["steps"]
+                ),
+                "cost": sum(step["cost"] for step in run_["steps"]),
+                "steps": run_["steps"],
+            }
+        )
+
+    json_path = benchmark_path / "RESULTS.json"
+    try:
+        history = json.loads(json_path.read_text())
+    except (OSError, ValueError):
+        history = []
+    history.append({"date": date, "commit": commit, "benchmarks": benchmarks})
+    json_path.write_text(json.dumps(history, indent=2) + "\n")
+
+    csv_path = benchmark_path / "RESULTS.csv"
+    fields = [
+        "date",
+        "commit",
+        "benchmark",
+        "step_name",
+        "wall_time",
+        "time_to_first_token",
+        "prompt_tokens",
+        "completion_tokens",
+        "cost",
+    ]
+    write_header = not csv_path.exists()
+    with open(csv_path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fields)
+        if write_header:
+            writer.writeheader()
+        for benchmark in benchmarks:
+            for step in benchmark["steps"]:
+                writer.writerow(
+                    {
+                        "date": date,
+                        "commit": commit,
+                        "benchmark": benchmark["benchmark"],
+                        **{field: step.get(field) for field in fields[3:]},
+                    }
+                )
+
+    print(f"Timings and token usage appended to {json_path} and {csv_path}")
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
 def to_emoji(value: bool) -> str:
     return "\U00002705" if value else "\U0000274C"
 
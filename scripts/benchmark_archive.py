@@ -0,0 +1,81 @@
+# time and disk use of archiving a workspace over many runs, comparing the content-addressed
+# archive store with plain copies of the workspace as archive() took them before
+# every run changes a few files of a synthetic workspace, as an improve or feedback run would
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from pathlib import Path
+
+from typer import run
+
+from gpt_engineer.data.archive_store import ArchiveStore
+
+
+def make_workspace(path: Path, files: int, file_size: int, rng: random.Random):
+    for i in range(files):
+        file_path = path / f"pkg{i % 10}" / f"module{i}.py"
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(source(i, 0, file_size, rng))
+
+
+def source(i: int, version: int, file_size: int, rng: random.Random) -> str:
+    lines = [f"# module {i}, version {version}"]
+    while sum(len(line) + 1 for line in lines) < file_size:
+        lines.append(f"value_{len(lines)} = {rng.randint(0, 10**6)}")
+    return "\n".join(lines) + "\n"
+
+
+def change_files(path: Path, files: int, changed: int, version: int, file_size, rng):
+    for i in rng.sample(range(files), changed):
+        file_path = path / f"pkg{i % 10}" / f"module{i}.py"
+        file_path.write_text(source(i, version, file_size, rng))
+
+
+def disk_usage(path: Path) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def main(runs: int = 50, files: int = 500, file_size: int = 4000, changed: int = 10):
+    root = Path(tempfile.mkdtemp())
+    try:
+        workspace = root / "workspace"
+        make_workspace(workspace, files, file_size, random.Random(0))
+        workspace_size = disk_usage(workspace)
+
+        store = ArchiveStore(root / "store")
+        store_time = copy_time = 0.0
+        rng = random.Random(1)
+        for i in range(runs):
+            name = f"{i:08d}"
+
+            start = time.perf_counter()
+            store.snapshot(workspace, name)
+            store_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            shutil.copytree(workspace, root / "copies" / name)
+            copy_time += time.perf_counter() - start
+
+            change_files(workspace, files, changed, i + 1, file_size, rng)
+
+        print(
+            f"{runs} runs, {files} files of {file_size} bytes, {changed} changed per run"
+        )
+        print(f"workspace:      {workspace_size / 2**20:8.2f} MiB")
+        print(f"plain copies:   {disk_usage(root / 'copies') / 2**20:8.2f} MiB", end="")
+        print(f", {copy_time / runs * 1000:7.1f} ms per run")
+        print(f"archive store:  {store.disk_usage() / 2**20:8.2f} MiB", end="")
+        print(f", {store_time / runs * 1000:7.1f} ms per run")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    run(main)
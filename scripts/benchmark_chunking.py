@@ -0,0 +1,65 @@
+# time chunking of the example snake game files, one document per call as in an indexing run
+# compares the pooled tree-sitter parsers with creating a parser for every document
+import runpy
+import time
+
+from pathlib import Path
+
+import tree_sitter_languages
+
+from langchain.docstore.document import Document
+from typer import run
+
+from gpt_engineer.data import document_chunker
+from gpt_engineer.data.document_chunker import DocumentChunker
+
+EXAMPLE_FILES = Path(__file__).parent.parent / "tests" / "data" / "example_snake_files.py"
+
+EXTENSIONS = {
+    "PYTHON": ".py",
+    "HTML": ".html",
+    "CSS": ".css",
+    "JAVASCRIPT": ".js",
+    "JAVA": ".java",
+    "C_SHARP": ".cs",
+    "TYPESCRIPT": ".ts",
+    "RUBY": ".rb",
+    "PHP": ".php",
+    "GO": ".go",
+    "KOTLIN": ".kt",
+    "RUST": ".rs",
+    "C_PLUS_PLUS": ".cpp",
+}
+
+
+def time_per_file(documents, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for document in documents:
+            DocumentChunker.chunk_documents([document])
+    return (time.perf_counter() - start) / (repeat * len(documents))
+
+
+def main(repeat: int = 20):
+    sources = runpy.run_path(str(EXAMPLE_FILES))
+    documents = [
+        Document(page_content=sources[name], metadata={"filename": f"snake{extension}"})
+        for name, extension in EXTENSIONS.items()
+    ]
+
+    pooled = time_per_file(documents, repeat)
+
+    original_get_parser = document_chunker.get_parser
+    document_chunker.get_parser = tree_sitter_languages.get_parser
+    try:
+        fresh = time_per_file(documents, repeat)
+    finally:
+        document_chunker.get_parser = original_get_parser
+
+    print(f"{len(documents)} files, {repeat} rounds")
+    print(f"pooled parsers: {pooled * 1000:.3f} ms per file")
+    print(f"fresh parsers:  {fresh * 1000:.3f} ms per file")
+
+
+if __name__ == "__main__":
+    run(main)
@@ -0,0 +1,35 @@
+# time TokenUsageLog.update_log over a long conversation
+# with memoized token counts the per-turn time stays flat instead of growing
+import time
+
+from langchain.schema import AIMessage, HumanMessage, SystemMessage
+from typer import run
+
+from gpt_engineer.core.token_usage import Tokenizer, TokenUsageLog
+
+
+def main(turns: int = 50, words_per_message: int = 400, model: str = "gpt-4"):
+    token_usage_log = TokenUsageLog(model)
+    tokenizer = Tokenizer(model)
+    messages = [SystemMessage(content="You are a helpful assistant.")]
+
+    print("turn | update_log (ms) | full re-count (ms)")
+    for turn in range(turns):
+        messages.append(HumanMessage(content=f"question {turn} " * words_per_message))
+        answer = f"answer {turn} " * words_per_message
+
+        start = time.perf_counter()
+        token_usage_log.update_log(messages, answer, f"turn {turn}")
+        memoized = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tokenizer.num_tokens_from_messages(messages)
+        tokenizer.num_tokens(answer)
+        full = time.perf_counter() - start
+
+        print(f"{turn:4} | {memoized * 1000:15.2f} | {full * 1000:18.2f}")
+        messages.append(AIMessage(content=answer))
+
+
+if __name__ == "__main__":
+    run(main)
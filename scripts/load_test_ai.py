@@ -0,0 +1,69 @@
+# Load test of the AI class against the local stub OpenAI server.
+#
+# Sends `n_requests` conversations through AI.astart, at most `concurrency` at a time,
+# to a stub server streaming at `tokens_per_second` and rejecting every
+# `rate_limit_every`-th request with a 429. Reports the throughput and how often the
+# exponential backoff of AI had to retry.
+import asyncio
+import statistics
+import time
+
+from typing import List
+
+from typer import run
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.stub_openai_server import StubConfig, StubOpenAIServer
+
+
+async def run_load(ai: AI, n_requests: int, concurrency: int) -> List[float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def converse(i: int) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            await ai.astart("You are a load test.", f"Request {i}", step_name="load")
+            return time.perf_counter() - started
+
+    return list(await asyncio.gather(*(converse(i) for i in range(n_requests))))
+
+
+def main(
+    n_requests: int = 50,
+    concurrency: int = 8,
+    tokens_per_second: float = 200.0,
+    latency: float = 0.1,
+    rate_limit_every: int = 5,
+    response_words: int = 100,
+    model: str = "gpt-4",
+):
+    config = StubConfig(
+        responses=[" ".join(["token"] * response_words)],
+        tokens_per_second=tokens_per_second,
+        latency=latency,
+        rate_limit_every=rate_limit_every,
+    )
+    with StubOpenAIServer(config) as server:
+        ai = AI(model, skip_model_check=True, api_base=server.api_base)
+        # leave retries on rate limits to the backoff of AI.abackoff_inference
+        ai.llm.max_retries = 1
+
+        started = time.perf_counter()
+        durations = asyncio.run(run_load(ai, n_requests, concurrency))
+        elapsed = time.perf_counter() - started
+        stats = server.stats
+
+    durations.sort()
+    print(f"Requests:           {n_requests} ({concurrency} concurrent)")
+    print(f"Total time:         {elapsed:.2f}s")
+    print(f"Throughput:         {n_requests / elapsed:.2f} conversations/s")
+    print(f"Streamed tokens:    {stats.tokens_streamed / elapsed:.0f} tokens/s")
+    print(f"Latency p50 / p95:  {statistics.median(durations):.2f}s / ", end="")
+    print(f"{durations[int(0.95 * (len(durations) - 1))]:.2f}s")
+    print(f"HTTP requests:      {stats.requests}")
+    print(f"Rate limited (429): {stats.rate_limited}")
+    print(f"Backoff retries:    {stats.requests - n_requests}")
+
+
+if __name__ == "__main__":
+    run(main)
@@ -0,0 +1,50 @@
+from dataclasses import fields
+from typing import Callable
+
+import pytest
+
+from langchain.chat_models.fake import FakeListChatModel
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.data.file_repository import FileRepositories, FileRepository
+
+
+@pytest.fixture
+def fake_chat_model(monkeypatch) -> Callable[..., None]:
+    """
+    Let every AI created afterwards answer with the given responses, in turn, instead of
+    calling the model. The model check is skipped, unless `check_model` is set.
+    """
+
+    def use(*responses: str, check_model: bool = False) -> None:
+        monkeypatch.setattr(
+            AI,
+            "_create_chat_model",
+            lambda self: FakeListChatModel(responses=list(responses)),
+        )
+        if not check_model:
+            monkeypatch.setattr(
+                AI, "_check_model_access_and_fallback", lambda self, name: name
+            )
+
+    return use
+
+
+@pytest.fixture
+def make_dbs(tmp_path) -> Callable[..., FileRepositories]:
+    """
+    Create file repositories in directories named after them, in `tmp_path` or the given
+    directory. Repositories passed by name are used instead.
+    """
+
+    def make(path=None, **repositories: FileRepository) -> FileRepositories:
+        path = path or tmp_path
+        return FileRepositories(
+            **{
+                field.name: repositories.get(field.name)
+                or FileRepository(path / field.name)
+                for field in fields(FileRepositories)
+            }
+        )
+
+    return make
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import zlib
+
+import pytest
+
+from gpt_engineer.data.archive_store import ArchiveStore
+
+
+def make_workspace(tmp_path):
+    workspace = tmp_path / "workspace"
+    (workspace / "src").mkdir(parents=True)
+    (workspace / ".gpteng").mkdir()
+    (workspace / "main.py").write_text("print('hello')")
+    (workspace / "src" / "util.py").write_text("x = 1")
+    (workspace / "src" / "copy.py").write_text("x = 1")
+    (workspace / ".gpteng" / "file_list.txt").write_text("main.py")
+    return workspace
+
+
+def test_identical_files_are_stored_once(tmp_path):
+    workspace = make_workspace(tmp_path)
+    store = ArchiveStore(tmp_path / "archive")
+
+    first = store.snapshot(workspace, "20231001_000000", exclude=[".gpteng"])
+    (workspace / "main.py").write_text("print('goodbye')")
+    second = store.snapshot(workspace, "20231002_000000", exclude=[".gpteng"])
+
+    assert (first.files, first.new_blobs) == (3, 2)
+    assert (second.files, second.new_blobs) == (3, 1)
+    assert store.snapshots() == ["20231001_000000", "20231002_000000"]
+
+    # the snapshots stay readable, with unchanged files shared
+    old, new = (
+        tmp_path / "archive" / "20231001_000000",
+        tmp_path / "archive" / "20231002_000000",
+    )
+    assert (old / "main.py").read_text() == "print('hello')"
+    assert (new / "main.py").read_text() == "print('goodbye')"
+    assert os.path.samefile(old / "src" / "util.py", new / "src" / "util.py")
+    assert not (new / ".gpteng").exists()
+
+    restored = tmp_path / "restored"
+    assert store.restore("20231001_000000", restored) == 3
+    assert (restored / "main.py").read_text() == "print('hello')"
+    assert (restored / "src" / "copy.py").read_text() == "x = 1"
+    assert not (restored / ".gpteng").exists()
+
+
+def test_prune_deletes_old_snapshots_and_their_blobs(tmp_path):
+    workspace = make_workspace(tmp_path)
+    store = ArchiveStore(tmp_path / "archive")
+    store.snapshot(workspace, "20231001_000000")
+    (workspace / "main.py").write_text("print('goodbye')")
+    store.snapshot(workspace, "20231002_000000")
+
+    assert store.prune(keep=1) == ["20231001_000000"]
+    assert store.snapshots() == ["20231002_000000"]
+    assert len(list(store.blobs_path.glob("*/*"))) == 3
+    assert store.gc() == 0
+
+    store.restore("20231002_000000", tmp_path / "restored")
+    assert (tmp_path / "restored" / "main.py").read_text() == "print('goodbye')"
+
+
+def test_plain_copies_can_be_restored(tmp_path):
+    snapshot = tmp_path / "archive" / "20200101_000000"
+    (snapshot / "memory").mkdir(parents=True)
+    (snapshot / "memory" / "all_output.txt").write_text("output")
+    (snapshot / "main.py").write_text("print('hello')")
+    store = ArchiveStore(tmp_path / "archive")
+
+    assert store.restore("20200101_000000", tmp_path / "restored") == 1
+    assert (tmp_path / "restored" / "main.py").read_text() == "print('hello')"
+    assert not (tmp_path / "restored" / "memory").exists()
+
+
+def test_links_are_stored_without_following_them(tmp_path):
+    workspace = make_workspace(tmp_path)
+    (workspace / "src" / "loop").symlink_to("..")
+    (workspace / "util.py").symlink_to("src/util.py")
+    store = ArchiveStore(tmp_path / "archive")
+
+    stats = store.snapshot(workspace, "20231001_000000", exclude=[".gpteng"])
+
+    assert stats.files == 3
+    restored = tmp_path / "restored"
+    assert store.restore("20231001_000000", restored) == 5
+    assert os.readlink(restored / "src" / "loop") == ".."
+    assert (restored / "util.py").read_text() == "x = 1"
+
+
+def test_changing_an_archived_file_leaves_the_blobs_intact(tmp_path):
+    workspace = make_workspace(tmp_path)
+    store = ArchiveStore(tmp_path / "archive")
+    store.snapshot(workspace, "20231001_000000", exclude=[".gpteng"])
+    store.snapshot(workspace, "20231002_000000", exclude=[".gpteng"])
+
+    (tmp_path / "archive" / "20231002_000000" / "src" / "util.py").write_text("x = 2")
+    (workspace / "main.py").write_text("print('goodbye')")
+    store.snapshot(workspace, "20231003_000000", exclude=[".gpteng"])
+
+    for blob_path in store.blobs_path.glob("*/*"):
+        content = zlib.decompress(blob_path.read_bytes())
+        assert (
+            hashlib.sha256(content).hexdigest() == blob_path.parent.name + blob_path.name
+        )
+    store.restore("20231001_000000", tmp_path / "restored")
+    assert (tmp_path / "restored" / "src" / "util.py").read_text() == "x = 1"
+
+
+def test_snapshot_names_are_not_reused(tmp_path):
+    workspace = make_workspace(tmp_path)
+    store = ArchiveStore(tmp_path / "archive")
+    store.snapshot(workspace, "20231001_000000")
+
+    with pytest.raises(FileExistsError):
+        store.snapshot(workspace, "20231001_000000")
+    assert store.unused_name("20231001_000000") == "20231001_000000_1"
+    assert store.unused_name("20231002_000000") == "20231002_000000"
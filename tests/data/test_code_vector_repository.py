@@ -1,6 +1,9 @@
+import os
+
 import pytest
 
 from llama_index import Document, ServiceContext
+from llama_index.token_counter.mock_embed_model import MockEmbedding
 from gpt_engineer.data.code_vector_repository import CodeVectorRepository
 import example_snake_files
 
@@ -158,3 +161,98 @@ def test_load_and_query_python(monkeypatch):
 
     # assert
     assert "Controller" in str(response)
+
+
+def mock_service_context() -> ServiceContext:
+    return ServiceContext.from_defaults(llm=None, embed_model=MockEmbedding(embed_dim=8))
+
+
+def write_snake_project(path):
+    (path / "src").mkdir(parents=True, exist_ok=True)
+    (path / "src" / "snake_game.py").write_text(example_snake_files.PYTHON)
+    (path / "src" / "script.js").write_text(example_snake_files.JAVASCRIPT)
+
+
+def test_persisted_index_is_reloaded(tmp_path, monkeypatch):
+    # arrange
+    write_snake_project(tmp_path)
+    persist_dir = tmp_path / ".gpteng" / "vector_index"
+    CodeVectorRepository(persist_dir, mock_service_context()).load_from_directory(
+        str(tmp_path)
+    )
+
+    def fail_to_load_documents(self, directory_path):
+        raise AssertionError("documents should not be loaded again")
+
+    monkeypatch.setattr(
+        CodeVectorRepository, "_load_documents_from_directory", fail_to_load_documents
+    )
+    repository = CodeVectorRepository(persist_dir, mock_service_context())
+
+    # act
+    repository.load_from_directory(str(tmp_path))
+    document_chunks = repository.relevent_code_chunks("snake direction up down")
+
+    # assert
+    assert len(document_chunks) == 2
+
+
+def test_only_changed_files_are_reindexed(tmp_path, monkeypatch):
+    # arrange
+    write_snake_project(tmp_path)
+    (tmp_path / "src" / "styles.css").write_text(example_snake_files.CSS)
+    persist_dir = tmp_path / ".gpteng" / "vector_index"
+    CodeVectorRepository(persist_dir, mock_service_context()).load_from_directory(
+        str(tmp_path)
+    )
+    (tmp_path / "src" / "snake_game.py").write_text(
+        "def turn_snake_upside_down():\n    pass\n"
+    )
+    (tmp_path / "src" / "styles.css").unlink()
+    (tmp_path / "src" / "index.html").write_text(example_snake_files.HTML)
+
+    loaded_files = []
+    load_documents = CodeVectorRepository._load_documents_from_files
+
+    def record_load_documents(self, file_paths):
+        loaded_files.extend(file_paths)
+        return load_documents(self, file_paths)
+
+    monkeypatch.setattr(
+        CodeVectorRepository, "_load_documents_from_files", record_load_documents
+    )
+    repository = CodeVectorRepository(persist_dir, mock_service_context())
+    repository._load_persisted_index()
+
+    # act
+    update = repository.update_from_directory(str(tmp_path))
+    document_chunks = repository.relevent_code_chunks("turn_snake_upside_down")
+
+    # assert
+    assert update.added == [os.path.join("src", "index.html")]
+    assert update.modified == [os.path.join("src", "snake_game.py")]
+    assert update.removed == [os.path.join("src", "styles.css")]
+    assert update.files_touched == 3
+    assert sorted(path.name for path in loaded_files) == ["index.html", "snake_game.py"]
+    assert "turn_snake_upside_down" in document_chunks[0].text
+    assert not any(
+        "styles.css" in node.metadata["filename"]
+        for node in repository._index.docstore.docs.values()
+    )
+
+
+def test_unchanged_directory_needs_no_update(tmp_path):
+    # arrange
+    write_snake_project(tmp_path)
+    persist_dir = tmp_path / ".gpteng" / "vector_index"
+    CodeVectorRepository(persist_dir, mock_service_context()).load_from_directory(
+        str(tmp_path)
+    )
+    repository = CodeVectorRepository(persist_dir, mock_service_context())
+    repository._load_persisted_index()
+
+    # act
+    update = repository.update_from_directory(str(tmp_path))
+
+    # assert
+    assert update.files_touched == 0
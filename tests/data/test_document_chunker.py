@@ -0,0 +1,69 @@
+import threading
+
+import example_snake_files
+
+from langchain.docstore.document import Document
+
+from gpt_engineer.data import document_chunker
+from gpt_engineer.data.document_chunker import DocumentChunker, get_parser
+
+
+def test_parser_is_reused_within_a_thread():
+    assert get_parser("python") is get_parser("python")
+    assert get_parser("python") is not get_parser("javascript")
+
+
+def test_parser_is_not_shared_between_threads():
+    parsers = []
+    thread = threading.Thread(target=lambda: parsers.append(get_parser("python")))
+    thread.start()
+    thread.join()
+
+    assert parsers[0] is not get_parser("python")
+
+
+def test_chunk_documents_by_language():
+    # arrange
+    documents = [
+        Document(
+            page_content=example_snake_files.PYTHON, metadata={"filename": "snake.py"}
+        ),
+        Document(
+            page_content=example_snake_files.JAVASCRIPT, metadata={"filename": "snake.js"}
+        ),
+        Document(page_content="not code", metadata={"filename": "README.md"}),
+    ]
+
+    # act
+    chunks = DocumentChunker.chunk_documents(documents)
+
+    # assert
+    assert {chunk.metadata["filename"] for chunk in chunks} == {"snake.py", "snake.js"}
+    assert all(len(chunk.page_content) <= 1500 for chunk in chunks)
+
+
+def test_parallel_chunking_matches_serial_order(monkeypatch):
+    # arrange
+    monkeypatch.setattr(document_chunker, "PARALLEL_CHUNKING_MIN_DOCUMENTS", 2)
+    sources = [
+        ("py", example_snake_files.PYTHON),
+        ("js", example_snake_files.JAVASCRIPT),
+        ("java", example_snake_files.JAVA),
+        ("go", example_snake_files.GO),
+    ]
+
+    def documents():
+        return [
+            Document(page_content=source, metadata={"filename": f"{i}.{extension}"})
+            for i, (extension, source) in enumerate(sources * 3)
+        ]
+
+    # act
+    serial = DocumentChunker.chunk_documents(documents(), workers=1)
+    parallel = DocumentChunker.chunk_documents(documents(), workers=2)
+
+    # assert
+    assert [chunk.page_content for chunk in parallel] == [
+        chunk.page_content for chunk in serial
+    ]
+    assert [chunk.metadata for chunk in parallel] == [chunk.metadata for chunk in serial]
@@ -1,5 +1,10 @@
+import os
+import threading
+
 import pytest
 
+from pathlib import Path
+
 from gpt_engineer.data.file_repository import FileRepository, FileRepositories
 
 
@@ -124,3 +129,135 @@ def test_DBs_dataclass_attributes(tmp_path):
     assert dbs_instance.workspace == dbs[4]
     assert dbs_instance.archive == dbs[5]
     assert dbs_instance.project_metadata == dbs[6]
+
+
+def test_cached_writes_reach_disk_on_flush(tmp_path):
+    db = FileRepository(tmp_path, cache_bytes=1024)
+    db["a.py"] = "a = 1"
+    db["a.py"] = db["a.py"] + "\nb = 2"
+
+    assert "a.py" in db
+    assert not (tmp_path / "a.py").exists()
+
+    db.flush()
+
+    assert (tmp_path / "a.py").read_text() == "a = 1\nb = 2"
+
+
+def test_cache_evicts_least_recently_used_files(tmp_path):
+    db = FileRepository(tmp_path, cache_bytes=10)
+    db["a"] = "aaaa"
+    db["b"] = "bbbb"
+    db["a"]  # a is now used more recently than b
+    db["c"] = "cccc"
+
+    assert (tmp_path / "b").read_text() == "bbbb"
+    assert not (tmp_path / "a").exists() and not (tmp_path / "c").exists()
+
+    db["large"] = "x" * 100  # larger than the cache, written through
+    assert (tmp_path / "large").read_text() == "x" * 100
+
+
+def test_cached_block_reads_and_writes_files_once(tmp_path, monkeypatch):
+    db = FileRepository(tmp_path)
+    db["a.py"] = "x = 1"
+    reads, writes = [], []
+    original_open, original_write_text = Path.open, Path.write_text
+
+    def counting_open(self, mode="r", *args, **kwargs):
+        if mode == "r":
+            reads.append(self)
+        return original_open(self, mode, *args, **kwargs)
+
+    def counting_write_text(self, *args, **kwargs):
+        writes.append(self)
+        return original_write_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "open", counting_open)
+    monkeypatch.setattr(Path, "write_text", counting_write_text)
+
+    with db.cached():
+        for i in range(2, 6):
+            db["a.py"] = db["a.py"].replace(f"x = {i - 1}", f"x = {i}")
+        del db["a.py"]
+        db["b.py"] = "y = 1"
+
+    assert (len(reads), len(writes)) == (1, 1)
+    assert not (tmp_path / "a.py").exists()
+    assert (tmp_path / "b.py").read_text() == "y = 1"
+    assert db.cache_bytes is None
+
+
+def test_batch_commits_all_writes_at_once(tmp_path):
+    db = FileRepository(tmp_path / "workspace")
+    db["old.py"] = "old"
+
+    with db.batch():
+        db["src/a.py"] = "a"
+        db["src/b.py"] = "b"
+        del db["old.py"]
+
+        assert db["src/a.py"] == "a" and "old.py" not in db
+        assert not (tmp_path / "workspace" / "src").exists()
+        assert (tmp_path / "workspace" / "old.py").exists()
+
+    assert db["src/a.py"] == "a" and db["src/b.py"] == "b"
+    assert "old.py" not in db
+    assert [path.name for path in tmp_path.iterdir()] == ["workspace"]
+
+
+def test_batch_rolls_back_on_exceptions(tmp_path):
+    db = FileRepository(tmp_path / "workspace")
+    db["a.py"] = "a"
+
+    with pytest.raises(KeyError):
+        with db.batch():
+            db["a.py"] = "changed"
+            db["b.py"] = "b"
+            db["missing.py"]
+
+    assert db["a.py"] == "a" and "b.py" not in db
+    assert [path.name for path in tmp_path.iterdir()] == ["workspace"]
+
+
+def test_batch_stages_in_the_metadata_directory(tmp_path):
+    batches = tmp_path / ".gpteng" / "batches"
+    stale, recent = batches / "workspace-stale", batches / "workspace-recent"
+    stale.mkdir(parents=True)
+    recent.mkdir()
+    os.utime(stale, (0, 0))
+    db = FileRepository(tmp_path)
+
+    with db.batch():
+        for i in range(3):
+            db["a.py"] = f"x = {i}"
+        # nothing is written before the batch ends
+        assert sorted(batches.iterdir()) == [recent]
+
+    assert db["a.py"] == "x = 2"
+    assert sorted(batches.iterdir()) == [recent]
+
+    memory = FileRepository(tmp_path / ".gpteng" / "memory")
+    with memory.batch():
+        memory["log.txt"] = "done"
+    assert sorted(batches.iterdir()) == [recent]
+    assert memory["log.txt"] == "done"
+
+
+def test_batch_only_covers_its_thread(tmp_path):
+    db = FileRepository(tmp_path)
+    seen = []
+
+    def other_thread():
+        seen.append(db.get("a.py"))
+        db["b.py"] = "b"
+
+    with db.batch():
+        db["a.py"] = "a"
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+        assert (tmp_path / "b.py").exists()
+
+    assert seen == [None]
+    assert db["a.py"] == "a"
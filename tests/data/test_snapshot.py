@@ -0,0 +1,44 @@
+import os
+
+from gpt_engineer.data.snapshot import snapshot_directory
+
+
+def test_unchanged_files_are_linked_to_the_previous_snapshot(tmp_path):
+    workspace = tmp_path / "workspace"
+    (workspace / "src").mkdir(parents=True)
+    (workspace / ".gpteng").mkdir()
+    (workspace / "main.py").write_text("print('hello')")
+    (workspace / "src" / "util.py").write_text("x = 1")
+    (workspace / ".gpteng" / "file_list.txt").write_text("main.py")
+
+    first = snapshot_directory(workspace, tmp_path / "archive" / "1", exclude=[".gpteng"])
+    (workspace / "main.py").write_text("print('goodbye')")
+    second = snapshot_directory(
+        workspace,
+        tmp_path / "archive" / "2",
+        previous=tmp_path / "archive" / "1",
+        exclude=[".gpteng"],
+    )
+
+    assert first.linked == 0 and first.cloned + first.copied == 2
+    assert second.linked == 1 and second.cloned + second.copied == 1
+    old, new = tmp_path / "archive" / "1", tmp_path / "archive" / "2"
+    assert os.path.samefile(old / "src" / "util.py", new / "src" / "util.py")
+    assert (old / "main.py").read_text() == "print('hello')"
+    assert (new / "main.py").read_text() == "print('goodbye')"
+    assert not (new / ".gpteng").exists()
+
+
+def test_links_are_snapshotted_without_following_them(tmp_path):
+    workspace = tmp_path / "workspace"
+    (workspace / "src").mkdir(parents=True)
+    (workspace / "src" / "util.py").write_text("x = 1")
+    (workspace / "src" / "loop").symlink_to("..")
+    (workspace / "util.py").symlink_to("src/util.py")
+
+    stats = snapshot_directory(workspace, tmp_path / "archive" / "1")
+
+    snapshot = tmp_path / "archive" / "1"
+    assert stats.symlinks == 2 and stats.cloned + stats.copied == 1
+    assert os.readlink(snapshot / "src" / "loop") == ".."
+    assert (snapshot / "util.py").read_text() == "x = 1"
@@ -0,0 +1,89 @@
+from gpt_engineer.cli.file_selector import DisplayablePath
+from gpt_engineer.data.file_repository import FileRepository
+from gpt_engineer.data.workspace_walker import walk_files
+
+
+def make_workspace(tmp_path, files):
+    for name, content in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    return tmp_path
+
+
+def walked(root, **kwargs):
+    return [path.relative_to(root).as_posix() for path in walk_files(root, **kwargs)]
+
+
+def test_ignore_files_and_ignored_directories_are_left_out(tmp_path):
+    root = make_workspace(
+        tmp_path,
+        {
+            ".gitignore": "*.log\n/build/\n!keep.log\n",
+            ".gpteignore": "secrets.txt\n",
+            "main.py": "",
+            "debug.log": "",
+            "keep.log": "",
+            "secrets.txt": "",
+            "build/out.py": "",
+            "src/build/gen.py": "",
+            "src/app.py": "",
+            "node_modules/lib/index.js": "",
+            ".git/HEAD": "",
+            ".gpteng/file_list.txt": "",
+        },
+    )
+
+    assert walked(root) == [
+        ".gitignore",
+        ".gpteignore",
+        "keep.log",
+        "main.py",
+        "src/app.py",
+        "src/build/gen.py",
+    ]
+
+
+def test_nested_ignore_files_apply_below_their_directory(tmp_path):
+    root = make_workspace(
+        tmp_path,
+        {
+            "a/.gitignore": "*.tmp\ndocs/*.md\n",
+            "a/x.tmp": "",
+            "a/deep/y.tmp": "",
+            "a/docs/readme.md": "",
+            "a/z.py": "",
+            "b/x.tmp": "",
+            "docs/readme.md": "",
+        },
+    )
+
+    assert walked(root, hidden=False) == ["a/z.py", "b/x.tmp", "docs/readme.md"]
+
+
+def test_supported_only_and_order_match_sorted_paths(tmp_path):
+    root = make_workspace(
+        tmp_path,
+        {"b.py": "", "a/c.js": "", "a.b/d.py": "", "notes.txt": "", "image.png": ""},
+    )
+
+    assert walked(root, supported_only=True) == ["a/c.js", "a.b/d.py", "b.py"]
+    assert FileRepository(root).to_path_list_string(supported_code_files_only=True) == (
+        "\n".join(str(root / name) for name in ["a/c.js", "a.b/d.py", "b.py"])
+    )
+
+
+def test_file_tree_leaves_out_ignored_paths(tmp_path):
+    root = make_workspace(
+        tmp_path,
+        {
+            ".gitignore": "dist/\n",
+            "dist/bundle.js": "",
+            "venv/bin/python": "",
+            "a.py": "",
+        },
+    )
+
+    names = [path.display_name for path in DisplayablePath.make_tree(root)][1:]
+
+    assert names == [".gitignore", "a.py"]
@@ -59,3 +59,23 @@ def test_archive(tmp_path, monkeypatch):
     assert not os.path.exists(tmp_path / "memory")
     assert os.path.isdir(tmp_path / gpteng_dir / "archive" / "20201225_170555")
     assert os.path.isdir(tmp_path / gpteng_dir / "archive" / "20220814_080512")
+
+
+def test_archive_twice_in_one_second(tmp_path, monkeypatch):
+    dir_names = [
+        ".gpteng/memory",
+        ".gpteng/logs",
+        ".gpteng/preprompts",
+        ".gpteng/input",
+        "",  # workspace is top-level folder
+        ".gpteng/archive",
+        ".gpteng/project_metadata",
+    ]
+    freeze_at(monkeypatch, datetime.datetime(2020, 12, 25, 17, 5, 55))
+    archive(setup_dbs(tmp_path, dir_names))
+    archive(setup_dbs(tmp_path, dir_names))
+
+    assert os.path.isdir(tmp_path / ".gpteng" / "archive" / "20201225_170555" / "memory")
+    assert os.path.isdir(
+        tmp_path / ".gpteng" / "archive" / "20201225_170555_1" / "memory"
+    )
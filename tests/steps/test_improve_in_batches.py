@@ -0,0 +1,76 @@
+import textwrap
+
+from pathlib import Path
+
+import pytest
+
+from gpt_engineer.cli.file_selector import FILE_LIST_NAME
+from gpt_engineer.core import steps
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.context_budget import _file_tokens
+from gpt_engineer.core.steps import improve_existing_code_in_batches
+from gpt_engineer.data.file_repository import FileRepository
+
+PREPROMPTS_PATH = Path(steps.__file__).parent.parent / "preprompts"
+
+
+def edit(filename, before, after):
+    return textwrap.dedent(
+        f"""
+        ```python
+        {filename}
+        <<<<<<< HEAD
+        {before}
+        =======
+        {after}
+        >>>>>>> updated
+        ```
+        """
+    )
+
+
+RESPONSES = [
+    # the batch of a.py
+    edit("a.py", "return 1", "return 10"),
+    # the batch of b.py, also editing a.py where the first batch did
+    edit("b.py", "return 2", "return 20") + edit("a.py", "return 1", "return 100"),
+]
+
+
+@pytest.fixture
+def dbs(make_dbs):
+    dbs = make_dbs(preprompts=FileRepository(PREPROMPTS_PATH))
+    dbs.input["prompt"] = "Make the numbers bigger"
+    dbs.workspace["a.py"] = "def f():\n    return 1\n"
+    dbs.workspace["b.py"] = "def g():\n    return 2\n"
+    dbs.project_metadata[FILE_LIST_NAME] = "\n".join(
+        str(dbs.workspace.path / name) for name in ["a.py", "b.py"]
+    )
+    return dbs
+
+
+def test_batches_are_improved_and_their_edits_merged(
+    dbs, fake_chat_model, monkeypatch, capsys
+):
+    fake_chat_model(*RESPONSES)
+    ai = AI("gpt-4")
+    # room for one file per batch
+    file_tokens = _file_tokens(
+        ai.token_usage_log.tokenizer, "a.py", dbs.workspace["a.py"]
+    )
+    monkeypatch.setattr(steps, "available_tokens", lambda *args: file_tokens)
+
+    messages = improve_existing_code_in_batches(ai, dbs)
+
+    # a request per batch, each listing the file of the other batch
+    requests = [m for m in messages if m.type == "human" and "Request:" in m.content]
+    assert len(requests) == 2
+    assert len(ai.token_usage_log.log()) == 2
+    assert "b.py" in messages[2].content and "Do not edit" in messages[2].content
+
+    assert dbs.workspace["a.py"] == "def f():\n    return 10\n"
+    assert dbs.workspace["b.py"] == "def g():\n    return 20\n"
+
+    output = capsys.readouterr().out
+    assert "Improving 2 files in 2 batches" in output
+    assert "Dropped a conflicting edit to a.py:\nreturn 1\n=======\nreturn 100" in output
@@ -1,6 +1,10 @@
+import asyncio
+
 from gpt_engineer.core.ai import AI
+from gpt_engineer.core.response_cache import ResponseCache
 from langchain.chat_models.fake import FakeListChatModel
 from langchain.chat_models.base import BaseChatModel
+from langchain.schema import HumanMessage
 
 
 def mock_create_chat_model(self) -> BaseChatModel:
@@ -64,3 +68,58 @@ def test_token_logging(monkeypatch):
     # assert
     assert usageCostAfterStart > 0
     assert usageCostAfterNext > usageCostAfterStart
+
+
+def test_cached_response_skips_model(tmp_path, fake_chat_model):
+    # arrange
+    fake_chat_model("response1", "response2", "response3")
+    cache = ResponseCache(tmp_path)
+    ai = AI("gpt-4", cache=cache)
+
+    # act
+    first = ai.start("system prompt", "user prompt", "step name")
+    second = ai.start("system prompt", "user prompt", "step name")
+
+    # assert
+    assert first[-1].content == "response1"
+    assert second[-1].content == "response1"  # the model would have answered "response2"
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [usage.cached for usage in ai.token_usage_log.log()] == [False, True]
+    paid = ai.token_usage_log.usage_cost()
+    ai.start("system prompt", "user prompt", "step name")
+    assert ai.token_usage_log.usage_cost() == paid
+
+
+def test_cache_key_depends_on_endpoint(fake_chat_model):
+    # arrange
+    fake_chat_model("response1", "response2", "response3")
+    messages = [HumanMessage(content="user prompt")]
+
+    # act
+    keys = {
+        AI("gpt-4")._cache_key(messages),
+        AI("gpt-4", api_base="http://localhost:8000/v1")._cache_key(messages),
+        AI("gpt-4", azure_endpoint="https://a.openai.azure.com")._cache_key(messages),
+        AI("gpt-4", azure_endpoint="https://b.openai.azure.com")._cache_key(messages),
+    }
+
+    # assert
+    assert len(keys) == 4
+
+
+def test_astart_and_anext(fake_chat_model):
+    # arrange
+    fake_chat_model("response1", "response2", "response3")
+
+    ai = AI("gpt-4")
+
+    async def converse():
+        messages = await ai.astart("system prompt", "user prompt", "step name")
+        return await ai.anext(messages, "next user prompt", step_name="step name")
+
+    # act
+    response_messages = asyncio.run(converse())
+
+    # assert
+    assert [m.content for m in response_messages[2::2]] == ["response1", "response2"]
+    assert len(ai.token_usage_log.log()) == 2
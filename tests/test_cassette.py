@@ -0,0 +1,104 @@
+import asyncio
+import warnings
+
+import pytest
+
+from gpt_engineer.core import cassette
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.cassette import RECORD, REPLAY, Cassette, CassetteMissError
+from gpt_engineer.core.chat_to_files import StreamingFileWriter
+
+RESPONSES = ["response1", "file.py\n```\nprint(1)\n```\n"]
+
+
+def test_replay_answers_recorded_requests(monkeypatch, tmp_path, fake_chat_model):
+    cassette_path = tmp_path / "cassette.jsonl"
+    fake_chat_model(*RESPONSES)
+    ai = AI("gpt-4", cassette=Cassette(cassette_path, mode=RECORD))
+    messages = ai.start("system prompt", "user prompt", step_name="step")
+    recorded = ai.next(messages, "generate", step_name="step")
+    monkeypatch.undo()
+
+    # no network and no model check: the model is replaced by the cassette
+    ai = AI("gpt-4", cassette=Cassette(cassette_path, mode=REPLAY, latency=0.01))
+    workspace = {}
+    messages = ai.start("system prompt", "user prompt", step_name="step")
+    replayed = ai.next(
+        messages,
+        "generate",
+        step_name="step",
+        callbacks=[StreamingFileWriter(workspace)],
+    )
+
+    assert [m.content for m in replayed] == [m.content for m in recorded]
+    assert workspace == {"file.py": "print(1)\n"}
+
+
+def test_async_replay_streams_to_the_callbacks(monkeypatch, tmp_path, fake_chat_model):
+    cassette_path = tmp_path / "cassette.jsonl"
+    fake_chat_model(*RESPONSES)
+    ai = AI("gpt-4", cassette=Cassette(cassette_path, mode=RECORD))
+    messages = ai.start("system prompt", "user prompt", step_name="step")
+    ai.next(messages, "generate", step_name="step")
+    monkeypatch.undo()
+
+    ai = AI("gpt-4", cassette=Cassette(cassette_path, mode=REPLAY))
+    workspace = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        messages = asyncio.run(ai.astart("system prompt", "user prompt", "step"))
+        asyncio.run(
+            ai.anext(
+                messages,
+                "generate",
+                step_name="step",
+                callbacks=[StreamingFileWriter(workspace)],
+            )
+        )
+
+    assert workspace == {"file.py": "print(1)\n"}
+
+
+def test_replay_uses_the_model_the_requests_were_recorded_with(
+    monkeypatch, tmp_path, fake_chat_model
+):
+    cassette_path = tmp_path / "cassette.jsonl"
+    fake_chat_model(*RESPONSES)
+    # gpt-4 is not available, the recorded run falls back to gpt-3.5-turbo
+    monkeypatch.setattr(
+        AI, "_check_model_access_and_fallback", lambda self, _: "gpt-3.5-turbo"
+    )
+    ai = AI("gpt-4", cassette=Cassette(cassette_path, mode=RECORD))
+    recorded = ai.start("system prompt", "user prompt", step_name="step")
+    monkeypatch.undo()
+
+    ai = AI("gpt-4", cassette=Cassette(cassette_path, mode=REPLAY))
+    replayed = ai.start("system prompt", "user prompt", step_name="step")
+
+    assert ai.model_name == "gpt-3.5-turbo"
+    assert replayed[-1].content == recorded[-1].content
+
+
+def test_replay_of_unrecorded_request_fails(tmp_path):
+    cassette_path = tmp_path / "cassette.jsonl"
+    Cassette(cassette_path, mode=RECORD).record("some request", "response")
+    ai = AI("gpt-4", cassette=Cassette(cassette_path, mode=REPLAY))
+
+    with pytest.raises(CassetteMissError):
+        ai.start("system prompt", "user prompt", step_name="step")
+
+
+def test_cassette_options(tmp_path):
+    assert cassette.cassette_options("todo_list") == []
+    assert cassette.cassette_options("todo_list", record_dir=tmp_path) == [
+        "--record",
+        str(tmp_path / "todo_list.jsonl"),
+    ]
+    assert cassette.cassette_options(
+        "todo_list", replay_dir=tmp_path, replay_latency=0.5
+    ) == [
+        "--replay",
+        str(tmp_path / "todo_list.jsonl"),
+        "--replay-latency",
+        "0.5",
+    ]
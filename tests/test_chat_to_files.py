@@ -1,7 +1,23 @@
 import textwrap
 
-from gpt_engineer.core.chat_to_files import to_files_and_memory, get_code_strings
+import pytest
+
+from gpt_engineer.core import chat_to_files
+from gpt_engineer.core.chat_to_files import (
+    ChatStreamParser,
+    Edit,
+    EditStreamParser,
+    StreamingFileWriter,
+    apply_edits,
+    finish_files_and_memory,
+    get_code_strings,
+    merge_edits,
+    parse_chat,
+    parse_edits,
+    to_files_and_memory,
+)
 from gpt_engineer.cli.file_selector import FILE_LIST_NAME
+from gpt_engineer.data.file_repository import FileRepository
 
 from unittest.mock import MagicMock
 
@@ -242,3 +258,244 @@ def test_get_code_strings(monkeypatch):
     # assert
     assert result["file1.txt"] == "File Data for file: path/to/file1.txt"
     assert result["file2.txt"] == "File Data for file: path/to/file2.txt"
+
+
+def _tokens(text, size=3):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_chat_stream_parser_matches_parse_chat():
+    chat = textwrap.dedent(
+        """
+    This is a sample program.
+
+    [file1.py]
+    ```python
+    print("Hello, World!")
+    ```
+
+    `file2.py`
+    ```python
+    def add(a, b):
+        return a + b
+    ```
+    """
+    )
+
+    parser = ChatStreamParser()
+    files = [file for token in _tokens(chat) for file in parser.feed(token)]
+
+    assert files == parse_chat(chat)[:-1]  # all but the README
+
+
+def test_edit_stream_parser_matches_parse_edits():
+    chat = textwrap.dedent(
+        """
+    Some explanation.
+
+    ```python
+    some/dir/example_1.py
+    <<<<<<< HEAD
+        def mul(a,b)
+    =======
+        def add(a,b):
+    >>>>>>> updated
+    ```
+
+    ```python
+    some/dir/example_2.py
+    <<<<<<< HEAD
+    =======
+    print("new file")
+    >>>>>>> updated
+    ```"""
+    )
+
+    parser = EditStreamParser()
+    edits = [edit for token in _tokens(chat) for edit in parser.feed(token)]
+    edits += parser.feed("\n")
+
+    assert edits == parse_edits(chat)
+    assert len(edits) == 2
+
+
+def test_streaming_file_writer_writes_file_when_its_fence_closes():
+    workspace = {}
+    writer = StreamingFileWriter(workspace)
+
+    for token in _tokens('file1.py\n```python\nprint("Hello")\n'):
+        writer.on_llm_new_token(token)
+    assert workspace == {}
+
+    writer.on_llm_new_token("```\n\nfile2.py\n```\n")
+    assert workspace == {"file1.py": 'print("Hello")\n'}
+    assert writer.files_written == 1
+
+
+def test_streaming_file_writer_applies_every_edit_once_on_finish():
+    chat = textwrap.dedent(
+        """
+    ```python
+    counter.py
+    <<<<<<< HEAD
+    count = 1
+    =======
+    count = count + 1
+    >>>>>>> updated
+    ```
+
+    ```python
+    counter.py
+    <<<<<<< HEAD
+    =======
+    count = 1
+    >>>>>>> updated
+    ```"""
+    )
+    workspace = {"counter.py": "count = 1\n"}
+    writer = StreamingFileWriter(workspace, edits=True)
+
+    for token in _tokens(chat):
+        writer.on_llm_new_token(token)
+    assert workspace == {"counter.py": "count = 1\n"}
+    assert len(writer.staged_edits) == 1
+
+    # the last fence has no trailing newline, so it is only parsed on finish
+    writer.finish(chat)
+    assert workspace == {"counter.py": "count = 1"}
+
+    writer.finish(chat)
+    assert workspace == {"counter.py": "count = 1"}
+    assert writer.files_written == 2
+
+
+def test_streaming_file_writer_applies_no_edit_of_a_malformed_response():
+    chat = textwrap.dedent(
+        """
+    ```python
+    b.py
+    <<<<<<< HEAD
+    y = 1
+    =======
+    y = 2
+    >>>>>>> updated
+    ```
+
+    ```python
+    a.py
+    x = 1
+    ```
+
+    ```python
+    a.py
+    <<<<<<< HEAD
+    x = 1
+    =======
+    x = 2
+    >>>>>>> updated
+    ```
+    """
+    )
+    workspace = {"a.py": "x = 1\n", "b.py": "y = 1\n"}
+    writer = StreamingFileWriter(workspace, edits=True)
+
+    for token in _tokens(chat):
+        writer.on_llm_new_token(token)
+
+    # the edit after the malformed one is still parsed from the stream
+    assert [edit.filename for edit in writer.staged_edits] == ["b.py", "a.py"]
+    with pytest.raises(ValueError):
+        writer.finish(chat)
+    assert workspace == {"a.py": "x = 1\n", "b.py": "y = 1\n"}
+
+
+def test_streaming_file_writer_applies_the_streamed_edits(monkeypatch):
+    chat = "```python\na.py\n<<<<<<< HEAD\nx = 1\n=======\nx = 2\n>>>>>>> updated\n```"
+    workspace = {"a.py": "x = 1\n"}
+    writer = StreamingFileWriter(workspace, edits=True)
+    for token in _tokens(chat):
+        writer.on_llm_new_token(token)
+
+    # the edits were parsed while they were streamed
+    monkeypatch.setattr(chat_to_files, "parse_edits", None)
+    writer.finish(chat)
+
+    assert workspace == {"a.py": "x = 2\n"}
+
+
+def test_streaming_file_writer_does_not_rewrite_streamed_files():
+    class CountingWorkspace(dict):
+        writes = 0
+
+        def __setitem__(self, key, value):
+            self.writes += 1
+            super().__setitem__(key, value)
+
+    chat = 'file1.py\n```python\nprint("Hello")\n```\n\nfile2.py\n```python\nx = 1\n```'
+    workspace = CountingWorkspace()
+    writer = StreamingFileWriter(workspace)
+
+    for token in _tokens(chat):
+        writer.on_llm_new_token(token)
+    writer.finish(chat)
+
+    # file1.py was streamed, file2.py and the README were not
+    assert workspace.writes == 3
+    assert workspace["file2.py"] == "x = 1\n"
+
+
+def test_finish_files_and_memory_saves_the_files_not_streamed():
+    chat = 'file1.py\n```python\nprint("Hello")\n```\n\nfile2.py\n```python\nx = 1\n```'
+    dbs = DummyDBs()
+    dbs.memory, dbs.workspace = {}, {}
+    writer = StreamingFileWriter(dbs.workspace)
+    for token in _tokens(chat[:40]):
+        writer.on_llm_new_token(token)
+    assert list(dbs.workspace) == ["file1.py"]
+
+    finish_files_and_memory(chat, dbs, writer)
+
+    assert dbs.memory["all_output.txt"] == chat
+    assert dbs.workspace["file2.py"] == "x = 1\n"
+
+
+def test_merge_edits_drops_overlapping_edits_of_later_requests():
+    workspace = {"a.py": "def f():\n    return 1\n\n\ndef g():\n    return 2\n"}
+    first = [
+        Edit("a.py", "def f():\n    return 1", "def f():\n    return 10"),
+        Edit("new.py", "", "x = 1"),
+    ]
+    second = [
+        Edit("a.py", "def g():\n    return 2", "def g():\n    return 20"),
+        Edit("a.py", "return 1", "return 100"),
+        Edit("new.py", "", "x = 2"),
+    ]
+
+    edits, conflicts = merge_edits([first, second], workspace)
+
+    assert edits == first + second[:1]
+    assert [(c.kept, c.dropped) for c in conflicts] == [
+        (first[0], second[1]),
+        (first[1], second[2]),
+    ]
+
+
+def test_merge_edits_keeps_edits_of_the_same_request():
+    workspace = {"a.py": "x = 1\n"}
+    edits = [Edit("a.py", "x = 1", "x = 2"), Edit("a.py", "x = 2", "x = 3")]
+
+    merged, conflicts = merge_edits([edits], workspace)
+
+    assert merged == edits
+    assert conflicts == []
+
+
+def test_apply_edits_applies_no_edit_if_one_fails(tmp_path):
+    workspace = FileRepository(tmp_path)
+    workspace["a.py"] = "x = 1\n"
+    edits = [Edit("a.py", "x = 1", "x = 2"), Edit("missing.py", "y = 1", "y = 2")]
+
+    with pytest.raises(KeyError):
+        apply_edits(edits, workspace)
+
+    assert workspace["a.py"] == "x = 1\n"
@@ -0,0 +1,59 @@
+import pytest
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.checkpoint import CHECKPOINTS_NAME, Checkpoints
+
+
+@pytest.fixture
+def ai(fake_chat_model) -> AI:
+    fake_chat_model("response")
+    return AI("gpt-4")
+
+
+@pytest.fixture
+def dbs(make_dbs):
+    dbs = make_dbs()
+    dbs.input["prompt"] = "make a snake game"
+    dbs.preprompts["generate"] = "generate code"
+    return dbs
+
+
+def test_completed_steps_are_recognized_after_a_restart(ai, dbs):
+    checkpoints = Checkpoints(dbs.logs)
+    gen_hash = checkpoints.input_hash("simple_gen", ai, dbs)
+    dbs.logs["simple_gen"] = "[]"
+    checkpoints.mark_complete("simple_gen", gen_hash)
+    entrypoint_hash = checkpoints.input_hash("gen_entrypoint", ai, dbs, ["simple_gen"])
+
+    restarted = Checkpoints(dbs.logs)
+
+    assert CHECKPOINTS_NAME in dbs.logs
+    assert restarted.is_complete(
+        "simple_gen", restarted.input_hash("simple_gen", ai, dbs)
+    )
+    assert (
+        restarted.input_hash("gen_entrypoint", ai, dbs, ["simple_gen"]) == entrypoint_hash
+    )
+    assert not restarted.is_complete("gen_entrypoint", entrypoint_hash)
+
+
+def test_changed_inputs_or_missing_logs_invalidate_a_step(ai, dbs):
+    checkpoints = Checkpoints(dbs.logs)
+    gen_hash = checkpoints.input_hash("simple_gen", ai, dbs)
+    dbs.logs["simple_gen"] = "[]"
+    checkpoints.mark_complete("simple_gen", gen_hash)
+    entrypoint_hash = checkpoints.input_hash("gen_entrypoint", ai, dbs, ["simple_gen"])
+
+    dbs.logs["simple_gen"] = '[{"type": "ai"}]'
+    assert (
+        checkpoints.input_hash("gen_entrypoint", ai, dbs, ["simple_gen"])
+        != entrypoint_hash
+    )
+
+    dbs.preprompts["generate"] = "generate better code"
+    assert not checkpoints.is_complete(
+        "simple_gen", checkpoints.input_hash("simple_gen", ai, dbs)
+    )
+
+    del dbs.logs["simple_gen"]
+    assert not checkpoints.is_complete("simple_gen", gen_hash)
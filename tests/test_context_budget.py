@@ -0,0 +1,96 @@
+from langchain.schema import HumanMessage, SystemMessage
+
+from gpt_engineer.core.chat_to_files import format_file_to_input
+from gpt_engineer.core.context_budget import (
+    ANSWER_SHARE,
+    TRUNCATION_NOTE,
+    available_tokens,
+    batch_files,
+    context_window,
+    pack_files,
+)
+from gpt_engineer.core.token_usage import Tokenizer
+
+
+def test_context_window_by_longest_prefix():
+    assert context_window("gpt-4") == 8192
+    assert context_window("gpt-4-32k-0613") == 32768
+    assert context_window("gpt-3.5-turbo-16k") == 16384
+    assert context_window("some-local-model") == 8192
+
+
+def test_available_tokens_leave_room_for_the_answer():
+    tokenizer = Tokenizer("gpt-4")
+    messages = [SystemMessage(content="system"), HumanMessage(content="Request: x")]
+
+    available = available_tokens("gpt-4", tokenizer, messages)
+
+    assert available == int(8192 * (1 - ANSWER_SHARE)) - (
+        tokenizer.num_tokens_from_messages(messages)
+    )
+
+
+def test_files_are_packed_in_priority_order():
+    tokenizer = Tokenizer("gpt-4")
+    files = {
+        "main.py": "print('main')\n" * 50,
+        "big.py": "x = 1\n" * 2000,
+        "small.py": "y = 2\n",
+    }
+    main_tokens = pack_files({"main.py": files["main.py"]}, tokenizer, 10_000).tokens
+    budget = main_tokens + 300
+
+    packed = pack_files(files, tokenizer, budget)
+
+    # main.py fits, big.py is cut to what is left, and nothing is left for small.py
+    assert list(packed.files) == ["main.py", "big.py"]
+    assert packed.files["main.py"] == files["main.py"]
+    assert packed.truncated == ["big.py"]
+    assert packed.files["big.py"].startswith("x = 1\n")
+    kept_lines = packed.files["big.py"].count("x = 1\n")
+    assert packed.files["big.py"].endswith(
+        TRUNCATION_NOTE.format(2000 - kept_lines) + "\n"
+    )
+    assert packed.dropped == ["small.py"]
+    assert packed.tokens <= budget
+    assert "small.py" in packed.dropped_files_note()
+
+    sent_tokens = sum(
+        tokenizer.num_tokens_from_messages(
+            [HumanMessage(content=format_file_to_input(name, content))]
+        )
+        - 2
+        for name, content in packed.files.items()
+    )
+    assert packed.tokens == sent_tokens
+
+
+def test_smaller_files_fill_the_rest_of_the_budget():
+    tokenizer = Tokenizer("gpt-4")
+    files = {"big.py": "x = 1\n" * 2000, "small.py": "y = 2\n"}
+
+    packed = pack_files(files, tokenizer, 200)  # too little to truncate big.py
+
+    assert packed.dropped == ["big.py"]
+    assert list(packed.files) == ["small.py"]
+    assert packed.truncated == []
+
+
+def test_files_are_batched_within_the_budget():
+    tokenizer = Tokenizer("gpt-4")
+    files = {f"file{i}.py": f"value_{i} = {i}\n" * 40 for i in range(6)}
+    files["huge.py"] = "x = 1\n" * 2000
+    one_file = pack_files({"file0.py": files["file0.py"]}, tokenizer, 10_000).tokens
+    budget = 2 * one_file + 10
+
+    batches = batch_files(files, tokenizer, budget)
+
+    assert [list(batch) for batch in batches] == [
+        ["file0.py", "file1.py"],
+        ["file2.py", "file3.py"],
+        ["file4.py", "file5.py"],
+        ["huge.py"],
+    ]
+    assert batches[-1]["huge.py"].startswith("x = 1\n")
+    for batch in batches:
+        assert pack_files(batch, tokenizer, budget).dropped == []
@@ -0,0 +1,46 @@
+import subprocess
+import sys
+
+# Modules that are only needed by some step configs and must not be loaded by the CLI
+# before a config that needs them is selected.
+LAZY_MODULES = ["llama_index", "tree_sitter", "tree_sitter_languages", "rank_bm25"]
+
+# Generous budget for importing the CLI, loading llama_index alone takes longer
+STARTUP_BUDGET_SECONDS = 3.0
+
+
+def import_times(module: str) -> dict:
+    """
+    Import a module in a fresh interpreter with `-X importtime` and parse the report.
+
+    Returns a mapping from each imported module to its cumulative import time in seconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def test_cli_does_not_import_lazy_modules():
+    times = import_times("gpt_engineer.cli.main")
+
+    loaded = [name for name in times if name.split(".")[0] in LAZY_MODULES]
+
+    assert loaded == []
+
+
+def test_cli_import_fits_startup_budget():
+    times = import_times("gpt_engineer.cli.main")
+
+    assert times["gpt_engineer.cli.main"] < STARTUP_BUDGET_SECONDS
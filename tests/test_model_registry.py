@@ -0,0 +1,67 @@
+import openai
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.model_registry import ModelAccessRegistry
+
+
+def test_registry_get_and_set(tmp_path):
+    # arrange
+    registry = ModelAccessRegistry(tmp_path / "model_access.json")
+
+    # act
+    unknown = registry.get("gpt-4", "key")
+    registry.set("gpt-4", "key", True)
+    registry.set("gpt-4", "other key", False)
+
+    # assert
+    assert unknown is None
+    assert registry.get("gpt-4", "key") is True
+    assert registry.get("gpt-4", "other key") is False
+    assert "key" not in (tmp_path / "model_access.json").read_text()
+
+
+def test_registry_results_expire(tmp_path):
+    # arrange
+    registry = ModelAccessRegistry(tmp_path / "model_access.json", ttl_seconds=-1)
+
+    # act
+    registry.set("gpt-4", "key", True)
+
+    # assert
+    assert registry.get("gpt-4", "key") is None
+
+
+def test_model_probe_is_cached(monkeypatch, tmp_path, fake_chat_model):
+    # arrange
+    probed_models = []
+
+    def mock_retrieve(model_name):
+        probed_models.append(model_name)
+        raise openai.InvalidRequestError("model not found", None)
+
+    monkeypatch.setattr(openai.Model, "retrieve", mock_retrieve)
+    fake_chat_model("response", check_model=True)
+    registry = ModelAccessRegistry(tmp_path / "model_access.json")
+
+    # act
+    first = AI("gpt-4", model_registry=registry)
+    second = AI("gpt-4", model_registry=registry)
+
+    # assert
+    assert first.model_name == second.model_name == "gpt-3.5-turbo"
+    assert probed_models == ["gpt-4"]
+
+
+def test_model_probe_can_be_skipped(monkeypatch, fake_chat_model):
+    # arrange
+    def mock_retrieve(model_name):
+        raise AssertionError("the model should not be probed")
+
+    monkeypatch.setattr(openai.Model, "retrieve", mock_retrieve)
+    fake_chat_model("response", check_model=True)
+
+    # act
+    ai = AI("gpt-4", skip_model_check=True)
+
+    # assert
+    assert ai.model_name == "gpt-4"
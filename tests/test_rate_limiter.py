@@ -0,0 +1,73 @@
+import json
+
+from gpt_engineer.core import rate_limiter
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def fake_clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "time", clock.time)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_requests_wait_for_the_request_bucket(monkeypatch, tmp_path):
+    clock = fake_clock(monkeypatch)
+    limiter = RateLimiter(requests_per_minute=2, path=tmp_path / "limits.json")
+
+    assert limiter.acquire(100) == 0
+    assert limiter.acquire(100) == 0
+    assert limiter.acquire(100) == 30  # one request refills in 60 / 2 seconds
+    assert clock.slept == [30]
+
+
+def test_limiters_on_the_same_file_share_buckets(monkeypatch, tmp_path):
+    clock = fake_clock(monkeypatch)
+    path = tmp_path / "limits.json"
+    first = RateLimiter(tokens_per_minute=600, path=path)
+    second = RateLimiter(tokens_per_minute=600, path=path)
+
+    first.acquire(400)
+    second.consume(100)
+    waited = second.acquire(200)
+
+    assert waited == 10  # 100 tokens refill in 10 seconds
+    assert json.loads(path.read_text())["tokens"] == 0
+    assert clock.slept == [10]
+
+
+def test_prompt_larger_than_the_limit_waits_for_a_full_bucket(monkeypatch, tmp_path):
+    fake_clock(monkeypatch)
+    limiter = RateLimiter(tokens_per_minute=60, path=tmp_path / "limits.json")
+
+    assert limiter.acquire(100) == 0
+    assert limiter.acquire(100) == 100  # the debt of 40 tokens plus a full bucket
+
+
+def test_ai_takes_prompt_and_completion_tokens(monkeypatch, tmp_path, fake_chat_model):
+    fake_clock(monkeypatch)
+    fake_chat_model("response", check_model=True)
+    path = tmp_path / "limits.json"
+    limiter = RateLimiter(requests_per_minute=10, tokens_per_minute=10_000, path=path)
+    ai = AI("gpt-4", skip_model_check=True, rate_limiter=limiter)
+
+    ai.start("system prompt", "user prompt", step_name="step")
+
+    state = json.loads(path.read_text())
+    usage = ai.token_usage_log.log()[-1]
+    assert state["requests"] == 9
+    assert state["tokens"] == 10_000 - usage.in_step_total_tokens
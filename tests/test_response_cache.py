@@ -0,0 +1,71 @@
+import os
+import time
+
+from gpt_engineer.core.response_cache import ResponseCache
+
+
+def test_get_and_set(tmp_path):
+    # arrange
+    cache = ResponseCache(tmp_path)
+    key = ResponseCache.key("gpt-4", 0.0, '[{"type": "human"}]')
+
+    # act
+    missed = cache.get(key)
+    cache.set(key, "response")
+    hit = cache.get(key)
+
+    # assert
+    assert missed is None
+    assert hit == "response"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_depends_on_model_temperature_and_messages():
+    messages = '[{"type": "human"}]'
+
+    assert ResponseCache.key("gpt-4", 0.0, messages) == ResponseCache.key(
+        "gpt-4", 0.0, messages
+    )
+    assert ResponseCache.key("gpt-4", 0.0, messages) != ResponseCache.key(
+        "gpt-3.5-turbo", 0.0, messages
+    )
+    assert ResponseCache.key("gpt-4", 0.0, messages) != ResponseCache.key(
+        "gpt-4", 0.1, messages
+    )
+    assert ResponseCache.key("gpt-4", 0.0, messages) != ResponseCache.key(
+        "gpt-4", 0.0, "[]"
+    )
+
+
+def test_expired_entries_are_misses(tmp_path):
+    # arrange
+    cache = ResponseCache(tmp_path, max_age_seconds=60)
+    cache.set("old", "response")
+    an_hour_ago = time.time() - 3600
+    os.utime(tmp_path / "old.json", (an_hour_ago, an_hour_ago))
+
+    # act
+    result = cache.get("old")
+
+    # assert
+    assert result is None
+    assert not (tmp_path / "old.json").exists()
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    # arrange
+    cache = ResponseCache(tmp_path, max_size_bytes=100)
+    cache.set("first", "a" * 30)
+    cache.set("second", "b" * 30)
+    past = time.time() - 10
+    os.utime(tmp_path / "first.json", (past, past))
+    os.utime(tmp_path / "second.json", (past + 1, past + 1))
+    cache.get("first")  # refreshes "first", so "second" is now the oldest
+
+    # act
+    cache.set("third", "c" * 30)
+
+    # assert
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
@@ -0,0 +1,39 @@
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.response_cache import ResponseCache
+from gpt_engineer.core.step_cache import StepCache
+from gpt_engineer.core.steps import gen_entrypoint, simple_gen
+
+RESPONSE = "```sh\npython main.py\n```"
+
+
+def test_gen_entrypoint_is_reused_across_projects(tmp_path, fake_chat_model, make_dbs):
+    fake_chat_model(RESPONSE)
+    ai = AI("gpt-4")
+    step_cache = StepCache(ResponseCache(tmp_path / "cache"))
+    memoized = step_cache.wrap(gen_entrypoint)
+
+    def make_project(name):
+        dbs = make_dbs(tmp_path / name)
+        dbs.memory["all_output.txt"] = "main.py prints hello"
+        return dbs
+
+    first = memoized(ai, make_project("first"))
+    other_project = make_project("second")
+    second = memoized(ai, other_project)
+
+    assert memoized.__name__ == "gen_entrypoint"
+    assert len(ai.token_usage_log.log()) == 1
+    assert other_project.workspace["run.sh"] == "python main.py\n"
+    assert [m.content for m in second] == [m.content for m in first]
+    assert step_cache.stats() == "1 hits, 1 misses"
+
+    changed = make_project("third")
+    changed.memory["all_output.txt"] = "main.py prints goodbye"
+    memoized(ai, changed)
+    assert len(ai.token_usage_log.log()) == 2
+
+
+def test_steps_without_declared_files_are_not_memoized(tmp_path):
+    step_cache = StepCache(ResponseCache(tmp_path / "cache"))
+
+    assert step_cache.wrap(simple_gen) is simple_gen
@@ -0,0 +1,51 @@
+import threading
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.step_executor import run_steps_concurrently
+
+
+def test_sync_steps_run_concurrently(fake_chat_model, make_dbs):
+    # arrange
+    fake_chat_model("response")
+    ai = AI("gpt-4")
+    dbs = make_dbs()
+    # each step waits for the other one, so running them one after the other times out
+    barrier = threading.Barrier(2, timeout=5)
+
+    def first_step(ai, dbs):
+        barrier.wait()
+        return ai.start("system", "first", step_name="first_step")
+
+    def second_step(ai, dbs):
+        barrier.wait()
+        return ai.start("system", "second", step_name="second_step")
+
+    # act
+    results = run_steps_concurrently(ai, dbs, [first_step, second_step])
+
+    # assert
+    assert [messages[1].content for messages in results] == ["first", "second"]
+    assert "first_step" in dbs.logs
+    assert "second_step" in dbs.logs
+    assert len(ai.token_usage_log.log()) == 2
+
+
+def test_async_and_sync_steps_share_token_log(fake_chat_model, make_dbs):
+    # arrange
+    fake_chat_model("response")
+    ai = AI("gpt-4")
+    dbs = make_dbs()
+
+    async def async_step(ai, dbs):
+        return await ai.astart("system", "async", step_name="async_step")
+
+    def sync_step(ai, dbs):
+        return ai.start("system", "sync", step_name="sync_step")
+
+    # act
+    run_steps_concurrently(ai, dbs, [async_step, sync_step])
+
+    # assert
+    log = ai.token_usage_log.log()
+    assert sorted(usage.step_name for usage in log) == ["async_step", "sync_step"]
+    assert log[-1].total_tokens == sum(usage.in_step_total_tokens for usage in log)
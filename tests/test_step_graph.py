@@ -0,0 +1,89 @@
+import json
+import threading
+
+from gpt_engineer.core.step_graph import StepGraph, serialize_timeline, step_io
+from gpt_engineer.core.steps import STEPS
+from gpt_engineer.data.file_repository import FileRepository
+
+
+def make_steps(barrier=None, log=None):
+    def record(name):
+        if log is not None:
+            log.append(name)
+        if barrier is not None:
+            barrier.wait()
+
+    @step_io(reads=["input/prompt"], writes=["memory/a.txt"])
+    def write_a(ai, dbs):
+        record("write_a")
+        return []
+
+    @step_io(reads=["input/prompt"], writes=["memory/b.txt"])
+    def write_b(ai, dbs):
+        record("write_b")
+        return []
+
+    @step_io(reads=["memory/a.txt", "memory/b.txt"], writes=["workspace"])
+    def combine(ai, dbs):
+        if log is not None:
+            log.append("combine")
+        return []
+
+    def review(ai, dbs):
+        if log is not None:
+            log.append("review")
+        return []
+
+    return [write_a, write_b, combine, review]
+
+
+def test_dependencies_follow_declared_files(make_dbs):
+    graph = StepGraph(make_steps(), make_dbs())
+
+    assert graph.dependencies == {
+        "write_a": [],
+        "write_b": [],
+        "combine": ["write_a", "write_b"],
+        "review": ["write_a", "write_b", "combine"],
+    }
+
+
+def test_builtin_pipelines_keep_their_order(tmp_path, make_dbs):
+    # as in the CLI, the input is read from the workspace
+    dbs = make_dbs(input=FileRepository(tmp_path / "workspace"))
+
+    for steps in STEPS.values():
+        graph = StepGraph(steps, dbs)
+        for i, step in enumerate(steps):
+            assert graph.dependencies[step.__name__] == [s.__name__ for s in steps[:i]]
+
+
+def test_independent_steps_ignore_their_declarations(make_dbs):
+    graph = StepGraph(make_steps(), make_dbs(), independent=True)
+
+    assert all(dependencies == [] for dependencies in graph.dependencies.values())
+
+
+def test_independent_steps_run_concurrently(make_dbs):
+    log = []
+    # both steps must be running at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=10)
+    graph = StepGraph(make_steps(barrier, log), make_dbs())
+
+    timeline = graph.run(lambda step: step(None, None), max_workers=2)
+
+    assert sorted(log[:2]) == ["write_a", "write_b"]
+    assert log[2:] == ["combine", "review"]
+    trace = json.loads(serialize_timeline(timeline))["traceEvents"]
+    assert [event["name"] for event in trace][2:] == ["combine", "review"]
+    assert len({event["tid"] for event in trace[:2]}) == 2
+
+
+def test_single_worker_runs_steps_in_order(make_dbs):
+    log = []
+    graph = StepGraph(make_steps(log=log), make_dbs())
+
+    timeline = graph.run(lambda step: step(None, None))
+
+    assert log == ["write_a", "write_b", "combine", "review"]
+    assert [timing.step_name for timing in timeline] == log
@@ -0,0 +1,43 @@
+import json
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.step_report import (
+    FirstTokenTimer,
+    build_step_reports,
+    serialize_step_reports,
+)
+
+
+def test_step_reports_sum_tokens_per_step(fake_chat_model):
+    fake_chat_model("response1", "response2", "response3")
+    ai = AI("gpt-4")
+
+    messages = ai.start("system prompt", "user prompt", step_name="clarify")
+    ai.next(messages, "answer", step_name="clarify")
+    ai.start("system prompt", "user prompt", step_name="gen_code")
+
+    reports = build_step_reports(ai, {"clarify": 2.0, "gen_code": 1.0, "execute": 0.5})
+
+    assert [report.step_name for report in reports] == [
+        "clarify",
+        "gen_code",
+        "execute",
+    ]
+    usages = ai.token_usage_log.log()
+    assert reports[0].prompt_tokens == sum(u.in_step_prompt_tokens for u in usages[:2])
+    assert reports[1].completion_tokens == usages[2].in_step_completion_tokens
+    assert reports[0].cost > 0
+    assert reports[0].time_to_first_token is not None
+    assert reports[2].prompt_tokens == 0 and reports[2].time_to_first_token is None
+
+    serialized = json.loads(serialize_step_reports(reports))
+    assert serialized[0]["wall_time"] == 2.0
+
+
+def test_first_token_timer_keeps_first_token():
+    timer = FirstTokenTimer()
+    timer.on_llm_new_token("a")
+    first = timer.time_to_first_token
+    timer.on_llm_new_token("b")
+
+    assert first is not None and timer.time_to_first_token == first
@@ -0,0 +1,43 @@
+import openai
+
+from gpt_engineer.core.ai import AI
+from gpt_engineer.core.chat_to_files import StreamingFileWriter
+from gpt_engineer.core.stub_openai_server import StubConfig, StubOpenAIServer
+
+
+def test_ai_streams_from_stub_server(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(openai, "api_key", "sk-test")
+    config = StubConfig(responses=["file.py\n```\nprint(1)\n```\n"])
+
+    with StubOpenAIServer(config) as server:
+        ai = AI("gpt-4", api_base=server.api_base)
+        workspace = {}
+        messages = ai.start(
+            "system prompt",
+            "user prompt",
+            step_name="step",
+            callbacks=[StreamingFileWriter(workspace)],
+        )
+
+    # the model check went to the stub server as well
+    assert ai.model_name == "gpt-4"
+    assert messages[-1].content == config.responses[0]
+    assert workspace == {"file.py": "print(1)\n"}
+    assert server.stats.completions == 1
+
+
+def test_ai_backs_off_on_rate_limit(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    config = StubConfig(responses=["response"], rate_limit_every=2)
+
+    with StubOpenAIServer(config) as server:
+        ai = AI("gpt-4", skip_model_check=True, api_base=server.api_base)
+        ai.llm.max_retries = 1  # leave retries to AI.backoff_inference
+
+        ai.start("system prompt", "user prompt", step_name="step")
+        messages = ai.start("system prompt", "user prompt", step_name="step")
+
+    assert messages[-1].content == "response"
+    assert server.stats.requests == 3
+    assert server.stats.rate_limited == 1
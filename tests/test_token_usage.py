@@ -1,6 +1,11 @@
 import csv
 from io import StringIO
-from gpt_engineer.core.token_usage import TokenUsageLog, TokenUsage
+from gpt_engineer.core.token_usage import (
+    MemoizingTokenizer,
+    TokenUsageLog,
+    TokenUsage,
+    Tokenizer,
+)
 from langchain.schema import AIMessage, HumanMessage, SystemMessage
 
 
@@ -42,3 +47,49 @@ def test_usage_cost():
 
     # assert
     assert usage_cost > 0
+
+
+def test_update_log_encodes_only_new_messages():
+    # arrange
+    token_usage_log = TokenUsageLog("gpt-4")
+    encoder = token_usage_log._tokenizer._tiktoken_tokenizer
+    encoded_chars = []
+
+    class CountingEncoder:
+        def encode(self, txt):
+            encoded_chars[-1] += len(txt)
+            return encoder.encode(txt)
+
+    token_usage_log._tokenizer._tiktoken_tokenizer = CountingEncoder()
+    messages = [SystemMessage(content="my system message")]
+
+    # act
+    for turn in range(30):
+        encoded_chars.append(0)
+        messages.append(HumanMessage(content=f"question {turn:02} " * 50))
+        answer = f"answer {turn:02} " * 50
+        token_usage_log.update_log(messages, answer, f"turn {turn}")
+        messages.append(AIMessage(content=answer))
+
+    # assert
+    # a full re-count would grow with the conversation, the per-turn cost stays flat
+    assert len(set(encoded_chars[1:])) == 1
+    assert token_usage_log.log()[-1].in_step_prompt_tokens == (
+        Tokenizer("gpt-4").num_tokens_from_messages(messages[:-1])
+    )
+
+
+def test_memo_forgets_least_recently_counted_texts():
+    # arrange
+    tokenizer = MemoizingTokenizer("gpt-4", maxsize=2)
+
+    # act
+    for text in ["a", "b", "a", "c"]:
+        tokenizer.num_tokens(text)
+
+    # assert
+    info = tokenizer._count_tokens.cache_info()
+    assert (info.currsize, info.hits, info.misses) == (2, 1, 3)
+    tokenizer.num_tokens("a")
+    tokenizer.num_tokens("b")
+    assert tokenizer._count_tokens.cache_info().misses == 4